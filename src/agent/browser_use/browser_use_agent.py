@@ -3,6 +3,7 @@ from __future__ import annotations
 import asyncio
 import logging
 import os
+from concurrent.futures import ThreadPoolExecutor
 
 # from lmnr.sdk.decorators import observe
 from browser_use.agent.gif import create_history_gif
@@ -19,6 +20,9 @@ from browser_use.utils import time_execution_async
 from dotenv import load_dotenv
 from browser_use.agent.message_manager.utils import is_model_without_tool_support
 
+from src.agent.browser_use.screenshot_store import get_screenshot_store
+from src.utils.llm_scheduler import llm_run_key
+
 load_dotenv()
 logger = logging.getLogger(__name__)
 
@@ -26,6 +30,47 @@ SKIP_LLM_API_KEY_VERIFICATION = (
         os.environ.get("SKIP_LLM_API_KEY_VERIFICATION", "false").lower()[0] in "ty1"
 )
 
+WEBP_RECORDING_QUALITY = 60
+
+# History recordings are rendered here so run() returns without blocking the event loop
+_recording_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="agent-recording")
+
+
+def _gif_to_webp(gif_path: str, webp_path: str, quality: int = WEBP_RECORDING_QUALITY):
+    """Re-encodes an animated GIF as a (much smaller) lossy animated WebP."""
+    from PIL import Image, ImageSequence
+
+    with Image.open(gif_path) as gif:
+        frames, durations = [], []
+        for frame in ImageSequence.Iterator(gif):
+            frames.append(frame.convert("RGB"))
+            durations.append(frame.info.get("duration", 3000))
+    frames[0].save(
+        webp_path, format="WEBP", save_all=True, append_images=frames[1:], duration=durations, loop=0,
+        quality=quality, method=4,
+    )
+
+
+def render_history_recording(task: str, history: AgentHistoryList, output_path: str) -> str | None:
+    """
+    Renders the agent history as an animated GIF, or as a compact animated WebP if
+    `output_path` ends with .webp. Returns the written path, or None if there was nothing to render.
+    """
+    try:
+        history = get_screenshot_store().resolve_history(history)
+        if output_path.lower().endswith(".webp"):
+            gif_path = os.path.splitext(output_path)[0] + ".tmp.gif"
+            create_history_gif(task=task, history=history, output_path=gif_path)
+            if os.path.exists(gif_path):
+                _gif_to_webp(gif_path, output_path)
+                os.remove(gif_path)
+        else:
+            create_history_gif(task=task, history=history, output_path=output_path)
+    except Exception as e:
+        logger.error(f"Failed to render history recording {output_path}: {e}", exc_info=True)
+        return None
+    return output_path if os.path.exists(output_path) else None
+
 
 class BrowserUseAgent(Agent):
     def _set_tool_calling_method(self) -> ToolCallingMethod | None:
@@ -49,9 +94,19 @@ class BrowserUseAgent(Agent):
             self, max_steps: int = 100, on_step_start: AgentHookFunc | None = None,
             on_step_end: AgentHookFunc | None = None
     ) -> AgentHistoryList:
-        """Execute the task with maximum number of steps"""
+        """
+        Execute the task with maximum number of steps.
+
+        Step screenshots are moved to the screenshot store as they are recorded, so the history
+        (and the JSON written by save_history) holds store references instead of base64 data.
+        If `settings.generate_gif` is set, the recording is rendered in the background after the
+        run; `recording_future` resolves to its path (or None) once it is written.
+        """
 
         loop = asyncio.get_event_loop()
+        self.recording_future: asyncio.Future | None = None
+        if llm_run_key.get() is None:  # Sub-agents queue LLM calls under their parent's run
+            llm_run_key.set(f"browser_use:{self.state.agent_id}")
 
         # Set up the Ctrl+C signal handler with callbacks specific to this agent
         from browser_use.utils import SignalHandler
@@ -99,6 +154,7 @@ class BrowserUseAgent(Agent):
 
                 step_info = AgentStepInfo(step_number=step, max_steps=max_steps)
                 await self.step(step_info)
+                get_screenshot_store().store_history(self.state.history)
 
                 if on_step_end is not None:
                     await on_step_end(self)
@@ -160,10 +216,15 @@ class BrowserUseAgent(Agent):
                     logger.error(f'Failed to save Playwright script: {script_gen_err}', exc_info=True)
 
             await self.close()
+            get_screenshot_store().store_history(self.state.history)
 
             if self.settings.generate_gif:
                 output_path: str = 'agent_history.gif'
                 if isinstance(self.settings.generate_gif, str):
                     output_path = self.settings.generate_gif
 
-                create_history_gif(task=self.task, history=self.state.history, output_path=output_path)
+                # Snapshot the history list: a follow-up task may append to it while rendering
+                history = AgentHistoryList(history=list(self.state.history.history))
+                self.recording_future = loop.run_in_executor(
+                    _recording_executor, render_history_recording, self.task, history, output_path
+                )
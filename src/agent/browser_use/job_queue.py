@@ -0,0 +1,465 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional
+
+from browser_use.agent.views import AgentOutput
+from browser_use.browser.browser import BrowserConfig
+from browser_use.browser.context import BrowserContextConfig
+from browser_use.browser.views import BrowserState
+
+from src.agent.browser_use.browser_use_agent import BrowserUseAgent
+from src.browser.custom_browser import CustomBrowser
+from src.controller.custom_controller import CustomController
+from src.utils import llm_provider
+
+if TYPE_CHECKING:
+    from src.agent.browser_use.process_backend import ProcessAgentPool
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_JOB_DIR = "./tmp/jobs"
+JOB_DB_FILENAME = "jobs.db"
+DEFAULT_NUM_WORKERS = int(os.getenv("WEBUI_JOB_WORKERS", "2"))
+# A job worker closes its browser after this many seconds without a job
+WORKER_BROWSER_IDLE_TIMEOUT = float(os.getenv("WEBUI_JOB_BROWSER_IDLE_TIMEOUT", "300"))
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+TERMINAL_JOB_STATUSES = (JOB_COMPLETED, JOB_FAILED, JOB_CANCELLED)
+
+_JOB_COLUMNS = (
+    "id", "session_key", "task", "params", "status", "steps", "result", "error", "history_file",
+    "created_at", "started_at", "finished_at",
+)
+
+
+class JobStore:
+    """
+    Persistent SQLite queue of browser agent jobs. Job parameters are stored as JSON so that
+    queued jobs survive a restart; secrets such as API keys are never written here.
+    """
+
+    def __init__(self, job_dir: str = DEFAULT_JOB_DIR):
+        os.makedirs(job_dir, exist_ok=True)
+        self.job_dir = job_dir
+        self.db_path = os.path.join(job_dir, JOB_DB_FILENAME)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, session_key TEXT, task TEXT, params TEXT, status TEXT, "
+                "steps INTEGER DEFAULT 0, result TEXT, error TEXT, history_file TEXT, "
+                "created_at REAL, started_at REAL, finished_at REAL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at)")
+
+    @staticmethod
+    def _row_to_job(row) -> Dict[str, Any]:
+        job = dict(zip(_JOB_COLUMNS, row))
+        job["params"] = json.loads(job["params"]) if job["params"] else {}
+        return job
+
+    def add(self, task: str, params: Dict[str, Any], session_key: Optional[str] = None) -> str:
+        job_id = str(uuid.uuid4())
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO jobs (id, session_key, task, params, status, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, session_key, task, json.dumps(params, ensure_ascii=False), JOB_QUEUED, time.time()),
+            )
+        return job_id
+
+    def claim_next(self) -> Optional[Dict[str, Any]]:
+        """Atomically marks the oldest queued job as running and returns it."""
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                f"SELECT {', '.join(_JOB_COLUMNS)} FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1",
+                (JOB_QUEUED,),
+            ).fetchone()
+            if not row:
+                return None
+            job = self._row_to_job(row)
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, started_at = ? WHERE id = ?", (JOB_RUNNING, time.time(), job["id"])
+            )
+        job["status"] = JOB_RUNNING
+        return job
+
+    def update(self, job_id: str, **fields: Any):
+        if not fields:
+            return
+        if fields.get("status") in TERMINAL_JOB_STATUSES:
+            fields.setdefault("finished_at", time.time())
+        assignments = ", ".join(f"{column} = ?" for column in fields)
+        with self._lock, self._conn:
+            self._conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(_JOB_COLUMNS)} FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def list_jobs(self, session_key: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        query = f"SELECT {', '.join(_JOB_COLUMNS)} FROM jobs"
+        args: tuple = ()
+        if session_key:
+            query += " WHERE session_key = ?"
+            args = (session_key,)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        with self._lock:
+            rows = self._conn.execute(query, (*args, limit)).fetchall()
+        return [self._row_to_job(row) for row in rows]
+
+    def requeue_interrupted(self) -> int:
+        """Puts jobs left running by a previous process back in the queue."""
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, started_at = NULL, steps = 0 WHERE status = ?", (JOB_QUEUED, JOB_RUNNING)
+            )
+        return cursor.rowcount
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def _browser_config_from_params(browser_params: Dict[str, Any]) -> BrowserConfig:
+    return BrowserConfig(
+        headless=browser_params.get("headless", True),
+        disable_security=browser_params.get("disable_security", False),
+        browser_binary_path=browser_params.get("browser_binary_path"),
+        extra_browser_args=browser_params.get("extra_browser_args", []),
+        wss_url=browser_params.get("wss_url"),
+        cdp_url=browser_params.get("cdp_url"),
+        new_context_config=BrowserContextConfig(
+            window_width=browser_params.get("window_width", 1280),
+            window_height=browser_params.get("window_height", 1100),
+        ),
+    )
+
+
+async def run_browser_job(
+        job: Dict[str, Any],
+        browser: CustomBrowser,
+        secrets: Optional[Dict[str, str]] = None,
+        on_step: Optional[Callable[[Dict[str, Any]], Any]] = None,
+        on_agent: Optional[Callable[[BrowserUseAgent], Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Runs one queued job on `browser` in a fresh context and returns the fields to store
+    (status, result, error, history_file, steps). `on_step` receives a small dict per agent
+    step; `on_agent` receives the agent once created so the caller can stop or pause it.
+    """
+    params = job["params"]
+    secrets = secrets or {}
+    llm_params = params.get("llm", {})
+    agent_params = params.get("agent", {})
+    browser_params = params.get("browser", {})
+    job_dir = os.path.join(params.get("save_agent_history_path") or DEFAULT_JOB_DIR, job["id"])
+    os.makedirs(job_dir, exist_ok=True)
+    history_file = os.path.join(job_dir, f"{job['id']}.json")
+
+    controller = CustomController()
+    browser_context = None
+    steps = 0
+    try:
+        try:
+            llm = llm_provider.get_llm_model(
+                provider=llm_params.get("provider"),
+                model_name=llm_params.get("model_name"),
+                temperature=llm_params.get("temperature", 0.6),
+                base_url=llm_params.get("base_url") or None,
+                api_key=secrets.get("llm_api_key") or None,
+                num_ctx=llm_params.get("num_ctx") if llm_params.get("provider") == "ollama" else None,
+                cache_mode=llm_params.get("cache_mode"),
+                cache_namespace=llm_params.get("cache_namespace") or "browser_use_agent",
+            )
+        except Exception as e:
+            # A configuration problem of this job, not of the worker's browser
+            logger.error(f"Failed to set up the LLM for job {job['id']}: {e}")
+            return {"status": JOB_FAILED, "error": f"LLM setup failed: {e}", "steps": 0}
+        await controller.setup_mcp_client(params.get("mcp_server_config"))
+        browser_context = await browser.new_context(
+            config=BrowserContextConfig(
+                save_downloads_path=params.get("save_download_path") or None,
+                window_width=browser_params.get("window_width", 1280),
+                window_height=browser_params.get("window_height", 1100),
+            )
+        )
+
+        async def step_callback(state: BrowserState, output: AgentOutput, step_num: int):
+            nonlocal steps
+            steps = step_num
+            if on_step:
+                on_step({
+                    "step": step_num,
+                    "url": getattr(state, "url", None),
+                    "goal": output.current_state.next_goal if output and output.current_state else None,
+                })
+
+        agent = BrowserUseAgent(
+            task=job["task"],
+            llm=llm,
+            browser=browser,
+            browser_context=browser_context,
+            controller=controller,
+            register_new_step_callback=step_callback,
+            use_vision=agent_params.get("use_vision", True),
+            override_system_message=agent_params.get("override_system_message"),
+            extend_system_message=agent_params.get("extend_system_message"),
+            max_input_tokens=agent_params.get("max_input_tokens", 128000),
+            max_actions_per_step=agent_params.get("max_actions", 10),
+            tool_calling_method=agent_params.get("tool_calling_method", "auto"),
+            source="webui",
+        )
+        agent.state.agent_id = job["id"]
+        if params.get("generate_gif", True):
+            agent.settings.generate_gif = os.path.join(job_dir, f"{job['id']}.{params.get('recording_format', 'gif')}")
+        if on_agent:
+            on_agent(agent)
+
+        history = await agent.run(max_steps=agent_params.get("max_steps", 100))
+        agent.save_history(history_file)
+
+        if agent.state.stopped:
+            status, error = JOB_CANCELLED, None
+        elif history.is_done():
+            status, error = JOB_COMPLETED, None
+        else:
+            status = JOB_FAILED
+            error = "; ".join(str(e) for e in history.errors() if e) or "Task did not finish."
+        return {
+            "status": status,
+            "result": history.final_result(),
+            "error": error,
+            "history_file": history_file,
+            "steps": steps,
+        }
+    finally:
+        if browser_context:
+            try:
+                await browser_context.close()
+            except Exception as e:
+                logger.error(f"Error closing job browser context: {e}")
+        await controller.close_mcp_client()
+
+
+class WorkerBrowser:
+    """
+    A job worker's browser, relaunched when a job needs a different browser config and
+    closed once it has been idle for `idle_timeout` seconds (see close_if_idle).
+    """
+
+    def __init__(self, worker_id: int, idle_timeout: float = WORKER_BROWSER_IDLE_TIMEOUT):
+        self.worker_id = worker_id
+        self.idle_timeout = idle_timeout
+        self.browser: Optional[CustomBrowser] = None
+        self.browser_key: Optional[str] = None
+        self.last_used = time.monotonic()
+
+    async def ensure_browser(self, browser_params: Dict[str, Any]) -> CustomBrowser:
+        browser_key = json.dumps(browser_params, sort_keys=True)
+        if self.browser and browser_key != self.browser_key:
+            await self.close()
+        if not self.browser:
+            self.browser = CustomBrowser(config=_browser_config_from_params(browser_params))
+            self.browser_key = browser_key
+        self.last_used = time.monotonic()
+        return self.browser
+
+    async def close_if_idle(self):
+        if self.browser and time.monotonic() - self.last_used >= self.idle_timeout:
+            logger.info(f"Closing idle browser of job worker {self.worker_id}.")
+            await self.close()
+
+    async def close(self):
+        if self.browser:
+            try:
+                await self.browser.close()
+            except Exception as e:
+                logger.error(f"Error closing browser of job worker {self.worker_id}: {e}")
+            self.browser = None
+            self.browser_key = None
+
+
+class BrowserJobQueue:
+    """
+    Runs browser agent jobs from a JobStore on `num_workers` worker coroutines, each owning
+    one CustomBrowser that is reused across the jobs it runs. Execution does not depend on
+    any UI connection: jobs keep running when the submitting tab is closed, and jobs that
+    were running when the process stopped are queued again on start().
+
+    With a `process_pool`, the workers only dispatch: each job runs in an agent worker
+    process that owns the browser instead.
+
+    Progress is published to subscribe() queues as dicts with "type" (queued, started, step,
+    finished), "job_id" and event specific fields.
+
+    `can_launch(count)` tells whether `count` more browsers fit under the application's
+    global browser cap; a worker that would need a new browser leaves jobs queued until it does.
+    """
+
+    def __init__(
+            self, store: JobStore, num_workers: int = DEFAULT_NUM_WORKERS,
+            process_pool: Optional["ProcessAgentPool"] = None,
+            can_launch: Optional[Callable[[int], bool]] = None,
+    ):
+        self.store = store
+        self.process_pool = process_pool
+        self.can_launch = can_launch
+        self.num_workers = max(1, process_pool.num_workers if process_pool else num_workers)
+        self._workers: List[WorkerBrowser] = []
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup = asyncio.Event()
+        self._secrets: Dict[str, Dict[str, str]] = {}
+        self._running_agents: Dict[str, Any] = {}  # BrowserUseAgent or ProcessRunHandle
+        self._subscribers: List[asyncio.Queue] = []
+
+    @property
+    def started(self) -> bool:
+        return bool(self._tasks)
+
+    def start(self):
+        if self._tasks:
+            return
+        requeued = self.store.requeue_interrupted()
+        if requeued:
+            logger.info(f"Re-queued {requeued} interrupted jobs.")
+        self._workers = [WorkerBrowser(worker_id) for worker_id in range(self.num_workers)]
+        self._tasks = [asyncio.create_task(self._work(worker)) for worker in self._workers]
+        logger.info(f"Job queue started with {self.num_workers} workers ({self.store.db_path}).")
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue()
+        self._subscribers.append(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        if queue in self._subscribers:
+            self._subscribers.remove(queue)
+
+    def _publish(self, event_type: str, job_id: str, **data: Any):
+        event = {"type": event_type, "job_id": job_id, **data}
+        for queue in self._subscribers:
+            queue.put_nowait(event)
+
+    def active_browsers(self) -> int:
+        if self.process_pool:
+            return self.process_pool.browser_count()
+        return sum(1 for worker in self._workers if worker.browser)
+
+    def submit(
+            self, task: str, params: Dict[str, Any], session_key: Optional[str] = None,
+            secrets: Optional[Dict[str, str]] = None,
+    ) -> str:
+        """
+        Queues a job and returns its id. `secrets` are kept in memory only; the job records
+        just their names, so a job re-queued after a restart is failed instead of run without them.
+        """
+        if secrets:
+            params = {**params, "secret_names": sorted(secrets)}
+        job_id = self.store.add(task, params, session_key)
+        if secrets:
+            self._secrets[job_id] = secrets
+        self._publish("queued", job_id, task=task)
+        self._wakeup.set()
+        return job_id
+
+    def cancel(self, job_id: str) -> bool:
+        job = self.store.get(job_id)
+        if not job or job["status"] in TERMINAL_JOB_STATUSES:
+            return False
+        agent = self._running_agents.get(job_id)
+        if agent:
+            agent.stop()  # The worker records the job as cancelled when the run returns
+        elif job["status"] == JOB_QUEUED:
+            self.store.update(job_id, status=JOB_CANCELLED)
+            self._secrets.pop(job_id, None)
+            self._publish("finished", job_id, status=JOB_CANCELLED)
+        return True
+
+    def _needs_new_browser(self, worker: WorkerBrowser) -> bool:
+        if self.process_pool:
+            return not self.process_pool.has_idle_browser()
+        return worker.browser is None
+
+    async def _work(self, worker: WorkerBrowser):
+        while True:
+            await worker.close_if_idle()
+            if self.can_launch and self._needs_new_browser(worker) and not self.can_launch(1):
+                await asyncio.sleep(5.0)  # At the global browser cap; the job stays queued
+                continue
+            job = self.store.claim_next()
+            if not job:
+                self._wakeup.clear()
+                try:
+                    # Jobs can also be added by another process sharing the database
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=5.0)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._run(worker, job)
+
+    async def _run(self, worker: WorkerBrowser, job: Dict[str, Any]):
+        job_id = job["id"]
+        logger.info(f"Worker {worker.worker_id} running job {job_id}: {job['task']}")
+        self._publish("started", job_id, worker=worker.worker_id)
+
+        def on_step(step: Dict[str, Any]):
+            self.store.update(job_id, steps=step["step"])
+            self._publish("step", job_id, **step)
+
+        def on_agent(agent: BrowserUseAgent):
+            self._running_agents[job_id] = agent
+
+        secrets = self._secrets.get(job_id, {})
+        missing_secrets = [name for name in job["params"].get("secret_names", []) if name not in secrets]
+        try:
+            if missing_secrets:
+                logger.warning(f"Job {job_id} lost its secrets ({', '.join(missing_secrets)}) in a restart.")
+                outcome = {
+                    "status": JOB_FAILED,
+                    "error": "The job's API key was only kept in memory and was lost when the server "
+                             "restarted. Re-enter the API key and queue the task again.",
+                }
+            elif self.process_pool:
+                handle = self.process_pool.create_handle(job_id, on_step)
+                on_agent(handle)
+                outcome = await self.process_pool.run(handle, job, secrets)
+            else:
+                browser = await worker.ensure_browser(job["params"].get("browser", {}))
+                outcome = await run_browser_job(job, browser, secrets, on_step, on_agent)
+        except asyncio.CancelledError:
+            self.store.update(job_id, status=JOB_QUEUED, started_at=None)  # Picked up again on restart
+            raise
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {e}", exc_info=True)
+            outcome = {"status": JOB_FAILED, "error": str(e)}
+            await worker.close()  # Start the next job on a fresh browser
+        finally:
+            self._running_agents.pop(job_id, None)
+        self._secrets.pop(job_id, None)
+        self.store.update(job_id, **outcome)
+        self._publish("finished", job_id, status=outcome["status"], result=outcome.get("result"),
+                      error=outcome.get("error"))
+
+    async def close(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for worker in self._workers:
+            await worker.close()
+        self._workers = []
+        self.store.close()
@@ -0,0 +1,291 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from src.agent.browser_use.job_queue import JOB_CANCELLED, JOB_FAILED, WorkerBrowser, run_browser_job
+
+logger = logging.getLogger(__name__)
+
+# Worker processes for BrowserUseAgent runs; 0 keeps every run in the UI process
+DEFAULT_PROCESS_WORKERS = int(os.getenv("AGENT_PROCESS_WORKERS", "0"))
+# Each worker process owns a browser, so there are never more workers than the app's browser cap
+MAX_PROCESS_WORKERS = int(os.getenv("WEBUI_MAX_BROWSERS", "4"))
+IDLE_CHECK_INTERVAL = 30.0  # Seconds between idle browser checks of a waiting worker process
+
+
+# --- Child process side ---
+
+
+def _worker_main(inbox, control, outbox):
+    """Entry point of a worker process: runs jobs from `inbox` one at a time."""
+    asyncio.run(_worker_loop(inbox, control, outbox))
+
+
+async def _worker_loop(inbox, control, outbox):
+    loop = asyncio.get_running_loop()
+    worker = WorkerBrowser(os.getpid())
+    running: Dict[str, Any] = {}
+    pending_commands: Dict[str, List[str]] = {}
+
+    def apply_command(job_id: str, command: str):
+        agent = running.get(job_id)
+        if agent:
+            getattr(agent, command)()
+        else:
+            pending_commands.setdefault(job_id, []).append(command)
+
+    def read_control():
+        while True:
+            message = control.get()
+            if message is None:
+                return
+            loop.call_soon_threadsafe(apply_command, *message)
+
+    threading.Thread(target=read_control, daemon=True).start()
+
+    def browser_closed():
+        outbox.put((None, "browser_closed", {"pid": os.getpid()}))
+
+    while True:
+        try:
+            message = await loop.run_in_executor(None, inbox.get, True, IDLE_CHECK_INTERVAL)
+        except queue.Empty:
+            if worker.browser:
+                await worker.close_if_idle()
+                if not worker.browser:
+                    browser_closed()
+            continue
+        if message is None:
+            break
+        job, secrets = message
+        job_id = job["id"]
+
+        def on_agent(agent):
+            running[job_id] = agent
+            for command in pending_commands.pop(job_id, []):
+                getattr(agent, command)()
+
+        try:
+            browser = await worker.ensure_browser(job["params"].get("browser", {}))
+            outcome = await run_browser_job(
+                job, browser, secrets, on_step=lambda step: outbox.put((job_id, "step", step)), on_agent=on_agent
+            )
+        except Exception as e:
+            logger.error(f"Job {job_id} failed in worker process {os.getpid()}: {e}", exc_info=True)
+            outcome = {"status": JOB_FAILED, "error": str(e)}
+            await worker.close()
+            browser_closed()
+        finally:
+            running.pop(job_id, None)
+            pending_commands.pop(job_id, None)
+        outbox.put((job_id, "finished", outcome))
+    await worker.close()
+
+
+# --- Parent process side ---
+
+
+class _ProcessWorker:
+    def __init__(self, ctx, outbox):
+        self.inbox = ctx.Queue()
+        self.control = ctx.Queue()
+        self.process = ctx.Process(target=_worker_main, args=(self.inbox, self.control, outbox), daemon=True)
+        self.process.start()
+        self.has_browser = False  # Set by the jobs it runs, cleared when the worker closes its browser
+
+    def is_alive(self) -> bool:
+        return self.process.is_alive()
+
+    def request_shutdown(self):
+        try:
+            self.inbox.put(None)
+            self.control.put(None)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not ask agent worker process {self.process.pid} to exit: {e}")
+
+    def join(self, timeout: float = 10):
+        self.process.join(timeout=timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+
+
+class ProcessRunHandle:
+    """
+    Parent-side handle of one agent run in a worker process. Offers the agent's
+    stop()/pause()/resume() so callers can treat it like a local BrowserUseAgent;
+    the commands are forwarded to the worker over IPC.
+    """
+
+    def __init__(self, job_id: str, on_step: Optional[Callable[[Dict[str, Any]], Any]] = None):
+        self.job_id = job_id
+        self.on_step = on_step
+        self.stopped = False
+        self._worker: Optional[_ProcessWorker] = None
+        self._future: asyncio.Future = asyncio.get_running_loop().create_future()
+
+    def _send(self, command: str):
+        if self._worker:
+            self._worker.control.put((self.job_id, command))
+
+    def stop(self):
+        self.stopped = True
+        self._send("stop")
+
+    def pause(self):
+        self._send("pause")
+
+    def resume(self):
+        self._send("resume")
+
+    def _on_event(self, kind: str, data: Dict[str, Any]):
+        if kind == "step" and self.on_step:
+            self.on_step(data)
+        elif kind == "finished" and not self._future.done():
+            self._future.set_result(data)
+
+
+class ProcessAgentPool:
+    """
+    Runs BrowserUseAgent jobs (see job_queue.run_browser_job) in `num_workers` spawned
+    worker processes, so DOM processing, LLM output parsing and GIF building of concurrent
+    runs use separate cores. Each worker keeps its own browser between jobs. Step callbacks
+    stream back to the parent and stop/pause/resume are sent to the worker over IPC. A worker
+    that dies mid-run fails its job and is replaced.
+    """
+
+    def __init__(self, num_workers: int = DEFAULT_PROCESS_WORKERS):
+        if num_workers > MAX_PROCESS_WORKERS:
+            logger.warning(f"Limiting agent worker processes to the browser cap of {MAX_PROCESS_WORKERS}.")
+        self.num_workers = max(1, min(num_workers, MAX_PROCESS_WORKERS))
+        self._ctx = multiprocessing.get_context("spawn")
+        self._outbox = None
+        self._idle: Optional[asyncio.Queue] = None
+        self._workers: List[_ProcessWorker] = []
+        self._handles: Dict[str, ProcessRunHandle] = {}
+        self._busy: Dict[str, _ProcessWorker] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._closed = False
+
+    @property
+    def started(self) -> bool:
+        return self._idle is not None
+
+    def start(self):
+        if self.started:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._outbox = self._ctx.Queue()
+        self._idle = asyncio.Queue()
+        for _ in range(self.num_workers):
+            worker = _ProcessWorker(self._ctx, self._outbox)
+            self._workers.append(worker)
+            self._idle.put_nowait(worker)
+        threading.Thread(target=self._read_events, daemon=True).start()
+        logger.info(f"Started {self.num_workers} agent worker processes.")
+
+    def _read_events(self):
+        while not self._closed:
+            try:
+                job_id, kind, data = self._outbox.get(timeout=1.0)
+            except queue.Empty:
+                self._loop.call_soon_threadsafe(self._check_workers)
+                continue
+            except (EOFError, OSError):
+                return
+            if kind == "browser_closed":
+                self._loop.call_soon_threadsafe(self._on_browser_closed, data["pid"])
+                continue
+            handle = self._handles.get(job_id)
+            if handle:
+                self._loop.call_soon_threadsafe(handle._on_event, kind, data)
+
+    def _on_browser_closed(self, pid: int):
+        for worker in self._workers:
+            if worker.process.pid == pid:
+                worker.has_browser = False
+
+    def _check_workers(self):
+        for job_id, worker in list(self._busy.items()):
+            handle = self._handles.get(job_id)
+            if handle and not worker.is_alive():
+                handle._on_event("finished", {"status": JOB_FAILED, "error": "Agent worker process exited."})
+
+    def create_handle(
+            self, job_id: str, on_step: Optional[Callable[[Dict[str, Any]], Any]] = None
+    ) -> ProcessRunHandle:
+        return ProcessRunHandle(job_id, on_step)
+
+    def busy_count(self) -> int:
+        return len(self._busy)
+
+    def browser_count(self) -> int:
+        """Workers holding a browser: those running a job and those whose browser is not idle-closed yet."""
+        return sum(1 for worker in self._workers if worker.has_browser or worker in self._busy.values())
+
+    def has_idle_browser(self) -> bool:
+        """Whether a worker without a job still holds a browser that the next job can reuse."""
+        busy = list(self._busy.values())
+        return any(worker.has_browser and worker not in busy for worker in self._workers)
+
+    async def run(
+            self, handle: ProcessRunHandle, job: Dict[str, Any], secrets: Optional[Dict[str, str]] = None
+    ) -> Dict[str, Any]:
+        """Runs `job` on the next free worker process and returns the run_browser_job outcome."""
+        if not self.started:
+            self.start()
+        worker = await self._idle.get()
+        try:
+            if handle.stopped:
+                return {"status": JOB_CANCELLED}
+            handle._worker = worker
+            worker.has_browser = True
+            self._handles[job["id"]] = handle
+            self._busy[job["id"]] = worker
+            worker.inbox.put((job, secrets or {}))
+            return await handle._future
+        finally:
+            self._handles.pop(job["id"], None)
+            self._busy.pop(job["id"], None)
+            handle._worker = None
+            if not worker.is_alive() and not self._closed:
+                logger.warning("Replacing exited agent worker process.")
+                self._workers.remove(worker)
+                worker = _ProcessWorker(self._ctx, self._outbox)
+                self._workers.append(worker)
+            self._idle.put_nowait(worker)
+
+    def close(self):
+        """Stops the worker processes; each closes its browser before exiting."""
+        if self._closed:
+            return
+        self._closed = True
+        for worker in self._workers:
+            worker.request_shutdown()
+        for worker in self._workers:
+            worker.join()
+        self._workers = []
+        if self.started:
+            logger.info("Agent worker processes stopped.")
+
+
+_process_pool: Optional[ProcessAgentPool] = None
+
+
+def get_process_agent_pool() -> Optional[ProcessAgentPool]:
+    """The process-wide agent worker pool, or None when AGENT_PROCESS_WORKERS is 0."""
+    global _process_pool
+    if DEFAULT_PROCESS_WORKERS <= 0:
+        return None
+    if _process_pool is None:
+        _process_pool = ProcessAgentPool(DEFAULT_PROCESS_WORKERS)
+    return _process_pool
+
+
+def close_process_agent_pool():
+    """Stops the process-wide agent worker pool, if one was started; called on app shutdown."""
+    if _process_pool is not None:
+        _process_pool.close()
@@ -0,0 +1,227 @@
+import base64
+import dataclasses
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+import zipfile
+from typing import Any, Dict, List, Optional
+
+from browser_use.agent.views import AgentHistoryList
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SCREENSHOT_DIR = os.getenv("SCREENSHOT_STORE_DIR", "./tmp/screenshots")
+SCREENSHOT_REF_PREFIX = "sha256:"
+# Retention: frames not written or reused for this many days are deleted, and the oldest frames
+# go first once the store exceeds the size limit. 0 disables the respective rule.
+SCREENSHOT_RETENTION_DAYS = float(os.getenv("SCREENSHOT_RETENTION_DAYS", "7"))
+SCREENSHOT_STORE_MAX_MB = float(os.getenv("SCREENSHOT_STORE_MAX_MB", "1024"))
+PRUNE_INTERVAL = 600  # Seconds between retention passes triggered by writes
+_SCREENSHOT_ID_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+
+def is_screenshot_ref(value: Any) -> bool:
+    return isinstance(value, str) and value.startswith(SCREENSHOT_REF_PREFIX)
+
+
+def screenshot_content_type(data: bytes) -> str:
+    return "image/png" if data.startswith(b"\x89PNG") else "image/jpeg"
+
+
+def _extension(data: bytes) -> str:
+    return "png" if data.startswith(b"\x89PNG") else "jpg"
+
+
+class ScreenshotStore:
+    """
+    Content-addressed store for agent screenshots. Frames are written once under the sha256
+    of their image bytes, so identical screenshots (an unchanged page across steps or runs)
+    share one file. Agent history keeps `sha256:<id>` references in place of base64 data,
+    and is resolved back through the store when the screenshots are needed.
+
+    The store is pruned on the first write and then at most every PRUNE_INTERVAL seconds while frames
+    are written (see prune). Histories referencing a pruned frame load without that screenshot.
+    """
+
+    def __init__(
+            self,
+            root: str = DEFAULT_SCREENSHOT_DIR,
+            retention_days: float = SCREENSHOT_RETENTION_DAYS,
+            max_mb: float = SCREENSHOT_STORE_MAX_MB,
+    ):
+        self.root = root
+        self.max_age = retention_days * 86400
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._prune_lock = threading.Lock()
+        self._last_prune = 0.0
+
+    def path(self, screenshot_id: str) -> str:
+        return os.path.join(self.root, screenshot_id[:2], screenshot_id)
+
+    def put_bytes(self, data: bytes) -> str:
+        """Stores the image bytes (if not already stored) and returns their id."""
+        screenshot_id = hashlib.sha256(data).hexdigest()
+        path = self.path(screenshot_id)
+        self._maybe_prune()
+        if os.path.exists(path):
+            try:
+                os.utime(path)  # Reused frames count as fresh for retention
+            except FileNotFoundError:
+                pass  # Pruned meanwhile; written again below
+            else:
+                return screenshot_id
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Unique temp name per writer: threads and job worker processes share the directory
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        return screenshot_id
+
+    def put(self, screenshot_b64: str) -> str:
+        """Stores a base64 screenshot and returns its id."""
+        return self.put_bytes(base64.b64decode(screenshot_b64))
+
+    def _maybe_prune(self):
+        now = time.monotonic()
+        if self._last_prune and now - self._last_prune < PRUNE_INTERVAL:
+            return
+        if not self._prune_lock.acquire(blocking=False):
+            return  # Another thread is pruning
+        try:
+            self._last_prune = now
+            self.prune()
+        except Exception as e:
+            logger.error(f"Failed to prune screenshot store: {e}")
+        finally:
+            self._prune_lock.release()
+
+    def prune(self) -> int:
+        """
+        Applies the retention rules and returns the number of frames deleted. Frames last
+        written or reused more than `max_age` seconds ago are deleted first; if the rest is
+        still larger than `max_bytes`, the least recently used frames go until it fits.
+        Leftover temp files of interrupted writes are removed as well.
+        """
+        if not os.path.isdir(self.root):
+            return 0
+        now = time.time()
+        frames = []
+        for entry in os.scandir(self.root):
+            if not entry.is_dir():
+                continue
+            for file in os.scandir(entry.path):
+                try:
+                    stat = file.stat()
+                except FileNotFoundError:
+                    continue
+                if file.name.endswith(".tmp"):
+                    if now - stat.st_mtime > 3600:
+                        self._remove(file.path)
+                    continue
+                frames.append((stat.st_mtime, stat.st_size, file.path))
+
+        frames.sort()
+        expired = [frame for frame in frames if self.max_age and now - frame[0] > self.max_age]
+        kept = frames[len(expired):]
+        total = sum(size for _, size, _ in kept)
+        over_size = 0
+        while self.max_bytes and total > self.max_bytes and over_size < len(kept):
+            total -= kept[over_size][1]
+            over_size += 1
+        removed = 0
+        for _, _, path in expired + kept[:over_size]:
+            removed += self._remove(path)
+        if removed:
+            logger.info(f"Pruned {removed} screenshots from {self.root} ({total / 1024 / 1024:.1f} MB kept).")
+        return removed
+
+    @staticmethod
+    def _remove(path: str) -> int:
+        try:
+            os.remove(path)
+            return 1
+        except FileNotFoundError:
+            return 0
+
+    def get_bytes(self, screenshot_id: str) -> Optional[bytes]:
+        if not _SCREENSHOT_ID_PATTERN.match(screenshot_id):
+            return None
+        try:
+            with open(self.path(screenshot_id), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            logger.warning(f"Screenshot {screenshot_id} is missing from the store.")
+            return None
+
+    def get(self, screenshot_id: str) -> Optional[str]:
+        data = self.get_bytes(screenshot_id)
+        return base64.b64encode(data).decode("ascii") if data is not None else None
+
+    def to_ref(self, screenshot_b64: str) -> str:
+        return SCREENSHOT_REF_PREFIX + self.put(screenshot_b64)
+
+    def resolve(self, value: Optional[str]) -> Optional[str]:
+        """Returns base64 screenshot data for a reference; other values are returned unchanged."""
+        if not is_screenshot_ref(value):
+            return value
+        return self.get(value[len(SCREENSHOT_REF_PREFIX):])
+
+    def store_history(self, history: AgentHistoryList) -> int:
+        """Replaces inline screenshots in `history` with store references, in place."""
+        stored = 0
+        for item in history.history:
+            screenshot = item.state.screenshot if item.state else None
+            if screenshot and not is_screenshot_ref(screenshot):
+                item.state.screenshot = self.to_ref(screenshot)
+                stored += 1
+        return stored
+
+    def resolve_history(self, history: AgentHistoryList) -> AgentHistoryList:
+        """Returns a copy of `history` with screenshot references resolved to base64 data."""
+        items = []
+        for item in history.history:
+            if item.state and is_screenshot_ref(item.state.screenshot):
+                state = dataclasses.replace(item.state, screenshot=self.resolve(item.state.screenshot))
+                item = item.model_copy(update={"state": state})
+            items.append(item)
+        return AgentHistoryList(history=items)
+
+    def export_history_bundle(self, history_file: str, bundle_path: str) -> str:
+        """
+        Writes a zip with the history JSON and every screenshot it references
+        (as screenshots/<id>.png|jpg), so the history can be downloaded self-contained.
+        """
+        with open(history_file, "r", encoding="utf-8") as f:
+            history_data: Dict[str, Any] = json.load(f)
+        screenshot_ids: List[str] = []
+        for item in history_data.get("history", []):
+            screenshot = (item.get("state") or {}).get("screenshot")
+            if is_screenshot_ref(screenshot):
+                screenshot_id = screenshot[len(SCREENSHOT_REF_PREFIX):]
+                if screenshot_id not in screenshot_ids:
+                    screenshot_ids.append(screenshot_id)
+
+        # Images are already compressed, so they are stored as-is
+        with zipfile.ZipFile(bundle_path, "w", compression=zipfile.ZIP_STORED) as bundle:
+            bundle.write(history_file, os.path.basename(history_file), compress_type=zipfile.ZIP_DEFLATED)
+            for screenshot_id in screenshot_ids:
+                data = self.get_bytes(screenshot_id)
+                if data is not None:
+                    bundle.writestr(f"screenshots/{screenshot_id}.{_extension(data)}", data)
+        return bundle_path
+
+
+_screenshot_store: Optional[ScreenshotStore] = None
+
+
+def get_screenshot_store() -> ScreenshotStore:
+    """The process-wide screenshot store."""
+    global _screenshot_store
+    if _screenshot_store is None:
+        _screenshot_store = ScreenshotStore()
+    return _screenshot_store
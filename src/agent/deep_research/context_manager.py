@@ -0,0 +1,180 @@
+import logging
+import re
+from typing import Dict, List, Optional
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage, ToolMessage
+
+logger = logging.getLogger(__name__)
+
+CATEGORY_PREFIX = "Current Research Category:"
+TASK_PREFIX = "Specific Task:"
+_TRUNCATION_MARKER = re.compile(r"\.\.\. \[truncated (\d+) characters\]$")
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token) that needs no tokenizer round-trip."""
+    return (len(text) + 3) // 4
+
+
+def _message_tokens(message: BaseMessage) -> int:
+    return estimate_tokens(str(message.content))
+
+
+def _messages_tokens(messages: List[BaseMessage]) -> int:
+    return sum(_message_tokens(message) for message in messages)
+
+
+def _prefixed_line(content: str, prefix: str) -> Optional[str]:
+    for line in content.splitlines():
+        if line.startswith(prefix):
+            return line[len(prefix):].strip()
+    return None
+
+
+def _truncate(text: str, max_tokens: int) -> str:
+    """
+    Cuts `text` to `max_tokens` including the truncation marker, so truncating again with the
+    same budget changes nothing. Cutting already truncated text further keeps the total count.
+    """
+    max_chars = max_tokens * 4
+    if len(text) <= max_chars:
+        return text
+    match = _TRUNCATION_MARKER.search(text)
+    body, removed = (text[:match.start()], int(match.group(1))) if match else (text, 0)
+    longest_marker = f"... [truncated {removed + len(body)} characters]"
+    keep = max(max_chars - len(longest_marker), 0)
+    return body[:keep] + f"... [truncated {removed + len(body) - keep} characters]"
+
+
+class ResearchContextManager:
+    """
+    Bounds the message history sent to the LLM by the research execution loop.
+
+    Policies, applied in order:
+    - tool output truncation: every ToolMessage is cut to `max_tool_output_tokens`.
+    - sliding window: only the last `max_turns` task turns (task prompt, AI response and
+      tool results) are kept verbatim.
+    - category summaries: turns that fall out of the window are folded into one rolling
+      digest per research category instead of being dropped (`summarize_categories`).
+
+    `tokens_saved` accumulates the estimated prompt tokens each policy removed.
+    """
+
+    def __init__(
+            self,
+            max_turns: Optional[int] = 6,
+            max_tool_output_tokens: Optional[int] = 2000,
+            summarize_categories: bool = True,
+            summary_tokens_per_turn: int = 150,
+    ):
+        self.max_turns = max_turns
+        self.max_tool_output_tokens = max_tool_output_tokens
+        self.summarize_categories = summarize_categories
+        self.summary_tokens_per_turn = summary_tokens_per_turn
+        self.tokens_saved: Dict[str, int] = {
+            "tool_output_truncation": 0,
+            "sliding_window": 0,
+            "category_summaries": 0,
+        }
+
+    @staticmethod
+    def _split_turns(messages: List[BaseMessage]) -> List[List[BaseMessage]]:
+        """Groups messages into task turns, each starting at a task HumanMessage."""
+        turns: List[List[BaseMessage]] = []
+        for message in messages:
+            if isinstance(message, HumanMessage) or not turns:
+                turns.append([message])
+            else:
+                turns[-1].append(message)
+        return turns
+
+    def _truncate_tool_outputs(self, messages: List[BaseMessage]) -> List[BaseMessage]:
+        if not self.max_tool_output_tokens:
+            return messages
+        truncated = []
+        for message in messages:
+            if isinstance(message, ToolMessage):
+                content = str(message.content)
+                short_content = _truncate(content, self.max_tool_output_tokens)
+                if short_content != content:
+                    self.tokens_saved["tool_output_truncation"] += estimate_tokens(content) - estimate_tokens(
+                        short_content)
+                    message = ToolMessage(content=short_content, tool_call_id=message.tool_call_id)
+            truncated.append(message)
+        return truncated
+
+    def _summarize_turns(self, turns: List[List[BaseMessage]]) -> str:
+        digests: Dict[str, List[str]] = {}
+        for turn in turns:
+            head = str(turn[0].content)
+            category = _prefixed_line(head, CATEGORY_PREFIX) or "Uncategorized"
+            task = _prefixed_line(head, TASK_PREFIX) or head
+            findings = " ".join(
+                str(message.content) for message in turn[1:]
+                if isinstance(message, ToolMessage) or (isinstance(message, AIMessage) and not message.tool_calls)
+            )
+            line = f"- {task}"
+            if findings:
+                line += f": {_truncate(findings, self.summary_tokens_per_turn)}"
+            digests.setdefault(category, []).append(line)
+
+        summary = "Summary of earlier research tasks (older turns condensed to save context):\n"
+        for category, lines in digests.items():
+            summary += f"\n### {category}\n" + "\n".join(lines) + "\n"
+        return summary
+
+    def prune(self, messages: List[BaseMessage]) -> List[BaseMessage]:
+        """
+        Cuts `messages` down to what build() can still use, so the history kept in the
+        checkpointed graph state stays small: tool outputs are truncated as build() would,
+        and turns outside the sliding window keep only their category summary budget
+        (or are dropped when summaries are off).
+        """
+        managed = self._truncate_tool_outputs(messages)
+        if self.max_turns is None:
+            return managed
+        turns = self._split_turns(managed)
+        keep = max(self.max_turns, 0)
+        if len(turns) <= keep:
+            return managed
+        old_turns, recent_turns = turns[:len(turns) - keep], turns[len(turns) - keep:]
+        pruned: List[BaseMessage] = []
+        if self.summarize_categories:
+            for turn in old_turns:
+                for message in turn:
+                    if isinstance(message, ToolMessage):
+                        message = ToolMessage(
+                            content=_truncate(str(message.content), self.summary_tokens_per_turn),
+                            tool_call_id=message.tool_call_id,
+                        )
+                    pruned.append(message)
+        return pruned + [message for turn in recent_turns for message in turn]
+
+    def build(self, messages: List[BaseMessage]) -> List[BaseMessage]:
+        """Returns the bounded history to send to the LLM; `messages` itself is left untouched."""
+        if not messages:
+            return messages
+
+        managed = self._truncate_tool_outputs(messages)
+        turns = self._split_turns(managed)
+        if self.max_turns is None or len(turns) <= self.max_turns:
+            return managed
+
+        keep = max(self.max_turns, 0)
+        old_turns, recent_turns = turns[:len(turns) - keep], turns[len(turns) - keep:]
+        recent = [message for turn in recent_turns for message in turn]
+        old_tokens = sum(_messages_tokens(turn) for turn in old_turns)
+
+        if not self.summarize_categories:
+            self.tokens_saved["sliding_window"] += old_tokens
+            return recent
+
+        summary = self._summarize_turns(old_turns)
+        self.tokens_saved["category_summaries"] += max(old_tokens - estimate_tokens(summary), 0)
+        return [SystemMessage(content=summary)] + recent
+
+    def log_savings(self):
+        logger.info(
+            "Research context tokens saved (estimated): "
+            + ", ".join(f"{policy}={tokens}" for policy, tokens in self.tokens_saved.items())
+        )
@@ -1,11 +1,13 @@
 import asyncio
+import inspect
 import json
 import logging
 import os
 import threading
+import time
 import uuid
 from pathlib import Path
-from typing import Any, Dict, List, Optional, TypedDict
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple, TypedDict
 
 from browser_use.browser.browser import BrowserConfig
 from langchain_community.tools.file_management import (
@@ -23,18 +25,27 @@ from langchain_core.messages import (
     ToolMessage,
 )
 from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import RunnableConfig
 from langchain_core.tools import StructuredTool, Tool
 
 # Langgraph imports
+import aiosqlite
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
 from langgraph.graph import StateGraph
 from pydantic import BaseModel, Field
 
 from browser_use.browser.context import BrowserContextConfig
 
 from src.agent.browser_use.browser_use_agent import BrowserUseAgent
-from src.browser.custom_browser import CustomBrowser
+from src.agent.browser_use.process_backend import ProcessAgentPool, get_process_agent_pool
+from src.browser.browser_pool import DEFAULT_IDLE_TIMEOUT, DEFAULT_MAX_USES_PER_BROWSER, BrowserPool
+from src.agent.deep_research.context_manager import ResearchContextManager, estimate_tokens
+from src.agent.deep_research.fast_fetch import TIER_BROWSER, FastFetcher, count_search_tiers, format_search_tiers
+from src.agent.deep_research.search_cache import SearchResultCache, get_model_id, normalize_query
 from src.controller.custom_controller import CustomController
-from src.utils.mcp_client import setup_mcp_client_and_tools
+from src.utils.mcp_client import get_mcp_manager, release_mcp_client, setup_mcp_client_and_tools
+from src.utils.llm_scheduler import llm_run_key
 
 logger = logging.getLogger(__name__)
 
@@ -42,11 +53,151 @@ logger = logging.getLogger(__name__)
 REPORT_FILENAME = "report.md"
 PLAN_FILENAME = "research_plan.md"
 SEARCH_INFO_FILENAME = "search_info.json"
+SEARCH_JOURNAL_FILENAME = "search_info.jsonl"
+CHECKPOINT_FILENAME = "checkpoints.db"
+REPORT_FLUSH_INTERVAL = 0.5  # Seconds between flushes of the streamed report
+
+# Progress events published to DeepResearchAgent.subscribe() queues
+EVENT_RUN_STARTED = "run_started"
+EVENT_PLAN_UPDATED = "plan_updated"
+EVENT_TASK_STARTED = "task_started"
+EVENT_TASK_FINISHED = "task_finished"
+EVENT_SEARCH_RESULT = "search_result"
+EVENT_REPORT_CHUNK = "report_chunk"
+EVENT_RUN_FINISHED = "run_finished"
+DEFAULT_SYNTHESIS_CONFIG = {
+    "max_single_shot_tokens": 24000,  # Above this, findings are summarized per category first
+    "chunk_tokens": 8000,  # Token budget of each category chunk in the map step
+    "max_concurrency": 4,  # Concurrent LLM calls in the map step
+}
+GRAPH_RECURSION_LIMIT = 1000
+# Tool calls of one LLM turn run concurrently; calls of tools in the same group share one
+# semaphore. File-system tools share a single slot, so reads and listings run in call order
+# after the writes before them, as they would sequentially. Other tools form their own group.
+# Browser searches are additionally bounded by the browser pool.
+TOOL_CONCURRENCY_GROUPS = {"write_file": "filesystem", "read_file": "filesystem", "list_directory": "filesystem"}
+TOOL_CONCURRENCY_LIMITS = {"filesystem": 1}  # Concurrent calls per group
+DEFAULT_TOOL_CONCURRENCY = 4
 
 _AGENT_STOP_FLAGS = {}
 _BROWSER_AGENT_INSTANCES = {}
 
 
+def _build_browser_config(browser_config: Dict[str, Any]) -> BrowserConfig:
+    """Translates the deep research browser settings dict into a BrowserConfig."""
+    headless = browser_config.get("headless", False)
+    window_w = browser_config.get("window_width", 1280)
+    window_h = browser_config.get("window_height", 1100)
+    browser_user_data_dir = browser_config.get("user_data_dir", None)
+    use_own_browser = browser_config.get("use_own_browser", False)
+    browser_binary_path = browser_config.get("browser_binary_path", None)
+    wss_url = browser_config.get("wss_url", None)
+    cdp_url = browser_config.get("cdp_url", None)
+
+    extra_args = []
+    if use_own_browser:
+        browser_binary_path = os.getenv("BROWSER_PATH", None) or browser_binary_path
+        if browser_binary_path == "":
+            browser_binary_path = None
+        browser_user_data = browser_user_data_dir or os.getenv("BROWSER_USER_DATA", None)
+        if browser_user_data:
+            extra_args += [f"--user-data-dir={browser_user_data}"]
+    else:
+        browser_binary_path = None
+
+    return BrowserConfig(
+        headless=headless,
+        browser_binary_path=browser_binary_path,
+        extra_browser_args=extra_args,
+        wss_url=wss_url,
+        cdp_url=cdp_url,
+        new_context_config=BrowserContextConfig(
+            window_width=window_w,
+            window_height=window_h,
+        )
+    )
+
+
+def create_browser_pool(browser_config: Dict[str, Any], size: int = 1) -> BrowserPool:
+    """Creates a browser pool for research sub-tasks from the browser settings dict."""
+    return BrowserPool(
+        _build_browser_config(browser_config),
+        size=size,
+        max_uses_per_browser=browser_config.get("pool_max_uses_per_browser", DEFAULT_MAX_USES_PER_BROWSER),
+        idle_timeout=browser_config.get("pool_idle_timeout", DEFAULT_IDLE_TIMEOUT),
+    )
+
+
+def _browser_task_prompt(task_query: str) -> str:
+    return f"""
+        Research Task: {task_query}
+        Objective: Find relevant information answering the query.
+        Output Requirements: For each relevant piece of information found, please provide:
+        1. A concise summary of the information.
+        2. The title of the source page or document.
+        3. The URL of the source.
+        Focus on accuracy and relevance. Avoid irrelevant details.
+        PDF cannot directly extract _content, please try to download first, then using read_file, if you can't save or read, please try other methods.
+        """
+
+
+async def _run_browser_task_in_process(
+        task_query: str,
+        task_id: str,
+        browser_config: Dict[str, Any],
+        stop_event: threading.Event,
+        use_vision: bool,
+        process_pool: ProcessAgentPool,
+        llm_settings: Dict[str, Any],
+        output_dir: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Dispatches one research browser task to an agent worker process. Its agent history is
+    saved under `<output_dir>/browser_runs`, next to the rest of the research run's output.
+    """
+    if stop_event.is_set():
+        logger.info(f"Browser task for '{task_query}' cancelled before start.")
+        return {"query": task_query, "result": None, "status": "cancelled"}
+
+    bu_browser_config = _build_browser_config(browser_config)
+    task_key = f"{task_id}_{uuid.uuid4()}"
+    job = {
+        "id": task_key,
+        "task": _browser_task_prompt(task_query),
+        "params": {
+            "llm": {key: value for key, value in llm_settings.items() if key != "api_key"},
+            "agent": {"use_vision": use_vision},
+            "browser": {
+                "headless": bu_browser_config.headless,
+                "browser_binary_path": bu_browser_config.browser_binary_path,
+                "extra_browser_args": bu_browser_config.extra_browser_args,
+                "wss_url": bu_browser_config.wss_url,
+                "cdp_url": bu_browser_config.cdp_url,
+                "window_width": browser_config.get("window_width", 1280),
+                "window_height": browser_config.get("window_height", 1100),
+            },
+            "save_agent_history_path": os.path.join(output_dir or os.path.join("./tmp/deep_research", task_id),
+                                                    "browser_runs"),
+            "save_download_path": "./tmp/downloads",
+            "generate_gif": False,
+        },
+    }
+    handle = process_pool.create_handle(task_key)
+    # Registered like a local agent so DeepResearchAgent.stop() reaches it
+    _BROWSER_AGENT_INSTANCES[task_key] = handle
+    try:
+        logger.info(f"Running BrowserUseAgent in a worker process for: {task_query}")
+        outcome = await process_pool.run(handle, job, {"llm_api_key": llm_settings.get("api_key")})
+    finally:
+        _BROWSER_AGENT_INSTANCES.pop(task_key, None)
+
+    if stop_event.is_set():
+        return {"query": task_query, "result": outcome.get("result"), "status": "stopped"}
+    if outcome.get("status") == "failed" and not outcome.get("result"):
+        return {"query": task_query, "error": outcome.get("error"), "status": "failed"}
+    return {"query": task_query, "result": outcome.get("result"), "status": "completed"}
+
+
 async def run_single_browser_task(
         task_query: str,
         task_id: str,
@@ -54,110 +205,80 @@ async def run_single_browser_task(
         browser_config: Dict[str, Any],
         stop_event: threading.Event,
         use_vision: bool = False,
+        browser_pool: Optional[BrowserPool] = None,
+        process_pool: Optional[ProcessAgentPool] = None,
+        llm_settings: Optional[Dict[str, Any]] = None,
+        output_dir: Optional[str] = None,
 ) -> Dict[str, Any]:
     """
     Runs a single BrowserUseAgent task.
-    Manages browser creation and closing for this specific task.
+    Leases an isolated browser context from `browser_pool`; without a pool, a single-use
+    browser is launched and closed for this specific task. With a `process_pool` and the
+    `llm_settings` needed to rebuild the LLM there, the run happens in an agent worker process,
+    which saves its history under the research run's `output_dir`.
     """
     if not BrowserUseAgent:
         return {
             "query": task_query,
             "error": "BrowserUseAgent components not available.",
         }
+    if process_pool and llm_settings:
+        return await _run_browser_task_in_process(
+            task_query, task_id, browser_config, stop_event, use_vision, process_pool, llm_settings, output_dir
+        )
 
-    # --- Browser Setup ---
-    # These should ideally come from the main agent's config
-    headless = browser_config.get("headless", False)
     window_w = browser_config.get("window_width", 1280)
     window_h = browser_config.get("window_height", 1100)
-    browser_user_data_dir = browser_config.get("user_data_dir", None)
-    use_own_browser = browser_config.get("use_own_browser", False)
-    browser_binary_path = browser_config.get("browser_binary_path", None)
-    wss_url = browser_config.get("wss_url", None)
-    cdp_url = browser_config.get("cdp_url", None)
-    disable_security = browser_config.get("disable_security", False)
 
-    bu_browser = None
-    bu_browser_context = None
+    own_pool = browser_pool is None
+    if own_pool:
+        browser_pool = create_browser_pool(browser_config, size=1)
+
+    task_key = None
     try:
         logger.info(f"Starting browser task for query: {task_query}")
-        extra_args = []
-        if use_own_browser:
-            browser_binary_path = os.getenv("BROWSER_PATH", None) or browser_binary_path
-            if browser_binary_path == "":
-                browser_binary_path = None
-            browser_user_data = browser_user_data_dir or os.getenv("BROWSER_USER_DATA", None)
-            if browser_user_data:
-                extra_args += [f"--user-data-dir={browser_user_data}"]
-        else:
-            browser_binary_path = None
-
-        bu_browser = CustomBrowser(
-            config=BrowserConfig(
-                headless=headless,
-                browser_binary_path=browser_binary_path,
-                extra_browser_args=extra_args,
-                wss_url=wss_url,
-                cdp_url=cdp_url,
-                new_context_config=BrowserContextConfig(
-                    window_width=window_w,
-                    window_height=window_h,
-                )
-            )
-        )
-
         context_config = BrowserContextConfig(
             save_downloads_path="./tmp/downloads",
             window_height=window_h,
             window_width=window_w,
             force_new_context=True,
         )
-        bu_browser_context = await bu_browser.new_context(config=context_config)
-
-        # Simple controller example, replace with your actual implementation if needed
-        bu_controller = CustomController()
-
-        # Construct the task prompt for BrowserUseAgent
-        # Instruct it to find specific info and return title/URL
-        bu_task_prompt = f"""
-        Research Task: {task_query}
-        Objective: Find relevant information answering the query.
-        Output Requirements: For each relevant piece of information found, please provide:
-        1. A concise summary of the information.
-        2. The title of the source page or document.
-        3. The URL of the source.
-        Focus on accuracy and relevance. Avoid irrelevant details.
-        PDF cannot directly extract _content, please try to download first, then using read_file, if you can't save or read, please try other methods.
-        """
-
-        bu_agent_instance = BrowserUseAgent(
-            task=bu_task_prompt,
-            llm=llm,  # Use the passed LLM
-            browser=bu_browser,
-            browser_context=bu_browser_context,
-            controller=bu_controller,
-            use_vision=use_vision,
-            source="webui",
-        )
+        async with browser_pool.lease(context_config) as bu_browser_context:
+            # Simple controller example, replace with your actual implementation if needed
+            bu_controller = CustomController()
+
+            # Construct the task prompt for BrowserUseAgent
+            # Instruct it to find specific info and return title/URL
+            bu_task_prompt = _browser_task_prompt(task_query)
+
+            bu_agent_instance = BrowserUseAgent(
+                task=bu_task_prompt,
+                llm=llm,  # Use the passed LLM
+                browser=bu_browser_context.browser,
+                browser_context=bu_browser_context,
+                controller=bu_controller,
+                use_vision=use_vision,
+                source="webui",
+            )
 
-        # Store instance for potential stop() call
-        task_key = f"{task_id}_{uuid.uuid4()}"
-        _BROWSER_AGENT_INSTANCES[task_key] = bu_agent_instance
+            # Store instance for potential stop() call
+            task_key = f"{task_id}_{uuid.uuid4()}"
+            _BROWSER_AGENT_INSTANCES[task_key] = bu_agent_instance
 
-        # --- Run with Stop Check ---
-        # BrowserUseAgent needs to internally check a stop signal or have a stop method.
-        # We simulate checking before starting and assume `run` might be interruptible
-        # or have its own stop mechanism we can trigger via bu_agent_instance.stop().
-        if stop_event.is_set():
-            logger.info(f"Browser task for '{task_query}' cancelled before start.")
-            return {"query": task_query, "result": None, "status": "cancelled"}
+            # --- Run with Stop Check ---
+            # BrowserUseAgent needs to internally check a stop signal or have a stop method.
+            # We simulate checking before starting and assume `run` might be interruptible
+            # or have its own stop mechanism we can trigger via bu_agent_instance.stop().
+            if stop_event.is_set():
+                logger.info(f"Browser task for '{task_query}' cancelled before start.")
+                return {"query": task_query, "result": None, "status": "cancelled"}
 
-        # The run needs to be awaitable and ideally accept a stop signal or have a .stop() method
-        # result = await bu_agent_instance.run(max_steps=max_steps) # Add max_steps if applicable
-        # Let's assume a simplified run for now
-        logger.info(f"Running BrowserUseAgent for: {task_query}")
-        result = await bu_agent_instance.run()  # Assuming run is the main method
-        logger.info(f"BrowserUseAgent finished for: {task_query}")
+            # The run needs to be awaitable and ideally accept a stop signal or have a .stop() method
+            # result = await bu_agent_instance.run(max_steps=max_steps) # Add max_steps if applicable
+            # Let's assume a simplified run for now
+            logger.info(f"Running BrowserUseAgent for: {task_query}")
+            result = await bu_agent_instance.run()  # Assuming run is the main method
+            logger.info(f"BrowserUseAgent finished for: {task_query}")
 
         final_data = result.final_result()
 
@@ -174,20 +295,8 @@ async def run_single_browser_task(
         )
         return {"query": task_query, "error": str(e), "status": "failed"}
     finally:
-        if bu_browser_context:
-            try:
-                await bu_browser_context.close()
-                bu_browser_context = None
-                logger.info("Closed browser context.")
-            except Exception as e:
-                logger.error(f"Error closing browser context: {e}")
-        if bu_browser:
-            try:
-                await bu_browser.close()
-                bu_browser = None
-                logger.info("Closed browser.")
-            except Exception as e:
-                logger.error(f"Error closing browser: {e}")
+        if own_pool:
+            await browser_pool.close()
 
         if task_key in _BROWSER_AGENT_INSTANCES:
             del _BROWSER_AGENT_INSTANCES[task_key]
@@ -197,6 +306,185 @@ class BrowserSearchInput(BaseModel):
     queries: List[str] = Field(
         description="List of distinct search queries to find information relevant to the research task."
     )
+    priorities: Optional[List[int]] = Field(
+        default=None,
+        description="Optional priority for each query, aligned with `queries`. Lower values run first.",
+    )
+
+
+class SearchQueryDeduplicator:
+    """
+    Tracks the queries searched during one research run and flags identical or near-identical
+    repeats (same normalized text, or token overlap above the threshold). A query is tracked
+    from `start` on, so a repeat picked up while the original is still running waits for it
+    (see wait_result) instead of searching again. Only completed queries keep their result;
+    failed or cancelled ones are forgotten in `finish` and can be retried.
+    """
+
+    def __init__(self, similarity_threshold: float = 0.85):
+        self.similarity_threshold = similarity_threshold
+        self._seen: Dict[str, set] = {}
+        self._results: Dict[str, Dict[str, Any]] = {}
+        self._pending: Dict[str, asyncio.Future] = {}
+
+    def find_duplicate(self, query: str) -> Optional[str]:
+        tokens = set(normalize_query(query).split())
+        if not tokens:
+            return None
+        for seen_query, seen_tokens in self._seen.items():
+            overlap = len(tokens & seen_tokens) / len(tokens | seen_tokens)
+            if overlap >= self.similarity_threshold:
+                return seen_query
+        return None
+
+    def start(self, query: str):
+        """Tracks `query` as running; must be followed by finish()."""
+        self._seen[query] = set(normalize_query(query).split())
+        self._pending[query] = asyncio.get_running_loop().create_future()
+
+    def finish(self, query: str, result: Optional[Dict[str, Any]]):
+        completed = isinstance(result, dict) and result.get("status") == "completed"
+        if completed:
+            self._results[query] = result
+        else:
+            self._seen.pop(query, None)
+        future = self._pending.pop(query, None)
+        if future and not future.done():
+            future.set_result(result if completed else None)
+
+    async def wait_result(self, query: str) -> Optional[Dict[str, Any]]:
+        """The completed result of a tracked query, waiting while it runs; None if it did not complete."""
+        if query in self._results:
+            return self._results[query]
+        future = self._pending.get(query)
+        return await asyncio.shield(future) if future else None
+
+
+async def stream_browser_search(
+        queries: List[str],
+        task_id: str,
+        llm: Any,
+        browser_config: Dict[str, Any],
+        stop_event: threading.Event,
+        max_parallel_browsers: int = 1,
+        browser_pool: Optional[BrowserPool] = None,
+        priorities: Optional[List[int]] = None,
+        deduplicator: Optional[SearchQueryDeduplicator] = None,
+        search_cache: Optional[SearchResultCache] = None,
+        process_pool: Optional[ProcessAgentPool] = None,
+        llm_settings: Optional[Dict[str, Any]] = None,
+        fast_fetcher: Optional[FastFetcher] = None,
+        output_dir: Optional[str] = None,
+) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+    """
+    Runs every query through a priority work queue drained by at most `max_parallel_browsers`
+    workers and yields `(query_index, result)` pairs as soon as each query finishes.
+    Queries repeating one already searched in this run are not searched again: they wait for
+    the original if it is still running and get status "duplicate" with its result (or run
+    normally if the original did not complete). Queries found in `search_cache`
+    are served from it with a `cached: True` marker. With a
+    `fast_fetcher`, a query is first answered over plain HTTP and only escalated to the
+    browser agent when that fails; results carry the serving `tier`.
+    """
+    model_id = get_model_id(llm)
+
+    work_queue: asyncio.PriorityQueue = asyncio.PriorityQueue()
+    done_queue: asyncio.Queue = asyncio.Queue()
+
+    for idx, query in enumerate(queries):
+        priority = priorities[idx] if priorities and idx < len(priorities) else 0
+        work_queue.put_nowait((priority, idx, query))
+
+    async def worker():
+        while True:
+            try:
+                _, idx, query = work_queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            result = None
+            started = False
+            try:
+                # Checked when the query is picked up, so it also matches queries running or finished meanwhile
+                duplicate_of, original = None, None
+                while deduplicator and original is None:
+                    duplicate_of = deduplicator.find_duplicate(query)
+                    if duplicate_of is None:
+                        deduplicator.start(query)
+                        started = True
+                        break
+                    # Look for another match if the original did not complete
+                    original = await deduplicator.wait_result(duplicate_of)
+                cached_result = search_cache.get(query, model_id) if search_cache and not original else None
+                if original is not None:
+                    logger.info(
+                        f"[Browser Tool {task_id}] Skipping duplicate query '{query}' (same as '{duplicate_of}')"
+                    )
+                    result = {
+                        "query": query, "status": "duplicate", "duplicate_of": duplicate_of,
+                        "result": original.get("result"),
+                    }
+                elif stop_event.is_set():
+                    logger.info(
+                        f"[Browser Tool {task_id}] Skipping task due to stop signal: {query}"
+                    )
+                    result = {"query": query, "result": None, "status": "cancelled"}
+                elif cached_result is not None:
+                    logger.info(f"[Browser Tool {task_id}] Cache hit for query: {query}")
+                    result = {**cached_result, "query": query, "cached": True}
+                else:
+                    result = await fast_fetcher.fetch(query) if fast_fetcher else None
+                    if result is None:
+                        try:
+                            # Pass necessary injected configs and the stop event
+                            result = await run_single_browser_task(
+                                query,
+                                task_id,
+                                llm,  # Pass the main LLM (or a dedicated one if needed)
+                                browser_config,
+                                stop_event,
+                                # use_vision could be added here if needed
+                                browser_pool=browser_pool,
+                                process_pool=process_pool,
+                                llm_settings=llm_settings,
+                                output_dir=output_dir,
+                            )
+                        except Exception as e:
+                            logger.error(
+                                f"[Browser Tool {task_id}] Caught exception for query '{query}': {e}",
+                                exc_info=True,
+                            )
+                            result = {"query": query, "error": str(e), "status": "failed"}
+                        if isinstance(result, dict):
+                            result["tier"] = TIER_BROWSER
+                    if search_cache and isinstance(result, dict) and result.get("status") == "completed":
+                        search_cache.put(query, model_id, result)
+            except Exception as e:
+                logger.error(f"[Browser Tool {task_id}] Search failed for query '{query}': {e}", exc_info=True)
+                result = {"query": query, "error": str(e), "status": "failed"}
+            finally:
+                if started:
+                    deduplicator.finish(query, result)  # Also releases repeats waiting on this query
+                # Always post a result: the consumer waits for exactly one per query
+                if result is None:  # Worker cancelled mid-query
+                    result = {"query": query, "result": None, "status": "cancelled"}
+                elif not isinstance(result, dict):
+                    logger.error(
+                        f"[Browser Tool {task_id}] Unexpected result type for query '{query}': {type(result)}"
+                    )
+                    result = {"query": query, "error": "Unexpected result type", "status": "failed"}
+                done_queue.put_nowait((idx, result))
+
+    workers = [
+        asyncio.create_task(worker())
+        for _ in range(min(max(max_parallel_browsers, 1), work_queue.qsize()))
+    ]
+    try:
+        for _ in range(len(queries)):
+            yield await done_queue.get()
+    finally:
+        for worker_task in workers:
+            if not worker_task.done():
+                worker_task.cancel()
 
 
 async def _run_browser_search_tool(
@@ -206,62 +494,53 @@ async def _run_browser_search_tool(
         browser_config: Dict[str, Any],
         stop_event: threading.Event,
         max_parallel_browsers: int = 1,
+        browser_pool: Optional[BrowserPool] = None,
+        priorities: Optional[List[int]] = None,
+        deduplicator: Optional[SearchQueryDeduplicator] = None,
+        search_cache: Optional[SearchResultCache] = None,
+        on_result: Optional[Callable[[Dict[str, Any]], Any]] = None,
+        process_pool: Optional[ProcessAgentPool] = None,
+        llm_settings: Optional[Dict[str, Any]] = None,
+        fast_fetcher: Optional[FastFetcher] = None,
+        output_dir: Optional[str] = None,
 ) -> List[Dict[str, Any]]:
     """
     Internal function to execute parallel browser searches based on LLM-provided queries.
-    Handles concurrency and stop signals.
+    Every query is queued; concurrency is bounded by max_parallel_browsers. `on_result` is
+    called with each result as it finishes, and the full list is returned in query order.
     """
-
-    # Limit queries just in case LLM ignores the description
-    queries = queries[:max_parallel_browsers]
     logger.info(
         f"[Browser Tool {task_id}] Running search for {len(queries)} queries: {queries}"
     )
 
-    results = []
-    semaphore = asyncio.Semaphore(max_parallel_browsers)
-
-    async def task_wrapper(query):
-        async with semaphore:
-            if stop_event.is_set():
-                logger.info(
-                    f"[Browser Tool {task_id}] Skipping task due to stop signal: {query}"
-                )
-                return {"query": query, "result": None, "status": "cancelled"}
-            # Pass necessary injected configs and the stop event
-            return await run_single_browser_task(
-                query,
-                task_id,
-                llm,  # Pass the main LLM (or a dedicated one if needed)
-                browser_config,
-                stop_event,
-                # use_vision could be added here if needed
-            )
-
-    tasks = [task_wrapper(query) for query in queries]
-    search_results = await asyncio.gather(*tasks, return_exceptions=True)
-
-    processed_results = []
-    for i, res in enumerate(search_results):
-        query = queries[i]  # Get corresponding query
-        if isinstance(res, Exception):
-            logger.error(
-                f"[Browser Tool {task_id}] Gather caught exception for query '{query}': {res}",
-                exc_info=True,
-            )
-            processed_results.append(
-                {"query": query, "error": str(res), "status": "failed"}
-            )
-        elif isinstance(res, dict):
-            processed_results.append(res)
-        else:
-            logger.error(
-                f"[Browser Tool {task_id}] Unexpected result type for query '{query}': {type(res)}"
-            )
-            processed_results.append(
-                {"query": query, "error": "Unexpected result type", "status": "failed"}
-            )
+    results_by_idx: Dict[int, Dict[str, Any]] = {}
+    async for idx, result in stream_browser_search(
+            queries,
+            task_id,
+            llm,
+            browser_config,
+            stop_event,
+            max_parallel_browsers=max_parallel_browsers,
+            browser_pool=browser_pool,
+            priorities=priorities,
+            deduplicator=deduplicator,
+            search_cache=search_cache,
+            process_pool=process_pool,
+            llm_settings=llm_settings,
+            fast_fetcher=fast_fetcher,
+            output_dir=output_dir,
+    ):
+        results_by_idx[idx] = result
+        logger.info(
+            f"[Browser Tool {task_id}] ({len(results_by_idx)}/{len(queries)}) "
+            f"'{result.get('query')}' finished with status: {result.get('status')}"
+        )
+        if on_result:
+            callback_result = on_result(result)
+            if inspect.isawaitable(callback_result):
+                await callback_result
 
+    processed_results = [results_by_idx[idx] for idx in sorted(results_by_idx)]
     logger.info(
         f"[Browser Tool {task_id}] Finished search. Results count: {len(processed_results)}"
     )
@@ -274,6 +553,13 @@ def create_browser_search_tool(
         task_id: str,
         stop_event: threading.Event,
         max_parallel_browsers: int = 1,
+        browser_pool: Optional[BrowserPool] = None,
+        search_cache: Optional[SearchResultCache] = None,
+        on_result: Optional[Callable[[Dict[str, Any]], Any]] = None,
+        process_pool: Optional[ProcessAgentPool] = None,
+        llm_settings: Optional[Dict[str, Any]] = None,
+        fast_fetcher: Optional[FastFetcher] = None,
+        output_dir: Optional[str] = None,
 ) -> StructuredTool:
     """Factory function to create the browser search tool with necessary dependencies."""
     # Use partial to bind the dependencies that aren't part of the LLM call arguments
@@ -286,14 +572,22 @@ def create_browser_search_tool(
         browser_config=browser_config,
         stop_event=stop_event,
         max_parallel_browsers=max_parallel_browsers,
+        browser_pool=browser_pool,
+        deduplicator=SearchQueryDeduplicator(),  # Shared by every call during this run
+        search_cache=search_cache,
+        on_result=on_result,
+        process_pool=process_pool,
+        llm_settings=llm_settings,
+        fast_fetcher=fast_fetcher,
+        output_dir=output_dir,
     )
 
     return StructuredTool.from_function(
         coroutine=bound_tool_func,
         name="parallel_browser_search",
         description=f"""Use this tool to actively search the web for information related to a specific research task or question.
-It runs up to {max_parallel_browsers} searches in parallel using a browser agent for better results than simple scraping.
-Provide a list of distinct search queries(up to {max_parallel_browsers}) that are likely to yield relevant information.""",
+It runs up to {max_parallel_browsers} searches in parallel; pages readable over plain HTTP are fetched directly, and a browser agent handles the rest (JavaScript-heavy or interactive pages). Additional queries are queued.
+Provide a list of distinct search queries that are likely to yield relevant information, optionally with a priority per query (lower runs first).""",
         args_schema=BrowserSearchInput,
     )
 
@@ -316,12 +610,14 @@ class ResearchCategoryItem(TypedDict):
 
 
 class DeepResearchState(TypedDict):
+    # Only serializable values live here so the graph can be checkpointed;
+    # the LLM and tools are passed per run through config["configurable"].
     task_id: str
     topic: str
     research_plan: List[ResearchCategoryItem]  # CHANGED
-    search_results: List[Dict[str, Any]]
-    llm: Any
-    tools: List[Tool]
+    # Number of records of this run in the search journal. The results themselves live only in
+    # the journal (see _load_search_results), so checkpoints do not re-serialize them every step.
+    search_result_count: int
     output_dir: Path
     browser_config: Dict[str, Any]
     final_report: Optional[str]
@@ -330,15 +626,31 @@ class DeepResearchState(TypedDict):
     stop_requested: bool
     error_message: Optional[str]
     messages: List[BaseMessage]
+    max_parallel_tasks: int
 
 
 # --- Langgraph Nodes ---
 
 
+def _emit_event(config: RunnableConfig, event_type: str, **data: Any):
+    """Publishes a progress event to the run's subscribers, if any."""
+    emit = config["configurable"].get("emit_event")
+    if emit:
+        emit({"type": event_type, **data})
+
+
+def _get_runtime(config: RunnableConfig, key: str) -> Any:
+    """Returns a non-serializable runtime dependency (llm, tools) passed through the run config."""
+    return config["configurable"][key]
+
+
 def _load_previous_state(task_id: str, output_dir: str) -> Dict[str, Any]:
+    """
+    Fallback resume for task directories without a graph checkpoint: re-parses the checkbox
+    view in research_plan.md, which only preserves task descriptions and statuses.
+    """
     state_updates = {}
     plan_file = os.path.join(output_dir, PLAN_FILENAME)
-    search_file = os.path.join(output_dir, SEARCH_INFO_FILENAME)
 
     loaded_plan: List[ResearchCategoryItem] = []
     next_cat_idx, next_task_idx = 0, 0
@@ -405,46 +717,104 @@ def _load_previous_state(task_id: str, output_dir: str) -> Dict[str, Any]:
     else:
         logger.info(f"Plan file {plan_file} not found. Will start fresh.")
 
-    if os.path.exists(search_file):
-        try:
-            with open(search_file, "r", encoding="utf-8") as f:
-                state_updates["search_results"] = json.load(f)
-                logger.info(f"Loaded search results from {search_file}")
-        except Exception as e:
-            logger.error(f"Failed to load search results {search_file}: {e}")
-            state_updates["error_message"] = (
-                    state_updates.get("error_message", "") + f" Failed to load search results: {e}").strip()
+    try:
+        state_updates["search_result_count"] = len(_load_search_results(output_dir))
+    except Exception as e:
+        logger.error(f"Failed to load search results from {output_dir}: {e}")
+        state_updates["error_message"] = (
+                state_updates.get("error_message", "") + f" Failed to load search results: {e}").strip()
 
     return state_updates
 
 
-def _save_plan_to_md(plan: List[ResearchCategoryItem], output_dir: str):
+def _load_search_results(output_dir: str) -> List[Dict[str, Any]]:
+    """
+    Loads the compacted search_info.json (also written by older versions), then streams the
+    records appended to the search_info.jsonl journal since the last compaction.
+    """
+    results: List[Dict[str, Any]] = []
+    search_file = os.path.join(output_dir, SEARCH_INFO_FILENAME)
+    journal_file = os.path.join(output_dir, SEARCH_JOURNAL_FILENAME)
+
+    if os.path.exists(search_file):
+        with open(search_file, "r", encoding="utf-8") as f:
+            results.extend(json.load(f))
+        logger.info(f"Loaded search results from {search_file}")
+
+    if os.path.exists(journal_file):
+        with open(journal_file, "r", encoding="utf-8") as f:
+            for line_num, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    results.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # A crash mid-write can leave a truncated last record
+                    logger.warning(f"Skipping malformed record at {journal_file}:{line_num}")
+        logger.info(f"Loaded search results journal from {journal_file}")
+
+    return results
+
+
+def _format_plan_md(plan: List[ResearchCategoryItem]) -> str:
+    plan_md = "# Research Plan\n\n"
+    for cat_idx, category in enumerate(plan):
+        plan_md += f"## {cat_idx + 1}. {category['category_name']}\n\n"
+        for task_idx, task in enumerate(category['tasks']):
+            marker = "- [x]" if task["status"] == "completed" else "- [ ]" if task[
+                                                                                  "status"] == "pending" else "- [-]"  # [-] for failed
+            plan_md += f"  {marker} {task['task_description']}\n"
+        plan_md += "\n"
+    return plan_md
+
+
+def _save_plan_to_md(plan: List[ResearchCategoryItem], output_dir: str, config: Optional[RunnableConfig] = None):
+    """Saves the plan and, when a run config is given, publishes it as a plan_updated event."""
     plan_file = os.path.join(output_dir, PLAN_FILENAME)
+    plan_md = _format_plan_md(plan)
     try:
         with open(plan_file, "w", encoding="utf-8") as f:
-            f.write(f"# Research Plan\n\n")
-            for cat_idx, category in enumerate(plan):
-                f.write(f"## {cat_idx + 1}. {category['category_name']}\n\n")
-                for task_idx, task in enumerate(category['tasks']):
-                    marker = "- [x]" if task["status"] == "completed" else "- [ ]" if task[
-                                                                                          "status"] == "pending" else "- [-]"  # [-] for failed
-                    f.write(f"  {marker} {task['task_description']}\n")
-                f.write("\n")
+            f.write(plan_md)
         logger.info(f"Hierarchical research plan saved to {plan_file}")
     except Exception as e:
         logger.error(f"Failed to save research plan to {plan_file}: {e}")
+    if config:
+        _emit_event(config, EVENT_PLAN_UPDATED, plan_markdown=plan_md)
+
+
+def _append_search_results_to_journal(new_results: List[Dict[str, Any]], output_dir: str):
+    """Appends one JSON record per new search result to the journal and fsyncs the batch."""
+    if not new_results:
+        return
+    journal_file = os.path.join(output_dir, SEARCH_JOURNAL_FILENAME)
+    try:
+        with open(journal_file, "a", encoding="utf-8") as f:
+            for result in new_results:
+                f.write(json.dumps(result, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        logger.info(f"Appended {len(new_results)} search results to {journal_file}")
+    except Exception as e:
+        logger.error(f"Failed to append search results to {journal_file}: {e}")
 
 
-def _save_search_results_to_json(results: List[Dict[str, Any]], output_dir: str):
-    """Appends or overwrites search results to a JSON file."""
+def _compact_search_results(results: List[Dict[str, Any]], output_dir: str):
+    """Rewrites all search results into search_info.json once and truncates the journal."""
     search_file = os.path.join(output_dir, SEARCH_INFO_FILENAME)
+    journal_file = os.path.join(output_dir, SEARCH_JOURNAL_FILENAME)
+    tmp_file = search_file + ".tmp"
     try:
-        # Simple overwrite for now, could be append
-        with open(search_file, "w", encoding="utf-8") as f:
+        with open(tmp_file, "w", encoding="utf-8") as f:
             json.dump(results, f, indent=2, ensure_ascii=False)
-        logger.info(f"Search results saved to {search_file}")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, search_file)
+        if os.path.exists(journal_file):
+            os.remove(journal_file)
+        logger.info(f"Search results compacted to {search_file}")
     except Exception as e:
-        logger.error(f"Failed to save search results to {search_file}: {e}")
+        logger.error(f"Failed to compact search results to {search_file}: {e}")
 
 
 def _save_report_to_md(report: str, output_dir: Path):
@@ -458,13 +828,53 @@ def _save_report_to_md(report: str, output_dir: Path):
         logger.error(f"Failed to save final report to {report_file}: {e}")
 
 
-async def planning_node(state: DeepResearchState) -> Dict[str, Any]:
+def _chunk_text(chunk: Any) -> str:
+    """Text of a streamed message chunk; some providers stream a list of content blocks."""
+    content = chunk.content
+    if isinstance(content, str):
+        return content
+    return "".join(
+        block.get("text", "") if isinstance(block, dict) else str(block) for block in content or []
+    )
+
+
+async def _stream_report_to_md(
+        llm: Any, messages: List[Any], output_dir: str, flush_interval: float = REPORT_FLUSH_INTERVAL,
+        on_partial: Optional[Callable[[str], Any]] = None,
+) -> str:
+    """
+    Streams the report from the LLM and writes it to the report file as it arrives, flushing
+    at most every `flush_interval` seconds so readers can show the partial markdown.
+    `on_partial` is called with the report so far on every flush and once at the end.
+    Returns the complete report.
+    """
+    report_file = os.path.join(output_dir, REPORT_FILENAME)
+    report = ""
+    last_flush = time.monotonic()
+    with open(report_file, "w", encoding="utf-8") as f:
+        async for chunk in llm.astream(messages):
+            text = _chunk_text(chunk)
+            if not text:
+                continue
+            report += text
+            f.write(text)
+            if time.monotonic() - last_flush >= flush_interval:
+                f.flush()
+                last_flush = time.monotonic()
+                if on_partial:
+                    on_partial(report)
+    if on_partial:
+        on_partial(report)
+    return report
+
+
+async def planning_node(state: DeepResearchState, config: RunnableConfig) -> Dict[str, Any]:
     logger.info("--- Entering Planning Node ---")
     if state.get("stop_requested"):
         logger.info("Stop requested, skipping planning.")
         return {"stop_requested": True}
 
-    llm = state["llm"]
+    llm = _get_runtime(config, "llm")
     topic = state["topic"]
     existing_plan = state.get("research_plan")
     output_dir = state["output_dir"]
@@ -472,7 +882,7 @@ async def planning_node(state: DeepResearchState) -> Dict[str, Any]:
     if existing_plan and (
             state.get("current_category_index", 0) > 0 or state.get("current_task_index_in_category", 0) > 0):
         logger.info("Resuming with existing plan.")
-        _save_plan_to_md(existing_plan, output_dir)  # Ensure it's saved initially
+        _save_plan_to_md(existing_plan, output_dir, config)  # Ensure it's saved initially
         # current_category_index and current_task_index_in_category should be set by _load_previous_state
         return {"research_plan": existing_plan}
 
@@ -589,13 +999,14 @@ Ensure the output is a valid JSON array.
             return {"error_message": "Failed to generate research plan structure."}
 
         logger.info(f"Generated research plan with {len(new_plan)} categories.")
-        _save_plan_to_md(new_plan, output_dir)  # Save the hierarchical plan
+        _save_plan_to_md(new_plan, output_dir, config)  # Save the hierarchical plan
+        _compact_search_results([], output_dir)  # A new plan starts with an empty journal
 
         return {
             "research_plan": new_plan,
             "current_category_index": 0,
             "current_task_index_in_category": 0,
-            "search_results": [],
+            "search_result_count": 0,
         }
 
     except json.JSONDecodeError as e:
@@ -606,67 +1017,155 @@ Ensure the output is a valid JSON array.
         return {"error_message": f"LLM Error during planning: {e}"}
 
 
-async def research_execution_node(state: DeepResearchState) -> Dict[str, Any]:
-    logger.info("--- Entering Research Execution Node ---")
-    if state.get("stop_requested"):
-        logger.info("Stop requested, skipping research execution.")
-        return {
-            "stop_requested": True,
-            "current_category_index": state["current_category_index"],
-            "current_task_index_in_category": state["current_task_index_in_category"],
-        }
+def _next_task_indices(plan: List[ResearchCategoryItem], cat_idx: int, task_idx: int) -> Tuple[int, int]:
+    """Returns the indices of the task following (cat_idx, task_idx) in plan order."""
+    next_task_idx = task_idx + 1
+    next_cat_idx = cat_idx
+    if next_task_idx >= len(plan[cat_idx]["tasks"]):
+        next_cat_idx += 1
+        next_task_idx = 0
+    return next_cat_idx, next_task_idx
 
-    plan = state["research_plan"]
-    cat_idx = state["current_category_index"]
-    task_idx = state["current_task_index_in_category"]
-    llm = state["llm"]
-    tools = state["tools"]
-    output_dir = str(state["output_dir"])
-    task_id = state["task_id"]  # For _AGENT_STOP_FLAGS
 
-    # This check should ideally be handled by `should_continue`
-    if not plan or cat_idx >= len(plan):
-        logger.info("Research plan complete or categories exhausted.")
-        return {}  # should route to synthesis
+def _first_pending_task_indices(plan: List[ResearchCategoryItem]) -> Tuple[int, int]:
+    """Returns the indices of the first pending task, or (len(plan), 0) if none is left."""
+    for cat_idx, category in enumerate(plan):
+        for task_idx, task in enumerate(category["tasks"]):
+            if task["status"] == "pending":
+                return cat_idx, task_idx
+    return len(plan), 0
 
-    current_category = plan[cat_idx]
-    if task_idx >= len(current_category["tasks"]):
-        logger.info(f"All tasks in category '{current_category['category_name']}' completed. Moving to next category.")
-        # This logic is now effectively handled by should_continue and the index updates below
-        # The next iteration will be caught by should_continue or this node with updated indices
-        return {
-            "current_category_index": cat_idx + 1,
-            "current_task_index_in_category": 0,
-            "messages": state["messages"]  # Pass messages along
-        }
 
-    current_task = current_category["tasks"][task_idx]
+def _select_parallel_tasks(plan: List[ResearchCategoryItem], limit: int) -> List[Tuple[int, int]]:
+    """
+    Picks up to `limit` tasks that can run concurrently: the first pending task of each category,
+    in plan order. Tasks inside a category stay sequential since later ones may build on earlier ones.
+    """
+    selected = []
+    for cat_idx, category in enumerate(plan):
+        for task_idx, task in enumerate(category["tasks"]):
+            if task["status"] == "pending":
+                selected.append((cat_idx, task_idx))
+                break
+        if len(selected) >= limit:
+            break
+    return selected
+
+
+async def _execute_research_task(
+        state: DeepResearchState,
+        config: RunnableConfig,
+        category: ResearchCategoryItem,
+        task: ResearchTaskItem,
+        base_messages: List[BaseMessage],
+) -> Dict[str, Any]:
+    """
+    Runs one LLM tool-calling turn for a single plan task and updates the task's status and
+    summary in place.
 
-    if current_task["status"] == "completed":
-        logger.info(
-            f"Task '{current_task['task_description']}' in category '{current_category['category_name']}' already completed. Skipping.")
-        # Logic to find next task
-        next_task_idx = task_idx + 1
-        next_cat_idx = cat_idx
-        if next_task_idx >= len(current_category["tasks"]):
-            next_cat_idx += 1
-            next_task_idx = 0
+    Returns a dict with the new "messages" for this task, the new "search_results" and,
+    when applicable, "stop_requested" or "error_message". Publishes task_started and
+    task_finished events around the turn.
+    """
+    logger.info(
+        f"Executing research task: '{task['task_description']}' (Category: '{category['category_name']}')"
+    )
+    _emit_event(config, EVENT_TASK_STARTED, category=category["category_name"], task=task["task_description"])
+    outcome = await _run_research_task_turn(state, config, category, task, base_messages)
+    _emit_event(
+        config, EVENT_TASK_FINISHED,
+        category=category["category_name"], task=task["task_description"], status=task["status"],
+    )
+    return outcome
+
+
+async def _execute_tool_call(
+        tool_call: Dict[str, Any],
+        tools: List[Tool],
+        semaphore: asyncio.Semaphore,
+        task_id: str,
+) -> Dict[str, Any]:
+    """
+    Runs one tool call of an LLM turn. Returns a dict with the call's "message" (ToolMessage),
+    its "search_results" entries, "tool_name" and "latency" in seconds, or "stop_requested"
+    if the run was stopped before the call started.
+    """
+    tool_name = tool_call.get("name")
+    tool_args = tool_call.get("args", {})
+    tool_call_id = tool_call.get("id")
+
+    logger.info(f"LLM requested tool call: {tool_name} with args: {tool_args}")
+    selected_tool = next((t for t in tools if t.name == tool_name), None)
+
+    if not selected_tool:
+        logger.error(f"LLM called tool '{tool_name}' which is not available.")
         return {
-            "current_category_index": next_cat_idx,
-            "current_task_index_in_category": next_task_idx,
-            "messages": state["messages"]  # Pass messages along
+            "tool_name": tool_name,
+            "message": ToolMessage(content=f"Error: Tool '{tool_name}' not found.", tool_call_id=tool_call_id),
+            "search_results": [],
         }
 
-    logger.info(
-        f"Executing research task: '{current_task['task_description']}' (Category: '{current_category['category_name']}')"
-    )
+    async with semaphore:
+        stop_event = _AGENT_STOP_FLAGS.get(task_id)
+        if stop_event and stop_event.is_set():
+            logger.info(f"Stop requested before executing tool: {tool_name}")
+            return {"tool_name": tool_name, "stop_requested": True}
+
+        started = time.monotonic()
+        try:
+            logger.info(f"Executing tool: {tool_name}")
+            tool_output = await selected_tool.ainvoke(tool_args)
+            latency = time.monotonic() - started
+            logger.info(f"Tool '{tool_name}' executed successfully in {latency:.2f}s.")
+
+            if tool_name == "parallel_browser_search":
+                # tool_output is List[Dict]; every query result records the latency of the call
+                search_results = [{**result, "latency": round(latency, 3)} for result in tool_output]
+            else:  # For other tools, we might need specific handling or just log
+                logger.info(f"Result from tool '{tool_name}': {str(tool_output)[:200]}...")
+                # Storing non-browser results might need a different structure or key in search_results
+                search_results = [
+                    {"tool_name": tool_name, "args": tool_args, "output": str(tool_output),
+                     "status": "completed", "latency": round(latency, 3)}]
+
+            return {
+                "tool_name": tool_name,
+                "message": ToolMessage(content=json.dumps(tool_output), tool_call_id=tool_call_id),
+                "search_results": search_results,
+                "latency": latency,
+            }
+
+        except Exception as e:
+            latency = time.monotonic() - started
+            logger.error(f"Error executing tool '{tool_name}' after {latency:.2f}s: {e}", exc_info=True)
+            return {
+                "tool_name": tool_name,
+                "message": ToolMessage(content=f"Error executing tool {tool_name}: {e}", tool_call_id=tool_call_id),
+                "search_results": [
+                    {"tool_name": tool_name, "args": tool_args, "status": "failed", "error": str(e),
+                     "latency": round(latency, 3)}],
+                "latency": latency,
+            }
+
+
+async def _run_research_task_turn(
+        state: DeepResearchState,
+        config: RunnableConfig,
+        category: ResearchCategoryItem,
+        task: ResearchTaskItem,
+        base_messages: List[BaseMessage],
+) -> Dict[str, Any]:
+    llm = _get_runtime(config, "llm")
+    tools = _get_runtime(config, "tools")
+    context_manager: Optional[ResearchContextManager] = config["configurable"].get("context_manager")
+    task_id = state["task_id"]  # For _AGENT_STOP_FLAGS
 
     llm_with_tools = llm.bind_tools(tools)
 
     # Construct messages for LLM invocation
     task_prompt_content = (
-        f"Current Research Category: {current_category['category_name']}\n"
-        f"Specific Task: {current_task['task_description']}\n\n"
+        f"Current Research Category: {category['category_name']}\n"
+        f"Specific Task: {task['task_description']}\n\n"
         "Please use the available tools, especially 'parallel_browser_search', to gather information for this specific task. "
         "Provide focused search queries relevant ONLY to this task. "
         "If you believe you have sufficient information from previous steps for this specific task, you can indicate that you are ready to summarize or that no further search is needed."
@@ -674,153 +1173,354 @@ async def research_execution_node(state: DeepResearchState) -> Dict[str, Any]:
     current_task_message_history = [
         HumanMessage(content=task_prompt_content)
     ]
-    if not state["messages"]:  # First actual execution message
+    if not base_messages:  # First actual execution message
         invocation_messages = [
                                   SystemMessage(
                                       content="You are a research assistant executing one task of a research plan. Focus on the current task only."),
                               ] + current_task_message_history
     else:
-        invocation_messages = state["messages"] + current_task_message_history
+        # Bound the history sent to the LLM; the full history stays in the graph state
+        history = context_manager.build(base_messages) if context_manager else base_messages
+        invocation_messages = history + current_task_message_history
 
     try:
-        logger.info(f"Invoking LLM with tools for task: {current_task['task_description']}")
+        logger.info(f"Invoking LLM with tools for task: {task['task_description']}")
         ai_response: BaseMessage = await llm_with_tools.ainvoke(invocation_messages)
         logger.info("LLM invocation complete.")
 
         tool_results = []
         executed_tool_names = []
-        current_search_results = state.get("search_results", [])  # Get existing search results
+        new_search_results = []
 
         if not isinstance(ai_response, AIMessage) or not ai_response.tool_calls:
             logger.warning(
-                f"LLM did not call any tool for task '{current_task['task_description']}'. Response: {ai_response.content[:100]}..."
+                f"LLM did not call any tool for task '{task['task_description']}'. Response: {ai_response.content[:100]}..."
             )
-            current_task["status"] = "pending"  # Or "completed_no_tool" if LLM explains it's done
-            current_task["result_summary"] = f"LLM did not use a tool. Response: {ai_response.content}"
-            current_task["current_category_index"] = cat_idx
-            current_task["current_task_index_in_category"] = task_idx
-            return current_task
-            # We still save the plan and advance.
-        else:
-            # Process tool calls
-            for tool_call in ai_response.tool_calls:
-                tool_name = tool_call.get("name")
-                tool_args = tool_call.get("args", {})
-                tool_call_id = tool_call.get("id")
-
-                logger.info(f"LLM requested tool call: {tool_name} with args: {tool_args}")
-                executed_tool_names.append(tool_name)
-                selected_tool = next((t for t in tools if t.name == tool_name), None)
-
-                if not selected_tool:
-                    logger.error(f"LLM called tool '{tool_name}' which is not available.")
-                    tool_results.append(
-                        ToolMessage(content=f"Error: Tool '{tool_name}' not found.", tool_call_id=tool_call_id))
-                    continue
+            # The LLM considers the task answered from previous steps; record its response and advance.
+            task["status"] = "completed"
+            task["result_summary"] = f"LLM did not use a tool. Response: {ai_response.content}"
+            return {
+                "messages": current_task_message_history + [ai_response],
+                "search_results": new_search_results,
+            }
 
-                try:
-                    stop_event = _AGENT_STOP_FLAGS.get(task_id)
-                    if stop_event and stop_event.is_set():
-                        logger.info(f"Stop requested before executing tool: {tool_name}")
-                        current_task["status"] = "pending"  # Or a new "stopped" status
-                        _save_plan_to_md(plan, output_dir)
-                        return {"stop_requested": True, "research_plan": plan, "current_category_index": cat_idx,
-                                "current_task_index_in_category": task_idx}
-
-                    logger.info(f"Executing tool: {tool_name}")
-                    tool_output = await selected_tool.ainvoke(tool_args)
-                    logger.info(f"Tool '{tool_name}' executed successfully.")
-
-                    if tool_name == "parallel_browser_search":
-                        current_search_results.extend(tool_output)  # tool_output is List[Dict]
-                    else:  # For other tools, we might need specific handling or just log
-                        logger.info(f"Result from tool '{tool_name}': {str(tool_output)[:200]}...")
-                        # Storing non-browser results might need a different structure or key in search_results
-                        current_search_results.append(
-                            {"tool_name": tool_name, "args": tool_args, "output": str(tool_output),
-                             "status": "completed"})
-
-                    tool_results.append(ToolMessage(content=json.dumps(tool_output), tool_call_id=tool_call_id))
-
-                except Exception as e:
-                    logger.error(f"Error executing tool '{tool_name}': {e}", exc_info=True)
-                    tool_results.append(
-                        ToolMessage(content=f"Error executing tool {tool_name}: {e}", tool_call_id=tool_call_id))
-                    current_search_results.append(
-                        {"tool_name": tool_name, "args": tool_args, "status": "failed", "error": str(e)})
-
-            # After processing all tool calls for this task
-            step_failed_tool_execution = any("Error:" in str(tr.content) for tr in tool_results)
-            # Consider a task successful if a browser search was attempted and didn't immediately error out during call
-            # The browser search itself returns status for each query.
-            browser_tool_attempted_successfully = "parallel_browser_search" in executed_tool_names and not step_failed_tool_execution
-
-            if step_failed_tool_execution:
-                current_task["status"] = "failed"
-                current_task[
-                    "result_summary"] = f"Tool execution failed. Errors: {[tr.content for tr in tool_results if 'Error' in str(tr.content)]}"
-            elif executed_tool_names:  # If any tool was called
-                current_task["status"] = "completed"
-                current_task["result_summary"] = f"Executed tool(s): {', '.join(executed_tool_names)}."
-                # TODO: Could ask LLM to summarize the tool_results for this task if needed, rather than just listing tools.
-            else:  # No tool calls but AI response had .tool_calls structure (empty)
-                current_task["status"] = "failed"  # Or a more specific status
-                current_task["result_summary"] = "LLM prepared for tool call but provided no tools."
-
-        # Save progress
-        _save_plan_to_md(plan, output_dir)
-        _save_search_results_to_json(current_search_results, output_dir)
-
-        # Determine next indices
-        next_task_idx = task_idx + 1
-        next_cat_idx = cat_idx
-        if next_task_idx >= len(current_category["tasks"]):
-            next_cat_idx += 1
-            next_task_idx = 0
-
-        updated_messages = state["messages"] + current_task_message_history + [ai_response] + tool_results
+        # Process tool calls: independent calls run concurrently under the tool group limits,
+        # and their results are reassembled in call order. Semaphore waiters are served in
+        # order, so calls within a single-slot group keep their call order.
+        semaphores: Dict[str, asyncio.Semaphore] = {}
+        call_semaphores = []
+        for tool_call in ai_response.tool_calls:
+            tool_name = tool_call.get("name")
+            group = TOOL_CONCURRENCY_GROUPS.get(tool_name, tool_name)
+            if group not in semaphores:
+                semaphores[group] = asyncio.Semaphore(TOOL_CONCURRENCY_LIMITS.get(group, DEFAULT_TOOL_CONCURRENCY))
+            call_semaphores.append(semaphores[group])
+            executed_tool_names.append(tool_name)
+
+        call_outcomes = await asyncio.gather(*[
+            _execute_tool_call(tool_call, tools, semaphore, task_id)
+            for tool_call, semaphore in zip(ai_response.tool_calls, call_semaphores)
+        ])
+
+        if any(outcome.get("stop_requested") for outcome in call_outcomes):
+            task["status"] = "pending"  # Or a new "stopped" status
+            return {"messages": [], "search_results": [], "stop_requested": True}
+
+        latencies = []
+        for outcome in call_outcomes:
+            tool_results.append(outcome["message"])
+            new_search_results.extend(outcome["search_results"])
+            if outcome.get("latency") is not None:
+                latencies.append(f"{outcome['tool_name']} ({outcome['latency']:.1f}s)")
+
+        # After processing all tool calls for this task
+        step_failed_tool_execution = any("Error:" in str(tr.content) for tr in tool_results)
+
+        if step_failed_tool_execution:
+            task["status"] = "failed"
+            task[
+                "result_summary"] = f"Tool execution failed. Errors: {[tr.content for tr in tool_results if 'Error' in str(tr.content)]}"
+        elif executed_tool_names:  # If any tool was called
+            task["status"] = "completed"
+            task["result_summary"] = f"Executed tool(s): {', '.join(latencies or executed_tool_names)}."
+            # TODO: Could ask LLM to summarize the tool_results for this task if needed, rather than just listing tools.
+        else:  # No tool calls but AI response had .tool_calls structure (empty)
+            task["status"] = "failed"  # Or a more specific status
+            task["result_summary"] = "LLM prepared for tool call but provided no tools."
+
+        # Remember where each finding came from so synthesis can group them by category
+        for result in new_search_results:
+            result.setdefault("category", category["category_name"])
 
         return {
-            "research_plan": plan,
-            "search_results": current_search_results,
-            "current_category_index": next_cat_idx,
-            "current_task_index_in_category": next_task_idx,
-            "messages": updated_messages,
+            "messages": current_task_message_history + [ai_response] + tool_results,
+            "search_results": new_search_results,
         }
 
     except Exception as e:
-        logger.error(f"Unhandled error during research execution for task '{current_task['task_description']}': {e}",
+        logger.error(f"Unhandled error during research execution for task '{task['task_description']}': {e}",
                      exc_info=True)
-        current_task["status"] = "failed"
-        _save_plan_to_md(plan, output_dir)
-        # Determine next indices even on error to attempt to move on
-        next_task_idx = task_idx + 1
-        next_cat_idx = cat_idx
-        if next_task_idx >= len(current_category["tasks"]):
-            next_cat_idx += 1
-            next_task_idx = 0
+        task["status"] = "failed"
+        return {
+            "messages": current_task_message_history,  # Preserve messages up to error
+            "search_results": [],
+            "error_message": f"Core Execution Error on task '{task['task_description']}': {e}",
+        }
+
+
+def _prune_messages(config: RunnableConfig, messages: List[BaseMessage]) -> List[BaseMessage]:
+    """Cuts the message history to what the context manager can still use before it is checkpointed."""
+    context_manager: Optional[ResearchContextManager] = config["configurable"].get("context_manager")
+    return context_manager.prune(messages) if context_manager else messages
+
+
+async def _parallel_research_execution(state: DeepResearchState, config: RunnableConfig) -> Dict[str, Any]:
+    """
+    Scheduler mode: runs the first pending task of up to `max_parallel_tasks` categories at once,
+    each with its own LLM tool-calling turn. Browser usage across all of them is bounded by the
+    shared browser pool (max_parallel_browsers). Outcomes are merged in plan order so the
+    resulting messages and search results do not depend on completion order.
+    """
+    plan = state["research_plan"]
+    output_dir = str(state["output_dir"])
+    selected = _select_parallel_tasks(plan, state.get("max_parallel_tasks", 1))
+    if not selected:
+        logger.info("No pending research tasks left.")
+        return {"current_category_index": len(plan), "current_task_index_in_category": 0}
+
+    logger.info(f"Executing {len(selected)} research tasks in parallel: {selected}")
+    outcomes = await asyncio.gather(*[
+        _execute_research_task(state, config, plan[cat_idx], plan[cat_idx]["tasks"][task_idx], state["messages"])
+        for cat_idx, task_idx in selected
+    ])
+
+    updated_messages = list(state["messages"])
+    new_search_results = []
+    stop_requested = False
+    error_messages = []
+    for outcome in outcomes:
+        updated_messages += outcome["messages"]
+        # Same rule as the serial path: results of a task that errored are not journaled
+        if not outcome.get("error_message"):
+            new_search_results.extend(outcome["search_results"])
+        stop_requested = stop_requested or outcome.get("stop_requested", False)
+        if outcome.get("error_message"):
+            error_messages.append(outcome["error_message"])
+
+    # Save progress
+    _save_plan_to_md(plan, output_dir, config)
+    _append_search_results_to_journal(new_search_results, output_dir)
+
+    next_cat_idx, next_task_idx = _first_pending_task_indices(plan)
+    update = {
+        "research_plan": plan,
+        "search_result_count": state.get("search_result_count", 0) + len(new_search_results),
+        "current_category_index": next_cat_idx,
+        "current_task_index_in_category": next_task_idx,
+        "messages": _prune_messages(config, updated_messages),
+    }
+    if stop_requested:
+        update["stop_requested"] = True
+    if error_messages:
+        update["error_message"] = "; ".join(error_messages)
+    return update
+
+
+async def research_execution_node(state: DeepResearchState, config: RunnableConfig) -> Dict[str, Any]:
+    logger.info("--- Entering Research Execution Node ---")
+    if state.get("stop_requested"):
+        logger.info("Stop requested, skipping research execution.")
+        return {
+            "stop_requested": True,
+            "current_category_index": state["current_category_index"],
+            "current_task_index_in_category": state["current_task_index_in_category"],
+        }
+
+    plan = state["research_plan"]
+    cat_idx = state["current_category_index"]
+    task_idx = state["current_task_index_in_category"]
+    output_dir = str(state["output_dir"])
+
+    # This check should ideally be handled by `should_continue`
+    if not plan or cat_idx >= len(plan):
+        logger.info("Research plan complete or categories exhausted.")
+        return {}  # should route to synthesis
+
+    if state.get("max_parallel_tasks", 1) > 1:
+        return await _parallel_research_execution(state, config)
+
+    current_category = plan[cat_idx]
+    if task_idx >= len(current_category["tasks"]):
+        logger.info(f"All tasks in category '{current_category['category_name']}' completed. Moving to next category.")
+        # This logic is now effectively handled by should_continue and the index updates below
+        # The next iteration will be caught by should_continue or this node with updated indices
+        return {
+            "current_category_index": cat_idx + 1,
+            "current_task_index_in_category": 0,
+            "messages": state["messages"]  # Pass messages along
+        }
+
+    current_task = current_category["tasks"][task_idx]
+
+    if current_task["status"] == "completed":
+        logger.info(
+            f"Task '{current_task['task_description']}' in category '{current_category['category_name']}' already completed. Skipping.")
+        # Logic to find next task
+        next_cat_idx, next_task_idx = _next_task_indices(plan, cat_idx, task_idx)
         return {
-            "research_plan": plan,
             "current_category_index": next_cat_idx,
             "current_task_index_in_category": next_task_idx,
-            "error_message": f"Core Execution Error on task '{current_task['task_description']}': {e}",
-            "messages": state["messages"] + current_task_message_history  # Preserve messages up to error
+            "messages": state["messages"]  # Pass messages along
         }
 
+    outcome = await _execute_research_task(state, config, current_category, current_task, state["messages"])
+
+    if outcome.get("stop_requested"):
+        _save_plan_to_md(plan, output_dir, config)
+        return {"stop_requested": True, "research_plan": plan, "current_category_index": cat_idx,
+                "current_task_index_in_category": task_idx}
+
+    # Save progress
+    _save_plan_to_md(plan, output_dir, config)
+    search_result_count = state.get("search_result_count", 0)
+    if not outcome.get("error_message"):
+        _append_search_results_to_journal(outcome["search_results"], output_dir)
+        search_result_count += len(outcome["search_results"])
+
+    # Determine next indices, even on error to attempt to move on
+    next_cat_idx, next_task_idx = _next_task_indices(plan, cat_idx, task_idx)
+
+    update = {
+        "research_plan": plan,
+        "search_result_count": search_result_count,
+        "current_category_index": next_cat_idx,
+        "current_task_index_in_category": next_task_idx,
+        "messages": _prune_messages(config, state["messages"] + outcome["messages"]),
+    }
+    if outcome.get("error_message"):
+        update["error_message"] = outcome["error_message"]
+    return update
+
+
+def _format_search_result(result_entry: Dict[str, Any]) -> str:
+    """Formats one search result entry as a markdown finding for the synthesis prompt."""
+    query = result_entry.get("query", "Unknown Query")  # From parallel_browser_search
+    tool_name = result_entry.get("tool_name")  # From other tools
+    status = result_entry.get("status", "unknown")
+    result_data = result_entry.get("result")  # From BrowserUseAgent's final_result
+    tool_output_str = result_entry.get("output")  # From other tools
+
+    formatted = ""
+    if not tool_name and status == "completed" and result_data:
+        # Browser search results carry the query instead of a tool name;
+        # result_data is the summary from BrowserUseAgent
+        formatted += f'### Finding from Web Search Query: "{query}"\n'
+        formatted += f"- **Summary:**\n{result_data}\n"  # result_data is already a summary string here
+        # If result_data contained title/URL, you'd format them here.
+        # The current BrowserUseAgent returns a string summary directly as 'final_data' in run_single_browser_task
+        formatted += "---\n"
+    elif not tool_name and status == "duplicate":
+        # The original query's finding carries the content
+        formatted += f'### Web Search Query: "{query}"\n'
+        formatted += f'- Same as query "{result_entry.get("duplicate_of")}"; see that finding.\n'
+        formatted += "---\n"
+    elif tool_name and status == "completed" and tool_output_str:
+        formatted += f'### Finding from Tool: "{tool_name}" (Args: {result_entry.get("args")})\n'
+        formatted += f"- **Output:**\n{tool_output_str}\n"
+        formatted += "---\n"
+    elif status == "failed":
+        error = result_entry.get("error")
+        q_or_t = f"Query: \"{query}\"" if query != "Unknown Query" else f"Tool: \"{tool_name}\""
+        formatted += f'### Failed {q_or_t}\n'
+        formatted += f"- **Error:** {error}\n"
+        formatted += "---\n"
+    return formatted
+
+
+def _chunk_findings(findings: List[str], max_tokens: int) -> List[str]:
+    """Packs formatted findings into chunks of at most `max_tokens` (a single oversized finding is cut)."""
+    chunks, current, current_tokens = [], "", 0
+    for finding in findings:
+        finding_tokens = estimate_tokens(finding)
+        if finding_tokens > max_tokens:
+            finding = finding[:max_tokens * 4] + "\n[truncated]\n---\n"
+            finding_tokens = max_tokens
+        if current and current_tokens + finding_tokens > max_tokens:
+            chunks.append(current)
+            current, current_tokens = "", 0
+        current += finding
+        current_tokens += finding_tokens
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+async def _summarize_findings_by_category(
+        llm: Any, topic: str, search_results: List[Dict[str, Any]], synthesis_config: Dict[str, Any]
+) -> str:
+    """
+    Map step of the hierarchical synthesis: groups findings by research category, splits them
+    into token-bounded chunks and summarizes all chunks concurrently (bounded by
+    `max_concurrency`). Returns the per-category summaries, in plan order, as markdown.
+    """
+    findings_by_category: Dict[str, List[str]] = {}
+    for result_entry in search_results:
+        formatted = _format_search_result(result_entry)
+        if formatted:
+            findings_by_category.setdefault(result_entry.get("category", "Uncategorized"), []).append(formatted)
+
+    semaphore = asyncio.Semaphore(max(synthesis_config["max_concurrency"], 1))
+
+    async def summarize_chunk(category_name: str, chunk: str) -> str:
+        async with semaphore:
+            response = await llm.ainvoke([
+                SystemMessage(content="You condense research findings into dense, factual notes for a report writer."),
+                HumanMessage(content=(
+                    f"Research Topic: {topic}\nResearch Category: {category_name}\n\n"
+                    "Summarize the findings below. Keep every concrete fact, figure, name, date and source, "
+                    "note contradictions, and drop repetition. Output Markdown bullet points only.\n\n"
+                    f"{chunk}"
+                )),
+            ])
+            return response.content
+
+    chunk_jobs = [
+        (category_name, chunk)
+        for category_name, findings in findings_by_category.items()
+        for chunk in _chunk_findings(findings, synthesis_config["chunk_tokens"])
+    ]
+    logger.info(
+        f"Summarizing {len(chunk_jobs)} chunks across {len(findings_by_category)} categories "
+        f"(max concurrency {synthesis_config['max_concurrency']})."
+    )
+    chunk_summaries = await asyncio.gather(*[summarize_chunk(name, chunk) for name, chunk in chunk_jobs])
+
+    summaries_by_category: Dict[str, List[str]] = {}
+    for (category_name, _), summary in zip(chunk_jobs, chunk_summaries):
+        summaries_by_category.setdefault(category_name, []).append(summary)
 
-async def synthesis_node(state: DeepResearchState) -> Dict[str, Any]:
+    return "".join(
+        f"### Category Summary: {category_name}\n" + "\n".join(summaries) + "\n---\n"
+        for category_name, summaries in summaries_by_category.items()
+    )
+
+
+async def synthesis_node(state: DeepResearchState, config: RunnableConfig) -> Dict[str, Any]:
     """Synthesizes the final report from the collected search results."""
     logger.info("--- Entering Synthesis Node ---")
     if state.get("stop_requested"):
         logger.info("Stop requested, skipping synthesis.")
         return {"stop_requested": True}
 
-    llm = state["llm"]
+    llm = _get_runtime(config, "llm")
     topic = state["topic"]
-    search_results = state.get("search_results", [])
     output_dir = state["output_dir"]
+    search_results = _load_search_results(str(output_dir))[:state.get("search_result_count", 0)]
     plan = state["research_plan"]  # Include plan for context
 
+    if search_results:
+        _compact_search_results(search_results, str(output_dir))
+
     if not search_results:
         logger.warning("No search results found to synthesize report.")
         report = f"# Research Report: {topic}\n\nNo information was gathered during the research process."
@@ -833,33 +1533,8 @@ async def synthesis_node(state: DeepResearchState) -> Dict[str, Any]:
 
     # Prepare context for the LLM
     # Format search results nicely, maybe group by query or original plan step
-    formatted_results = ""
+    formatted_results = "".join(_format_search_result(result_entry) for result_entry in search_results)
     references = {}
-    ref_count = 1
-    for i, result_entry in enumerate(search_results):
-        query = result_entry.get("query", "Unknown Query")  # From parallel_browser_search
-        tool_name = result_entry.get("tool_name")  # From other tools
-        status = result_entry.get("status", "unknown")
-        result_data = result_entry.get("result")  # From BrowserUseAgent's final_result
-        tool_output_str = result_entry.get("output")  # From other tools
-
-        if tool_name == "parallel_browser_search" and status == "completed" and result_data:
-            # result_data is the summary from BrowserUseAgent
-            formatted_results += f'### Finding from Web Search Query: "{query}"\n'
-            formatted_results += f"- **Summary:**\n{result_data}\n"  # result_data is already a summary string here
-            # If result_data contained title/URL, you'd format them here.
-            # The current BrowserUseAgent returns a string summary directly as 'final_data' in run_single_browser_task
-            formatted_results += "---\n"
-        elif tool_name != "parallel_browser_search" and status == "completed" and tool_output_str:
-            formatted_results += f'### Finding from Tool: "{tool_name}" (Args: {result_entry.get("args")})\n'
-            formatted_results += f"- **Output:**\n{tool_output_str}\n"
-            formatted_results += "---\n"
-        elif status == "failed":
-            error = result_entry.get("error")
-            q_or_t = f"Query: \"{query}\"" if query != "Unknown Query" else f"Tool: \"{tool_name}\""
-            formatted_results += f'### Failed {q_or_t}\n'
-            formatted_results += f"- **Error:** {error}\n"
-            formatted_results += "---\n"
 
     # Prepare the research plan context
     plan_summary = "\nResearch Plan Followed:\n"
@@ -869,6 +1544,16 @@ async def synthesis_node(state: DeepResearchState) -> Dict[str, Any]:
             marker = "[x]" if task["status"] == "completed" else "[ ]" if task["status"] == "pending" else "[-]"
             plan_summary += f"  - {marker} {task['task_description']}\n"
 
+    synthesis_config = {**DEFAULT_SYNTHESIS_CONFIG, **(config["configurable"].get("synthesis_config") or {})}
+    if estimate_tokens(formatted_results) > synthesis_config["max_single_shot_tokens"]:
+        # Map-reduce: condense each category in parallel, then write the report from the summaries
+        logger.info("Collected findings exceed the single-shot budget, using hierarchical synthesis.")
+        try:
+            formatted_results = await _summarize_findings_by_category(llm, topic, search_results, synthesis_config)
+        except Exception as e:
+            logger.error(f"Error during hierarchical synthesis: {e}", exc_info=True)
+            return {"error_message": f"LLM Error during synthesis: {e}"}
+
     synthesis_prompt = ChatPromptTemplate.from_messages(
         [
             (
@@ -903,14 +1588,16 @@ async def synthesis_node(state: DeepResearchState) -> Dict[str, Any]:
     )
 
     try:
-        response = await llm.ainvoke(
+        final_report_md = await _stream_report_to_md(
+            llm,
             synthesis_prompt.format_prompt(
                 topic=topic,
                 plan_summary=plan_summary,
                 formatted_results=formatted_results,
-            ).to_messages()
+            ).to_messages(),
+            output_dir,
+            on_partial=lambda partial_report: _emit_event(config, EVENT_REPORT_CHUNK, report=partial_report),
         )
-        final_report_md = response.content
 
         # Append the reference list automatically to the end of the generated markdown
         if references:
@@ -923,6 +1610,8 @@ async def synthesis_node(state: DeepResearchState) -> Dict[str, Any]:
                 )
             final_report_md += report_references_section
 
+        final_report_md += f"\n\n---\n*{format_search_tiers(count_search_tiers(search_results))}*\n"
+
         logger.info("Successfully synthesized the final report.")
         _save_report_to_md(final_report_md, output_dir)
         return {"final_report": final_report_md}
@@ -985,6 +1674,7 @@ class DeepResearchAgent:
             llm: Any,
             browser_config: Dict[str, Any],
             mcp_server_config: Optional[Dict[str, Any]] = None,
+            llm_settings: Optional[Dict[str, Any]] = None,
     ):
         """
         Initializes the DeepSearchAgent.
@@ -994,19 +1684,50 @@ class DeepResearchAgent:
             browser_config: Configuration dictionary for the BrowserUseAgent tool.
                             Example: {"headless": True, "window_width": 1280, ...}
             mcp_server_config: Optional configuration for the MCP client.
+            llm_settings: Optional get_llm_model arguments (provider, model_name, temperature,
+                          base_url, num_ctx, api_key) used to rebuild the LLM in agent worker
+                          processes; browser tasks stay in-process without them.
         """
         self.llm = llm
+        self.llm_settings = llm_settings
         self.browser_config = browser_config
         self.mcp_server_config = mcp_server_config
         self.mcp_client = None
         self.stopped = False
-        self.graph = self._compile_graph()
+        self.graph = self._compile_graph()  # Recompiled with a checkpointer for each run
         self.current_task_id: Optional[str] = None
         self.stop_event: Optional[threading.Event] = None
         self.runner: Optional[asyncio.Task] = None  # To hold the asyncio task for run
+        self.browser_pool: Optional[BrowserPool] = None
+        self.search_cache: Optional[SearchResultCache] = None
+        self.fast_fetcher: Optional[FastFetcher] = None
+        self._event_queues: List[asyncio.Queue] = []
+
+    def subscribe(self) -> asyncio.Queue:
+        """
+        Returns a queue receiving this agent's progress events as dicts with a "type" key
+        (run_started, plan_updated, task_started, task_finished, search_result, report_chunk,
+        run_finished). Subscribe before starting run() to receive every event of the run.
+        """
+        queue = asyncio.Queue()
+        self._event_queues.append(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        if queue in self._event_queues:
+            self._event_queues.remove(queue)
+
+    def _publish_event(self, event: Dict[str, Any]):
+        for queue in self._event_queues:
+            queue.put_nowait(event)
 
     async def _setup_tools(
-            self, task_id: str, stop_event: threading.Event, max_parallel_browsers: int = 1
+            self, task_id: str, stop_event: threading.Event, max_parallel_browsers: int = 1,
+            browser_pool: Optional[BrowserPool] = None,
+            search_cache: Optional[SearchResultCache] = None,
+            on_search_result: Optional[Callable[[Dict[str, Any]], Any]] = None,
+            fast_fetcher: Optional[FastFetcher] = None,
+            output_dir: Optional[str] = None,
     ) -> List[Tool]:
         """Sets up the basic tools (File I/O) and optional MCP tools."""
         tools = [
@@ -1020,6 +1741,13 @@ class DeepResearchAgent:
             task_id=task_id,
             stop_event=stop_event,
             max_parallel_browsers=max_parallel_browsers,
+            browser_pool=browser_pool,
+            search_cache=search_cache,
+            on_result=on_search_result,
+            process_pool=get_process_agent_pool(),
+            llm_settings=self.llm_settings,
+            fast_fetcher=fast_fetcher,
+            output_dir=output_dir,
         )
         tools += [browser_use_tool]
         # Add MCP tools if config is provided
@@ -1030,7 +1758,8 @@ class DeepResearchAgent:
                     self.mcp_client = await setup_mcp_client_and_tools(
                         self.mcp_server_config
                     )
-                mcp_tools = self.mcp_client.get_tools()
+                # Tool list cached by the shared connection, not re-listed per run
+                mcp_tools = get_mcp_manager().get_tools(self.mcp_server_config) if self.mcp_client else []
                 logger.info(f"Loaded {len(mcp_tools)} MCP tools.")
                 tools.extend(mcp_tools)
             except Exception as e:
@@ -1044,11 +1773,14 @@ class DeepResearchAgent:
 
     async def close_mcp_client(self):
         if self.mcp_client:
-            await self.mcp_client.__aexit__(None, None, None)
+            await release_mcp_client(self.mcp_server_config)
             self.mcp_client = None
 
-    def _compile_graph(self) -> StateGraph:
-        """Compiles the Langgraph state machine."""
+    def _compile_graph(self, checkpointer: Optional[BaseCheckpointSaver] = None) -> StateGraph:
+        """
+        Compiles the Langgraph state machine. With a checkpointer, every step is persisted
+        per task_id (thread) so an interrupted run resumes from the exact graph state.
+        """
         workflow = StateGraph(DeepResearchState)
 
         # Add nodes
@@ -1079,7 +1811,7 @@ class DeepResearchAgent:
 
         workflow.add_edge("synthesize_report", "end_run")  # End after synthesis
 
-        app = workflow.compile()
+        app = workflow.compile(checkpointer=checkpointer)
         return app
 
     async def run(
@@ -1088,6 +1820,11 @@ class DeepResearchAgent:
             task_id: Optional[str] = None,
             save_dir: str = "./tmp/deep_research",
             max_parallel_browsers: int = 1,
+            max_parallel_tasks: int = 1,
+            use_search_cache: bool = True,
+            use_fast_fetch: bool = True,
+            context_config: Optional[Dict[str, Any]] = None,
+            synthesis_config: Optional[Dict[str, Any]] = None,
     ) -> Dict[str, Any]:
         """
         Starts the deep research process (Async Generator Version).
@@ -1095,6 +1832,18 @@ class DeepResearchAgent:
         Args:
             topic: The research topic.
             task_id: Optional existing task ID to resume. If None, a new ID is generated.
+            max_parallel_browsers: Global cap on browsers used at once, shared by all running tasks.
+            max_parallel_tasks: Number of plan tasks from different categories executed at once.
+                                1 keeps the serial, task-by-task execution.
+            use_search_cache: Serve repeated queries from the cross-run search cache under
+                              `<save_dir>/cache` and store new results in it.
+            use_fast_fetch: Try each query with a plain HTTP fetch and main-content extraction
+                            first, escalating to the browser agent only when that fails.
+            context_config: Optional ResearchContextManager settings bounding the message
+                            history sent to the LLM (max_turns, max_tool_output_tokens,
+                            summarize_categories, summary_tokens_per_turn).
+            synthesis_config: Optional overrides of DEFAULT_SYNTHESIS_CONFIG deciding when the
+                              report switches to map-reduce synthesis and how it is chunked.
 
         Yields:
              Intermediate state updates or messages during execution.
@@ -1111,6 +1860,7 @@ class DeepResearchAgent:
             }
 
         self.current_task_id = task_id if task_id else str(uuid.uuid4())
+        llm_run_key.set(f"deep_research:{self.current_task_id}")  # Inherited by the tasks this run spawns
         safe_root_dir = "./tmp/deep_research"
         normalized_save_dir = os.path.normpath(save_dir)
         if not normalized_save_dir.startswith(os.path.abspath(safe_root_dir)):
@@ -1123,54 +1873,107 @@ class DeepResearchAgent:
             f"[AsyncGen] Starting research task ID: {self.current_task_id} for topic: '{topic}'"
         )
         logger.info(f"[AsyncGen] Output directory: {output_dir}")
+        self._publish_event({"type": EVENT_RUN_STARTED, "task_id": self.current_task_id, "output_dir": output_dir})
 
         self.stop_event = threading.Event()
         _AGENT_STOP_FLAGS[self.current_task_id] = self.stop_event
-        agent_tools = await self._setup_tools(
-            self.current_task_id, self.stop_event, max_parallel_browsers
-        )
-        initial_state: DeepResearchState = {
-            "task_id": self.current_task_id,
-            "topic": topic,
-            "research_plan": [],
-            "search_results": [],
-            "messages": [],
-            "llm": self.llm,
-            "tools": agent_tools,
-            "output_dir": Path(output_dir),
-            "browser_config": self.browser_config,
-            "final_report": None,
-            "current_category_index": 0,
-            "current_task_index_in_category": 0,
-            "stop_requested": False,
-            "error_message": None,
-        }
-
-        if task_id:
-            logger.info(f"Attempting to resume task {task_id}...")
-            loaded_state = _load_previous_state(task_id, output_dir)
-            initial_state.update(loaded_state)
-            if loaded_state.get("research_plan"):
-                logger.info(
-                    f"Resuming with {len(loaded_state['research_plan'])} plan categories "
-                    f"and {len(loaded_state.get('search_results', []))} existing results. "
-                    f"Next task: Cat {initial_state['current_category_index']}, Task {initial_state['current_task_index_in_category']}"
-                )
-                initial_state["topic"] = (
-                    topic  # Allow overriding topic even when resuming? Or use stored topic? Let's use new one.
-                )
-            else:
-                logger.warning(
-                    f"Resume requested for {task_id}, but no previous plan found. Starting fresh."
-                )
+        context_manager = ResearchContextManager(**(context_config or {}))
 
         # --- Execute Graph using ainvoke ---
         final_state = None
         status = "unknown"
         message = None
+        checkpoint_conn = None
+        # Everything opened from here on is released in the finally block, also if setup fails
         try:
+            self.browser_pool = create_browser_pool(self.browser_config, size=max_parallel_browsers)
+            # Research browser tasks run in agent worker processes when enabled; skip the warm-up then
+            process_mode = get_process_agent_pool() is not None and bool(self.llm_settings)
+            await self.browser_pool.start(prelaunch=0 if process_mode else None)
+            if use_search_cache:
+                self.search_cache = SearchResultCache(os.path.join(normalized_save_dir, "cache"))
+            if use_fast_fetch:
+                self.fast_fetcher = FastFetcher()
+            agent_tools = await self._setup_tools(
+                self.current_task_id, self.stop_event, max_parallel_browsers, self.browser_pool, self.search_cache,
+                on_search_result=lambda result: self._publish_event({"type": EVENT_SEARCH_RESULT, "result": result}),
+                fast_fetcher=self.fast_fetcher,
+                output_dir=output_dir,
+            )
+            checkpoint_conn = await aiosqlite.connect(os.path.join(output_dir, CHECKPOINT_FILENAME))
+            self.graph = self._compile_graph(AsyncSqliteSaver(checkpoint_conn))
+            run_config: RunnableConfig = {
+                "configurable": {
+                    "thread_id": self.current_task_id,
+                    "llm": self.llm,
+                    "tools": agent_tools,
+                    "context_manager": context_manager,
+                    "synthesis_config": synthesis_config,
+                    "emit_event": self._publish_event,
+                },
+                "recursion_limit": GRAPH_RECURSION_LIMIT,
+            }
+            initial_state: DeepResearchState = {
+                "task_id": self.current_task_id,
+                "topic": topic,
+                "research_plan": [],
+                "search_result_count": 0,
+                "messages": [],
+                "output_dir": Path(output_dir),
+                "browser_config": self.browser_config,
+                "final_report": None,
+                "current_category_index": 0,
+                "current_task_index_in_category": 0,
+                "stop_requested": False,
+                "error_message": None,
+                "max_parallel_tasks": max(1, max_parallel_tasks),
+            }
+
+            graph_input: Optional[DeepResearchState] = initial_state
+            checkpoint = await self.graph.aget_state(run_config) if task_id else None
+            if checkpoint and checkpoint.values.get("research_plan"):
+                # Resume from the exact checkpointed state (plan, queries, summaries, messages).
+                # Clear a previous stop/error and re-enter the loop right after planning.
+                logger.info(f"Resuming task {task_id} from checkpoint (next: {checkpoint.next or 'finished'}).")
+                # Journal records written after the checkpoint belong to tasks that run again
+                journaled = _load_search_results(output_dir)
+                result_count = checkpoint.values.get("search_result_count", len(journaled))
+                if len(journaled) > result_count:
+                    _compact_search_results(journaled[:result_count], output_dir)
+                await self.graph.aupdate_state(
+                    run_config,
+                    {
+                        "topic": topic,
+                        "search_result_count": result_count,
+                        "output_dir": Path(output_dir),
+                        "browser_config": self.browser_config,
+                        "stop_requested": False,
+                        "error_message": None,
+                        "max_parallel_tasks": max(1, max_parallel_tasks),
+                    },
+                    as_node="plan_research",
+                )
+                graph_input = None
+            elif task_id:
+                logger.info(f"Attempting to resume task {task_id} from {PLAN_FILENAME}...")
+                loaded_state = _load_previous_state(task_id, output_dir)
+                initial_state.update(loaded_state)
+                if loaded_state.get("research_plan"):
+                    logger.info(
+                        f"Resuming with {len(loaded_state['research_plan'])} plan categories "
+                        f"and {loaded_state.get('search_result_count', 0)} existing results. "
+                        f"Next task: Cat {initial_state['current_category_index']}, Task {initial_state['current_task_index_in_category']}"
+                    )
+                    initial_state["topic"] = (
+                        topic  # Allow overriding topic even when resuming? Or use stored topic? Let's use new one.
+                    )
+                else:
+                    logger.warning(
+                        f"Resume requested for {task_id}, but no previous plan found. Starting fresh."
+                    )
+
             logger.info(f"Invoking graph execution for task {self.current_task_id}...")
-            self.runner = asyncio.create_task(self.graph.ainvoke(initial_state))
+            self.runner = asyncio.create_task(self.graph.ainvoke(graph_input, run_config))
             final_state = await self.runner
             logger.info(f"Graph execution finished for task {self.current_task_id}.")
 
@@ -1210,14 +2013,30 @@ class DeepResearchAgent:
             self.stop_event = None
             self.current_task_id = None
             self.runner = None  # Mark runner as finished
-            if self.mcp_client:
-                await self.mcp_client.__aexit__(None, None, None)
+            if checkpoint_conn:
+                await checkpoint_conn.close()
+            context_manager.log_savings()
+            if self.browser_pool:
+                await self.browser_pool.close()
+                self.browser_pool = None
+            if self.search_cache:
+                self.search_cache.close()
+                self.search_cache = None
+            if self.fast_fetcher:
+                await self.fast_fetcher.close()
+                self.fast_fetcher = None
+            # Released back to the shared manager, which keeps the servers warm for the next run
+            await self.close_mcp_client()
+            self._publish_event(
+                {"type": EVENT_RUN_FINISHED, "task_id": task_id_to_clean, "status": status, "message": message}
+            )
 
             # Return a result dictionary including the status and the final state if available
             return {
                 "status": status,
                 "message": message,
                 "task_id": task_id_to_clean,  # Use the stored task_id
+                "context_tokens_saved": dict(context_manager.tokens_saved),
                 "final_state": final_state
                 if final_state
                 else {},  # Return the final state dict
@@ -1238,8 +2057,10 @@ class DeepResearchAgent:
             agent_instance = _BROWSER_AGENT_INSTANCES.get(key)
             try:
                 if agent_instance:
-                    # Assuming BU agent has an async stop method
-                    await agent_instance.stop()
+                    # Agent.stop() is synchronous; await it only if an implementation is async
+                    stop_result = agent_instance.stop()
+                    if inspect.isawaitable(stop_result):
+                        await stop_result
                     logger.info(f"Called stop() on browser agent instance {key}")
             except Exception as e:
                 logger.error(
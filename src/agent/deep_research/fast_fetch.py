@@ -0,0 +1,157 @@
+import asyncio
+import html
+import logging
+import os
+import re
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import httpx
+from main_content_extractor import MainContentExtractor
+
+logger = logging.getLogger(__name__)
+
+TIER_HTTP = "http"
+TIER_BROWSER = "browser"
+SEARCH_URL = os.getenv("DEEP_RESEARCH_SEARCH_URL", "https://html.duckduckgo.com/html/")
+FETCH_TIMEOUT = httpx.Timeout(15.0, connect=5.0)
+MAX_PAGES_PER_QUERY = 3
+MIN_CONTENT_CHARS = 800  # Less main content than this usually means the page renders client-side
+MAX_CONTENT_CHARS_PER_PAGE = 4000
+USER_AGENT = (
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/124.0 Safari/537.36"
+)
+# Pages asking for these need a real browser (JS rendering, bot checks, login walls)
+BROWSER_REQUIRED_MARKERS = (
+    "enable javascript",
+    "javascript is disabled",
+    "javascript is required",
+    "captcha",
+    "are you a robot",
+    "verify you are human",
+    "sign in to continue",
+)
+_URL_PATTERN = re.compile(r"https?://[^\s\"'<>]+")
+_RESULT_LINK_PATTERN = re.compile(r"<a[^>]+class=\"result__a\"[^>]*>", re.IGNORECASE)
+_HREF_PATTERN = re.compile(r"href=\"([^\"]+)\"")
+_TITLE_PATTERN = re.compile(r"<title[^>]*>(.*?)</title>", re.IGNORECASE | re.DOTALL)
+
+
+def _result_url(href: str) -> Optional[str]:
+    """Target of a search result link; DuckDuckGo wraps them in a /l/?uddg= redirect."""
+    href = html.unescape(href)
+    if href.startswith("//"):
+        href = "https:" + href
+    parsed = urlparse(href)
+    if parsed.path.startswith("/l/"):
+        target = parse_qs(parsed.query).get("uddg")
+        return target[0] if target else None
+    return href if parsed.scheme in ("http", "https") else None
+
+
+class FastFetcher:
+    """
+    First tier of deep research search: answers a query with plain async HTTP. Queries that
+    contain URLs fetch those pages; other queries go through an HTML search endpoint and fetch
+    the top results. Pages are reduced to their main content with MainContentExtractor.
+    `fetch` returns None when the query needs the browser agent instead: no usable results,
+    pages that are not HTML, too little static content, or bot/JavaScript walls.
+    """
+
+    def __init__(self, max_pages: int = MAX_PAGES_PER_QUERY, min_content_chars: int = MIN_CONTENT_CHARS):
+        self.max_pages = max_pages
+        self.min_content_chars = min_content_chars
+        self._client = httpx.AsyncClient(
+            timeout=FETCH_TIMEOUT,
+            follow_redirects=True,
+            headers={"User-Agent": USER_AGENT, "Accept-Language": "en-US,en;q=0.9"},
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+        )
+
+    async def _search_urls(self, query: str) -> List[str]:
+        urls = _URL_PATTERN.findall(query)
+        if urls:
+            return urls[:self.max_pages]
+        response = await self._client.post(SEARCH_URL, data={"q": query})
+        response.raise_for_status()
+        urls = []
+        for tag in _RESULT_LINK_PATTERN.findall(response.text):
+            href = _HREF_PATTERN.search(tag)
+            url = _result_url(href.group(1)) if href else None
+            if url and url not in urls:
+                urls.append(url)
+            if len(urls) >= self.max_pages:
+                break
+        return urls
+
+    async def _fetch_page(self, url: str) -> Tuple[Optional[Dict[str, str]], Optional[str]]:
+        """Returns ({"url", "title", "content"}, None) or (None, reason the page needs a browser)."""
+        try:
+            response = await self._client.get(url)
+            response.raise_for_status()
+        except Exception as e:
+            return None, f"fetch failed ({e})"
+        if "html" not in response.headers.get("content-type", ""):
+            return None, f"not HTML ({response.headers.get('content-type')})"
+        try:
+            page_html = response.text
+            content = await asyncio.to_thread(MainContentExtractor.extract, page_html, output_format="markdown")
+        except Exception as e:
+            return None, f"extraction failed ({e})"
+        content = (content or "").strip()
+        if len(content) < self.min_content_chars:
+            lowered = page_html.lower()
+            marker = next((m for m in BROWSER_REQUIRED_MARKERS if m in lowered), None)
+            return None, f"'{marker}' wall" if marker else f"only {len(content)} chars of static content"
+        title_match = _TITLE_PATTERN.search(page_html)
+        title = html.unescape(title_match.group(1)).strip() if title_match else url
+        return {"url": str(response.url), "title": title, "content": content[:MAX_CONTENT_CHARS_PER_PAGE]}, None
+
+    async def fetch(self, query: str) -> Optional[Dict[str, Any]]:
+        """A completed search result for `query`, or None to escalate to the browser agent."""
+        try:
+            urls = await self._search_urls(query)
+        except Exception as e:
+            logger.info(f"Fast fetch search failed for '{query}', escalating: {e}")
+            return None
+        if not urls:
+            logger.info(f"Fast fetch found no results for '{query}', escalating.")
+            return None
+
+        outcomes = await asyncio.gather(*[self._fetch_page(url) for url in urls])
+        pages = [page for page, _ in outcomes if page]
+        if not pages:
+            reasons = "; ".join(f"{url}: {reason}" for url, (_, reason) in zip(urls, outcomes))
+            logger.info(f"Fast fetch could not read any page for '{query}', escalating. {reasons}")
+            return None
+
+        result = "\n\n".join(
+            f"Source: {page['title']}\nURL: {page['url']}\n{page['content']}" for page in pages
+        )
+        logger.info(f"Fast fetch answered '{query}' from {len(pages)} page(s).")
+        return {"query": query, "result": result, "status": "completed", "tier": TIER_HTTP}
+
+    async def close(self):
+        await self._client.aclose()
+
+
+def count_search_tiers(search_results: List[Dict[str, Any]]) -> Dict[str, int]:
+    """Completed search queries by the tier that served them: http, browser or cache."""
+    counts = {TIER_HTTP: 0, TIER_BROWSER: 0, "cache": 0}
+    for result in search_results:
+        if result.get("tool_name") or result.get("status") != "completed":
+            continue
+        if result.get("cached"):
+            counts["cache"] += 1
+        else:
+            tier = result.get("tier", TIER_BROWSER)
+            counts[tier] = counts.get(tier, 0) + 1
+    return counts
+
+
+def format_search_tiers(counts: Dict[str, int]) -> str:
+    parts = [f"{counts.get(TIER_HTTP, 0)} by HTTP fetch", f"{counts.get(TIER_BROWSER, 0)} by the browser agent"]
+    if counts.get("cache"):
+        parts.append(f"{counts['cache']} from the search cache")
+    return "Search queries served: " + ", ".join(parts) + "."
@@ -0,0 +1,108 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = "./tmp/deep_research/cache"
+CACHE_DB_FILENAME = "search_cache.db"
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+DEFAULT_MAX_ENTRIES = 1000
+
+
+def normalize_query(query: str) -> str:
+    """Lowercases a query and strips punctuation and extra whitespace."""
+    return " ".join(re.sub(r"[^\w\s]", " ", query.lower()).split())
+
+
+def get_model_id(llm: Any) -> str:
+    """Best-effort identifier of the model behind a LangChain chat model."""
+    for attr in ("model_name", "model", "model_id"):
+        value = getattr(llm, attr, None)
+        if isinstance(value, str) and value:
+            return value
+    return type(llm).__name__
+
+
+class SearchResultCache:
+    """
+    Persistent SQLite cache of browser search results shared across deep research runs.
+    Entries are keyed by normalized query text plus model id, expire after `ttl_seconds`
+    and the least recently used ones are evicted beyond `max_entries`.
+    """
+
+    def __init__(
+            self,
+            cache_dir: str = DEFAULT_CACHE_DIR,
+            ttl_seconds: float = DEFAULT_TTL_SECONDS,
+            max_entries: int = DEFAULT_MAX_ENTRIES,
+    ):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.db_path = os.path.join(cache_dir, CACHE_DB_FILENAME)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS search_cache ("
+                "key TEXT PRIMARY KEY, query TEXT, model TEXT, result TEXT, "
+                "created_at REAL, last_accessed REAL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_search_cache_last_accessed ON search_cache (last_accessed)"
+            )
+
+    @staticmethod
+    def _key(query: str, model_id: str) -> str:
+        return hashlib.sha256(f"{normalize_query(query)}\0{model_id}".encode("utf-8")).hexdigest()
+
+    def get(self, query: str, model_id: str) -> Optional[Dict[str, Any]]:
+        """Returns the cached result for the query, or None if missing or expired."""
+        key = self._key(query, model_id)
+        now = time.time()
+        try:
+            with self._lock, self._conn:
+                row = self._conn.execute(
+                    "SELECT result, created_at FROM search_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if not row:
+                    return None
+                result, created_at = row
+                if self.ttl_seconds and now - created_at > self.ttl_seconds:
+                    self._conn.execute("DELETE FROM search_cache WHERE key = ?", (key,))
+                    return None
+                self._conn.execute("UPDATE search_cache SET last_accessed = ? WHERE key = ?", (now, key))
+            return json.loads(result)
+        except Exception as e:
+            logger.error(f"Failed to read search cache for '{query}': {e}")
+            return None
+
+    def put(self, query: str, model_id: str, result: Dict[str, Any]):
+        """Stores a result and evicts the least recently used entries beyond max_entries."""
+        key = self._key(query, model_id)
+        now = time.time()
+        try:
+            with self._lock, self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO search_cache (key, query, model, result, created_at, last_accessed) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, query, model_id, json.dumps(result, ensure_ascii=False), now, now),
+                )
+                self._conn.execute(
+                    "DELETE FROM search_cache WHERE key IN ("
+                    "SELECT key FROM search_cache ORDER BY last_accessed DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+        except Exception as e:
+            logger.error(f"Failed to write search cache for '{query}': {e}")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,156 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List, Optional
+
+from browser_use.browser.browser import BrowserConfig
+from browser_use.browser.context import BrowserContextConfig
+
+from .custom_browser import CustomBrowser
+from .custom_context import CustomBrowserContext
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_USES_PER_BROWSER = 20
+DEFAULT_IDLE_TIMEOUT = 300.0
+
+
+class _PooledBrowser:
+    def __init__(self, browser: CustomBrowser):
+        self.browser = browser
+        self.uses = 0
+        self.last_used = time.monotonic()
+
+
+class BrowserPool:
+    """
+    Keeps up to `size` launched CustomBrowser processes warm and hands out an isolated
+    CustomBrowserContext per lease. Browsers are recycled after `max_uses_per_browser`
+    leases, replaced when they fail a health check and closed after `idle_timeout` seconds
+    without a lease.
+    """
+
+    def __init__(
+            self,
+            browser_config: BrowserConfig,
+            size: int = 1,
+            max_uses_per_browser: int = DEFAULT_MAX_USES_PER_BROWSER,
+            idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+    ):
+        self.browser_config = browser_config
+        self.size = max(1, size)
+        self.max_uses_per_browser = max(1, max_uses_per_browser)
+        self.idle_timeout = idle_timeout
+        self._idle: List[_PooledBrowser] = []
+        self._semaphore = asyncio.Semaphore(self.size)
+        self._lock = asyncio.Lock()
+        self._reaper: Optional[asyncio.Task] = None
+        self._closed = False
+
+    async def start(self, prelaunch: Optional[int] = None) -> None:
+        """Pre-launch browsers so the first leases skip the cold start."""
+        count = self.size if prelaunch is None else min(max(prelaunch, 0), self.size)
+        launched = await asyncio.gather(*[self._launch() for _ in range(count)], return_exceptions=True)
+        async with self._lock:
+            for entry in launched:
+                if isinstance(entry, Exception):
+                    logger.error(f"Failed to pre-launch pooled browser: {entry}")
+                else:
+                    self._idle.append(entry)
+        logger.info(f"Browser pool started with {len(self._idle)}/{self.size} warm browsers.")
+        if self.idle_timeout and self.idle_timeout > 0 and not self._reaper:
+            self._reaper = asyncio.create_task(self._reap_idle())
+
+    async def _launch(self) -> _PooledBrowser:
+        browser = CustomBrowser(config=self.browser_config)
+        await browser.get_playwright_browser()
+        return _PooledBrowser(browser)
+
+    @staticmethod
+    def _is_healthy(entry: _PooledBrowser) -> bool:
+        playwright_browser = entry.browser.playwright_browser
+        try:
+            return playwright_browser is not None and playwright_browser.is_connected()
+        except Exception:
+            return False
+
+    @staticmethod
+    async def _discard(entry: _PooledBrowser) -> None:
+        try:
+            await entry.browser.close()
+        except Exception as e:
+            logger.error(f"Error closing pooled browser: {e}")
+
+    async def _acquire(self) -> _PooledBrowser:
+        await self._semaphore.acquire()
+        try:
+            async with self._lock:
+                while self._idle:
+                    entry = self._idle.pop()
+                    if self._is_healthy(entry):
+                        return entry
+                    logger.warning("Pooled browser failed health check, replacing it.")
+                    await self._discard(entry)
+            return await self._launch()
+        except BaseException:
+            self._semaphore.release()
+            raise
+
+    async def _release(self, entry: _PooledBrowser) -> None:
+        try:
+            entry.uses += 1
+            entry.last_used = time.monotonic()
+            if self._closed or not self._is_healthy(entry):
+                await self._discard(entry)
+            elif entry.uses >= self.max_uses_per_browser:
+                logger.info(f"Recycling pooled browser after {entry.uses} uses.")
+                await self._discard(entry)
+            else:
+                async with self._lock:
+                    self._idle.append(entry)
+        finally:
+            self._semaphore.release()
+
+    @asynccontextmanager
+    async def lease(self, context_config: Optional[BrowserContextConfig] = None) -> AsyncIterator[
+        CustomBrowserContext]:
+        """Leases a warm browser and yields a fresh context on it; the context is closed on exit."""
+        if self._closed:
+            raise RuntimeError("Browser pool is closed.")
+        entry = await self._acquire()
+        browser_context = None
+        try:
+            browser_context = await entry.browser.new_context(config=context_config)
+            yield browser_context
+        finally:
+            if browser_context:
+                try:
+                    await browser_context.close()
+                except Exception as e:
+                    logger.error(f"Error closing pooled browser context: {e}")
+            await self._release(entry)
+
+    async def _reap_idle(self) -> None:
+        interval = max(self.idle_timeout / 2, 1.0)
+        while not self._closed:
+            await asyncio.sleep(interval)
+            now = time.monotonic()
+            async with self._lock:
+                expired = [entry for entry in self._idle if now - entry.last_used >= self.idle_timeout]
+                self._idle = [entry for entry in self._idle if entry not in expired]
+            for entry in expired:
+                logger.info("Evicting idle pooled browser.")
+                await self._discard(entry)
+
+    async def close(self) -> None:
+        """Closes every idle browser; leased browsers are closed when their lease ends."""
+        self._closed = True
+        if self._reaper:
+            self._reaper.cancel()
+            self._reaper = None
+        async with self._lock:
+            idle, self._idle = self._idle, []
+        for entry in idle:
+            await self._discard(entry)
+        logger.info("Browser pool closed.")
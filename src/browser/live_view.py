@@ -0,0 +1,179 @@
+import asyncio
+import base64
+import hashlib
+import io
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from browser_use.browser.context import BrowserContext
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUALITY = 70
+MIN_QUALITY = 30
+MAX_QUALITY = 85
+QUALITY_STEP = 10
+DEFAULT_MAX_BYTES_PER_SECOND = 1_500_000  # Live view bandwidth budget per viewer
+QUALITY_ADJUST_INTERVAL = 2.0  # Seconds between screencast restarts for a new quality
+
+
+class LiveViewStreamer:
+    """
+    Produces live-view frames of the active page of a browser context for the UI.
+
+    On Chromium it uses the CDP screencast (Page.startScreencast): Chrome only emits a frame
+    when the page repaints, frames are downscaled to `max_width` x `max_height` by the browser,
+    and each frame is acknowledged only when the consumer takes it, so the frame rate follows
+    how fast the UI consumes frames. JPEG quality is lowered or raised to keep the consumed
+    bandwidth under `max_bytes_per_second`.
+
+    Elsewhere (or if CDP fails) it falls back to polling screenshots: frames that did not
+    change are skipped and the rest are downscaled and re-encoded as JPEG the same way.
+    """
+
+    def __init__(
+            self,
+            browser_context: BrowserContext,
+            max_width: Optional[int] = None,
+            max_height: Optional[int] = None,
+            quality: int = DEFAULT_QUALITY,
+            max_bytes_per_second: int = DEFAULT_MAX_BYTES_PER_SECOND,
+    ):
+        self.browser_context = browser_context
+        self.max_width = max_width
+        self.max_height = max_height
+        self.quality = quality
+        self.max_bytes_per_second = max_bytes_per_second
+        self._page = None
+        self._cdp_session = None
+        self._use_cdp = True
+        self._frame: Optional[str] = None
+        self._frame_session_id: Optional[int] = None
+        self._frame_version = 0
+        self._consumed_version = 0
+        self._last_frame_hash: Optional[str] = None
+        self._bytes_per_second = 0.0
+        self._last_consumed_at: Optional[float] = None
+        self._last_quality_change = 0.0
+
+    @staticmethod
+    def _decoded_size(frame: str) -> int:
+        """Byte size of a base64 frame once decoded, which is what viewers receive."""
+        return len(frame) * 3 // 4 - frame.count("=", -2)
+
+    def _screencast_params(self) -> Dict[str, Any]:
+        params = {"format": "jpeg", "quality": self.quality}
+        if self.max_width:
+            params["maxWidth"] = self.max_width
+        if self.max_height:
+            params["maxHeight"] = self.max_height
+        return params
+
+    def _on_screencast_frame(self, params: Dict[str, Any]):
+        # Chrome sends the next frame only after this one is acknowledged, which happens
+        # when the consumer takes it
+        self._frame = params["data"]
+        self._frame_session_id = params["sessionId"]
+        self._frame_version += 1
+
+    @staticmethod
+    async def _ack(cdp_session, session_id: int):
+        try:
+            await cdp_session.send("Page.screencastFrameAck", {"sessionId": session_id})
+        except Exception as e:
+            logger.debug(f"Failed to acknowledge screencast frame: {e}")
+
+    async def _start_screencast(self, page):
+        await self._stop_screencast()
+        self._cdp_session = await page.context.new_cdp_session(page)
+        self._cdp_session.on("Page.screencastFrame", self._on_screencast_frame)
+        await self._cdp_session.send("Page.startScreencast", self._screencast_params())
+        self._page = page
+        logger.debug(f"Started live view screencast (quality {self.quality}).")
+
+    async def _stop_screencast(self):
+        cdp_session, self._cdp_session = self._cdp_session, None
+        self._frame_session_id = None
+        self._page = None
+        if cdp_session:
+            try:
+                await cdp_session.send("Page.stopScreencast")
+                await cdp_session.detach()
+            except Exception as e:
+                logger.debug(f"Error stopping live view screencast: {e}")
+
+    def _adapt_quality(self, frame_size: int) -> bool:
+        """Tracks consumed bandwidth and returns True if the quality was changed."""
+        now = time.monotonic()
+        if self._last_consumed_at is not None:
+            elapsed = max(now - self._last_consumed_at, 1e-3)
+            self._bytes_per_second = 0.7 * self._bytes_per_second + 0.3 * (frame_size / elapsed)
+        self._last_consumed_at = now
+        if now - self._last_quality_change < QUALITY_ADJUST_INTERVAL:
+            return False
+
+        quality = self.quality
+        if self._bytes_per_second > self.max_bytes_per_second:
+            quality = max(self.quality - QUALITY_STEP, MIN_QUALITY)
+        elif self._bytes_per_second < self.max_bytes_per_second / 2:
+            quality = min(self.quality + QUALITY_STEP, MAX_QUALITY)
+        if quality == self.quality:
+            return False
+        logger.debug(f"Live view quality {self.quality} -> {quality} ({self._bytes_per_second:.0f} B/s).")
+        self.quality = quality
+        self._last_quality_change = now
+        return True
+
+    async def _next_cdp_frame(self, page) -> Optional[str]:
+        if page is not self._page or not self._cdp_session:
+            await self._start_screencast(page)
+        if self._frame_version == self._consumed_version:
+            return None
+        self._consumed_version = self._frame_version
+        frame = self._frame
+        if self._adapt_quality(self._decoded_size(frame)):
+            await self._start_screencast(page)  # Restart with the new quality
+        elif self._frame_session_id is not None:
+            await self._ack(self._cdp_session, self._frame_session_id)
+            self._frame_session_id = None
+        return frame
+
+    async def _next_polled_frame(self) -> Optional[str]:
+        frame = await self.browser_context.take_screenshot()
+        if not frame:
+            return None
+        frame_hash = hashlib.md5(frame.encode("ascii")).hexdigest()
+        if frame_hash == self._last_frame_hash:
+            return None
+        self._last_frame_hash = frame_hash
+        frame = await asyncio.to_thread(self._downscale, frame)
+        self._adapt_quality(self._decoded_size(frame))
+        return frame
+
+    def _downscale(self, frame: str) -> str:
+        """Fits a base64 screenshot into `max_width` x `max_height` and re-encodes it as JPEG at `quality`."""
+        from PIL import Image
+
+        with Image.open(io.BytesIO(base64.b64decode(frame))) as image:
+            image = image.convert("RGB")
+            if self.max_width or self.max_height:
+                image.thumbnail((self.max_width or image.width, self.max_height or image.height))
+            buffer = io.BytesIO()
+            image.save(buffer, format="JPEG", quality=self.quality)
+        return base64.b64encode(buffer.getvalue()).decode("ascii")
+
+    async def next_frame(self) -> Optional[str]:
+        """Returns a new base64 frame, or None if the page has not changed since the last one."""
+        page = await self.browser_context.get_current_page()
+        if self._use_cdp:
+            try:
+                return await self._next_cdp_frame(page)
+            except Exception as e:
+                logger.info(f"CDP screencast unavailable, falling back to screenshots: {e}")
+                self._use_cdp = False
+                await self._stop_screencast()
+        return await self._next_polled_frame()
+
+    async def close(self):
+        await self._stop_screencast()
@@ -27,7 +27,12 @@ import os
 from langchain_core.language_models.chat_models import BaseChatModel
 from browser_use.agent.views import ActionModel, ActionResult
 
-from src.utils.mcp_client import create_tool_param_model, setup_mcp_client_and_tools
+from src.utils.mcp_client import (
+    create_tool_param_model,
+    get_mcp_manager,
+    release_mcp_client,
+    setup_mcp_client_and_tools,
+)
 
 from browser_use.utils import time_execution_sync
 
@@ -127,7 +132,14 @@ class CustomController(Controller):
                         # this is a mcp tool
                         logger.debug(f"Invoke MCP tool: {action_name}")
                         mcp_tool = self.registry.registry.actions.get(action_name).function
-                        result = await mcp_tool.ainvoke(params)
+                        try:
+                            result = await mcp_tool.ainvoke(params)
+                        except Exception:
+                            # The server may have crashed: retry once on a restarted connection
+                            if not await self.refresh_mcp_client():
+                                raise
+                            mcp_tool = self.registry.registry.actions.get(action_name).function
+                            result = await mcp_tool.ainvoke(params)
                     else:
                         result = await self.registry.execute_action(
                             action_name,
@@ -177,6 +189,21 @@ class CustomController(Controller):
         else:
             logger.warning(f"MCP client not started.")
 
+    async def refresh_mcp_client(self) -> bool:
+        """
+        Restarts the shared MCP connection if its servers stopped answering and re-registers
+        the tools. Returns True if the client was replaced.
+        """
+        if not self.mcp_client:
+            return False
+        client = await get_mcp_manager().refresh(self.mcp_server_config)
+        if client is None or client is self.mcp_client:
+            return False
+        self.mcp_client = client
+        self.register_mcp_tools()
+        return True
+
     async def close_mcp_client(self):
         if self.mcp_client:
-            await self.mcp_client.__aexit__(None, None, None)
+            await release_mcp_client(self.mcp_server_config)
+            self.mcp_client = None
@@ -0,0 +1,230 @@
+import hashlib
+import json
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.embeddings import Embeddings
+from langchain_core.load import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = "./tmp/llm_cache"
+CACHE_DB_FILENAME = "llm_cache.db"
+DEFAULT_MAX_ENTRIES = 5000
+LLM_CACHE_MODES = ["off", "exact", "semantic"]
+DEFAULT_SIMILARITY_THRESHOLD = float(os.getenv("LLM_CACHE_SIMILARITY_THRESHOLD", "0.95"))
+SEMANTIC_SCAN_LIMIT = 500  # Most recent entries of the same model compared in semantic mode
+EMBEDDING_TEXT_CHARS = 8000  # Longer prompts only get exact matching
+# llm_string parameters of models bound to tools or a structured output schema
+TOOL_BINDING_MARKERS = ("'tools'", "'tool_choice'", "'functions'", "'response_format'")
+
+
+def _semantic_text(prompt: str, llm_string: str) -> Optional[str]:
+    """
+    Full text of a serialized chat prompt for embedding, or None if the request may not be
+    answered by a similar prompt: prompts with images or tool calls/results, models bound to
+    tools, and prompts too long to embed whole. Those requests act on page or tool state
+    that text similarity does not capture (e.g. browser agent steps), so they only get exact
+    matching; text-only requests such as research planning and synthesis qualify.
+    """
+    if any(marker in llm_string for marker in TOOL_BINDING_MARKERS):
+        return None
+    try:
+        messages = json.loads(prompt)
+    except ValueError:
+        return prompt if len(prompt) <= EMBEDDING_TEXT_CHARS else None
+    parts = []
+    for message in messages if isinstance(messages, list) else [messages]:
+        if not isinstance(message, dict):
+            return None
+        kwargs = message.get("kwargs", {})
+        if message.get("id", [""])[-1] == "ToolMessage" or kwargs.get("tool_calls"):
+            return None
+        content = kwargs.get("content", "")
+        if isinstance(content, list):
+            if any(not isinstance(block, dict) or block.get("type", "text") != "text" for block in content):
+                return None
+            content = " ".join(block.get("text", "") for block in content)
+        parts.append(str(content))
+    text = "\n".join(parts)
+    return text if len(text) <= EMBEDDING_TEXT_CHARS else None
+
+
+def _cosine_similarity(a: List[float], b: List[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+def _default_embeddings() -> Optional[Embeddings]:
+    """OpenAI embeddings for semantic mode, if an OpenAI key is configured."""
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        return None
+    from langchain_openai import OpenAIEmbeddings
+
+    return OpenAIEmbeddings(
+        model=os.getenv("LLM_CACHE_EMBEDDING_MODEL", "text-embedding-3-small"),
+        api_key=api_key,
+        base_url=os.getenv("OPENAI_ENDPOINT") or None,
+    )
+
+
+class SQLiteLLMCache(BaseCache):
+    """
+    Local LLM response cache, set on chat models through their `cache` field.
+
+    Exact mode keys entries by the serialized messages plus the model's llm_string (model
+    name, temperature, bound tools, ...). With `embeddings` set (semantic mode), a miss on a
+    text-only, tool-free request falls back to the most similar earlier prompt of the same
+    model, if its cosine similarity reaches `similarity_threshold`; other requests only
+    match exactly. `stats` counts hits and misses.
+    """
+
+    def __init__(
+            self,
+            cache_dir: str = DEFAULT_CACHE_DIR,
+            embeddings: Optional[Embeddings] = None,
+            similarity_threshold: float = DEFAULT_SIMILARITY_THRESHOLD,
+            max_entries: int = DEFAULT_MAX_ENTRIES,
+    ):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.db_path = os.path.join(cache_dir, CACHE_DB_FILENAME)
+        self.embeddings = embeddings
+        self.similarity_threshold = similarity_threshold
+        self.max_entries = max_entries
+        self.stats: Dict[str, int] = {"hits": 0, "semantic_hits": 0, "misses": 0}
+        self._pending_embeddings: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, llm_hash TEXT, generations TEXT, embedding TEXT, created_at REAL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_llm_cache_llm ON llm_cache (llm_hash, created_at)"
+            )
+
+    @staticmethod
+    def _hash(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _count(self, stat: str):
+        with self._lock:
+            self.stats[stat] += 1
+
+    def _semantic_lookup(self, key: str, text: str, llm_hash: str) -> Optional[str]:
+        vector = self.embeddings.embed_query(text)
+        with self._lock:
+            self._pending_embeddings[key] = vector
+            rows = self._conn.execute(
+                "SELECT generations, embedding FROM llm_cache WHERE llm_hash = ? AND embedding IS NOT NULL "
+                "ORDER BY created_at DESC LIMIT ?",
+                (llm_hash, SEMANTIC_SCAN_LIMIT),
+            ).fetchall()
+        best: Tuple[float, Optional[str]] = (0.0, None)
+        for generations, embedding in rows:
+            score = _cosine_similarity(vector, json.loads(embedding))
+            if score > best[0]:
+                best = (score, generations)
+        return best[1] if best[0] >= self.similarity_threshold else None
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        key = self._hash(prompt + "\0" + llm_string)
+        try:
+            with self._lock:
+                row = self._conn.execute("SELECT generations FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row:
+                self._count("hits")
+                return loads(row[0])
+            text = _semantic_text(prompt, llm_string) if self.embeddings else None
+            if text:
+                generations = self._semantic_lookup(key, text, self._hash(llm_string))
+                if generations:
+                    with self._lock:
+                        self._pending_embeddings.pop(key, None)
+                    self._count("semantic_hits")
+                    return loads(generations)
+        except Exception as e:
+            logger.error(f"Failed to read LLM cache: {e}")
+        self._count("misses")
+        return None
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        key = self._hash(prompt + "\0" + llm_string)
+        with self._lock:
+            embedding = self._pending_embeddings.pop(key, None)
+        try:
+            if self.embeddings and embedding is None:
+                text = _semantic_text(prompt, llm_string)
+                embedding = self.embeddings.embed_query(text) if text else None
+            with self._lock, self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, llm_hash, generations, embedding, created_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, self._hash(llm_string), dumps(return_val),
+                     json.dumps(embedding) if embedding else None, time.time()),
+                )
+                self._conn.execute(
+                    "DELETE FROM llm_cache WHERE key IN ("
+                    "SELECT key FROM llm_cache ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+        except Exception as e:
+            logger.error(f"Failed to write LLM cache: {e}")
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM llm_cache")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_caches: Dict[Tuple[str, str], SQLiteLLMCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_response_cache(mode: Optional[str], namespace: str = "default") -> Optional[SQLiteLLMCache]:
+    """
+    The response cache for `mode` ("off", "exact" or "semantic"), or None when off. Each
+    namespace (e.g. one per UI tab) has its own counters; entries are shared by all of them.
+    Semantic mode needs OPENAI_API_KEY for embeddings and falls back to exact mode without it.
+    """
+    if not mode or mode == "off":
+        return None
+    with _caches_lock:
+        cache = _caches.get((mode, namespace))
+        if cache is None:
+            embeddings = None
+            if mode == "semantic":
+                embeddings = _default_embeddings()
+                if embeddings is None:
+                    logger.warning("Semantic LLM cache needs OPENAI_API_KEY for embeddings; using exact matching.")
+            cache = SQLiteLLMCache(embeddings=embeddings)
+            _caches[(mode, namespace)] = cache
+        return cache
+
+
+def format_cache_stats(namespace: str = "default") -> str:
+    """Hit/miss counters of a namespace across its cache modes, for display."""
+    totals = {"hits": 0, "semantic_hits": 0, "misses": 0}
+    with _caches_lock:
+        caches = [cache for (_, cache_namespace), cache in _caches.items() if cache_namespace == namespace]
+    if not caches:
+        return "LLM cache: off"
+    for cache in caches:
+        for stat, value in cache.stats.items():
+            totals[stat] += value
+    text = f"LLM cache: {totals['hits']} hits, {totals['misses']} misses"
+    if totals["semantic_hits"]:
+        text += f", {totals['semantic_hits']} similar-prompt hits"
+    return text
@@ -1,5 +1,11 @@
 from openai import OpenAI
 import pdb
+import hashlib
+import importlib.util
+import logging
+import threading
+import time
+import httpx
 from langchain_openai import ChatOpenAI
 from langchain_core.globals import get_llm_cache
 from langchain_core.language_models.base import (
@@ -35,8 +41,10 @@ from typing import (
     TYPE_CHECKING,
     Any,
     Callable,
+    Dict,
     Literal,
     Optional,
+    Tuple,
     Union,
     cast, List,
 )
@@ -50,6 +58,19 @@ from langchain_aws import ChatBedrock
 from pydantic import SecretStr
 
 from src.utils import config
+from src.utils.llm_cache import get_response_cache
+from src.utils.llm_scheduler import get_scheduler_hooks
+
+logger = logging.getLogger(__name__)
+
+# Registered LLM clients unused for this long are dropped from the registry
+LLM_CLIENT_IDLE_TTL = float(os.getenv("LLM_CLIENT_IDLE_TTL", "900"))
+LLM_HTTP_MAX_CONNECTIONS = 100
+LLM_HTTP_MAX_KEEPALIVE = 20
+LLM_HTTP_KEEPALIVE_EXPIRY = 120.0  # Seconds an idle pooled connection is kept open
+LLM_HTTP_TIMEOUT = httpx.Timeout(600.0, connect=10.0)
+# HTTP/2 needs the optional h2 package; without it the pools use HTTP/1.1 keep-alive
+LLM_HTTP2 = importlib.util.find_spec("h2") is not None
 
 
 class DeepSeekR1ChatOpenAI(ChatOpenAI):
@@ -58,7 +79,8 @@ class DeepSeekR1ChatOpenAI(ChatOpenAI):
         super().__init__(*args, **kwargs)
         self.client = OpenAI(
             base_url=kwargs.get("base_url"),
-            api_key=kwargs.get("api_key")
+            api_key=kwargs.get("api_key"),
+            http_client=kwargs.get("http_client"),
         )
 
     async def ainvoke(
@@ -149,13 +171,96 @@ class DeepSeekR1ChatOllama(ChatOllama):
         return AIMessage(content=content, reasoning_content=reasoning_content)
 
 
+class LLMClientRegistry:
+    """
+    Process-wide registry of LLM clients, keyed by provider, model, base_url, a hash of the
+    API key, temperature and the remaining model settings. Repeated task submissions with
+    the same settings get the same client back instead of a new one with a cold connection
+    pool. OpenAI-compatible clients additionally share one keep-alive (HTTP/2 when available)
+    httpx pool per base_url, so TLS sessions survive across models and runs.
+
+    Clients not requested for `idle_ttl` seconds are dropped; a client still held by a
+    running agent keeps working, it is just no longer handed out.
+    """
+
+    def __init__(self, idle_ttl: float = LLM_CLIENT_IDLE_TTL):
+        self.idle_ttl = idle_ttl
+        self._clients: Dict[tuple, Tuple[Any, float]] = {}
+        self._http_clients: Dict[str, Tuple[httpx.Client, httpx.AsyncClient]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(provider: str, kwargs: Dict[str, Any]) -> tuple:
+        items = []
+        for name, value in sorted(kwargs.items()):
+            if name == "api_key":
+                value = hashlib.sha256(str(value).encode("utf-8")).hexdigest()[:16] if value else None
+            items.append((name, value if isinstance(value, (str, int, float, bool, type(None))) else repr(value)))
+        return (provider,) + tuple(items)
+
+    def get(self, provider: str, kwargs: Dict[str, Any], factory: Callable[[], Any]) -> Any:
+        key = self.key(provider, kwargs)
+        now = time.monotonic()
+        with self._lock:
+            self._evict_idle(now)
+            entry = self._clients.get(key)
+            if entry:
+                self._clients[key] = (entry[0], now)
+                return entry[0]
+        llm = factory()
+        with self._lock:
+            # Keep the first client if another thread created one meanwhile
+            llm = self._clients.setdefault(key, (llm, now))[0]
+        logger.debug(f"Registered LLM client for {provider} ({len(self._clients)} cached).")
+        return llm
+
+    def _evict_idle(self, now: float):
+        for key, (_, last_used) in list(self._clients.items()):
+            if now - last_used > self.idle_ttl:
+                del self._clients[key]
+                logger.debug(f"Evicted idle LLM client for {key[0]}.")
+
+    def http_clients(self, base_url: Optional[str]) -> Tuple[httpx.Client, httpx.AsyncClient]:
+        """The shared sync/async httpx pools for `base_url`."""
+        pool_key = base_url or ""
+        with self._lock:
+            clients = self._http_clients.get(pool_key)
+            if clients is None:
+                limits = httpx.Limits(
+                    max_connections=LLM_HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=LLM_HTTP_MAX_KEEPALIVE,
+                    keepalive_expiry=LLM_HTTP_KEEPALIVE_EXPIRY,
+                )
+                clients = (
+                    httpx.Client(http2=LLM_HTTP2, limits=limits, timeout=LLM_HTTP_TIMEOUT),
+                    httpx.AsyncClient(http2=LLM_HTTP2, limits=limits, timeout=LLM_HTTP_TIMEOUT),
+                )
+                self._http_clients[pool_key] = clients
+            return clients
+
+    def clear(self):
+        with self._lock:
+            self._clients.clear()
+
+
+llm_client_registry = LLMClientRegistry()
+
+
+def _openai_http_kwargs(base_url: Optional[str]) -> Dict[str, Any]:
+    http_client, http_async_client = llm_client_registry.http_clients(base_url)
+    return {"http_client": http_client, "http_async_client": http_async_client}
+
+
 def get_llm_model(provider: str, **kwargs):
     """
-    Get LLM model
+    Get LLM model, reusing a registered client with the same settings if there is one
     :param provider: LLM provider
-    :param kwargs:
+    :param kwargs: model settings; `cache_mode` ("off", "exact" or "semantic") and
+        `cache_namespace` select the response cache set on the model
     :return:
     """
+    cache_mode = kwargs.pop("cache_mode", None) or "off"
+    cache_namespace = kwargs.pop("cache_namespace", None) or "default"
     if provider not in ["ollama", "bedrock"]:
         env_var = f"{provider.upper()}_API_KEY"
         api_key = kwargs.get("api_key", "") or os.getenv(env_var, "")
@@ -165,6 +270,25 @@ def get_llm_model(provider: str, **kwargs):
             raise ValueError(error_msg)
         kwargs["api_key"] = api_key
 
+    def create_llm():
+        llm = _create_llm_model(provider, **kwargs)
+        cache = get_response_cache(cache_mode, cache_namespace)
+        if cache is not None:
+            llm.cache = cache
+        # Requests of every model of this provider go through one shared scheduler
+        hooks = get_scheduler_hooks(provider)
+        if hooks:
+            rate_limiter, callback_handler = hooks
+            llm.rate_limiter = rate_limiter
+            llm.callbacks = (llm.callbacks or []) + [callback_handler]
+        return llm
+
+    registry_kwargs = dict(kwargs, cache_mode=cache_mode, cache_namespace=cache_namespace)
+    return llm_client_registry.get(provider, registry_kwargs, create_llm)
+
+
+def _create_llm_model(provider: str, **kwargs):
+    api_key = kwargs.get("api_key")
     if provider == "anthropic":
         if not kwargs.get("base_url", ""):
             base_url = "https://api.anthropic.com"
@@ -204,6 +328,7 @@ def get_llm_model(provider: str, **kwargs):
             temperature=kwargs.get("temperature", 0.0),
             base_url=base_url,
             api_key=api_key,
+            **_openai_http_kwargs(base_url),
         )
     elif provider == "grok":
         if not kwargs.get("base_url", ""):
@@ -216,6 +341,7 @@ def get_llm_model(provider: str, **kwargs):
             temperature=kwargs.get("temperature", 0.0),
             base_url=base_url,
             api_key=api_key,
+            **_openai_http_kwargs(base_url),
         )
     elif provider == "deepseek":
         if not kwargs.get("base_url", ""):
@@ -229,6 +355,7 @@ def get_llm_model(provider: str, **kwargs):
                 temperature=kwargs.get("temperature", 0.0),
                 base_url=base_url,
                 api_key=api_key,
+                **_openai_http_kwargs(base_url),
             )
         else:
             return ChatOpenAI(
@@ -236,6 +363,7 @@ def get_llm_model(provider: str, **kwargs):
                 temperature=kwargs.get("temperature", 0.0),
                 base_url=base_url,
                 api_key=api_key,
+                **_openai_http_kwargs(base_url),
             )
     elif provider == "google":
         return ChatGoogleGenerativeAI(
@@ -276,6 +404,7 @@ def get_llm_model(provider: str, **kwargs):
             api_version=api_version,
             azure_endpoint=base_url,
             api_key=api_key,
+            **_openai_http_kwargs(base_url),
         )
     elif provider == "alibaba":
         if not kwargs.get("base_url", ""):
@@ -288,6 +417,7 @@ def get_llm_model(provider: str, **kwargs):
             temperature=kwargs.get("temperature", 0.0),
             base_url=base_url,
             api_key=api_key,
+            **_openai_http_kwargs(base_url),
         )
     elif provider == "ibm":
         parameters = {
@@ -312,6 +442,7 @@ def get_llm_model(provider: str, **kwargs):
             temperature=kwargs.get("temperature", 0.0),
             base_url=os.getenv("MOONSHOT_ENDPOINT"),
             api_key=os.getenv("MOONSHOT_API_KEY"),
+            **_openai_http_kwargs(os.getenv("MOONSHOT_ENDPOINT")),
         )
     elif provider == "unbound":
         return ChatOpenAI(
@@ -319,6 +450,7 @@ def get_llm_model(provider: str, **kwargs):
             temperature=kwargs.get("temperature", 0.0),
             base_url=os.getenv("UNBOUND_ENDPOINT", "https://api.getunbound.ai"),
             api_key=api_key,
+            **_openai_http_kwargs(os.getenv("UNBOUND_ENDPOINT", "https://api.getunbound.ai")),
         )
     elif provider == "siliconflow":
         if not kwargs.get("api_key", ""):
@@ -334,6 +466,7 @@ def get_llm_model(provider: str, **kwargs):
             base_url=base_url,
             model_name=kwargs.get("model_name", "Qwen/QwQ-32B"),
             temperature=kwargs.get("temperature", 0.0),
+            **_openai_http_kwargs(base_url),
         )
     elif provider == "modelscope":
         if not kwargs.get("api_key", ""):
@@ -349,6 +482,7 @@ def get_llm_model(provider: str, **kwargs):
             base_url=base_url,
             model_name=kwargs.get("model_name", "Qwen/QwQ-32B"),
             temperature=kwargs.get("temperature", 0.0),
+            **_openai_http_kwargs(base_url),
         )
     else:
         raise ValueError(f"Unsupported provider: {provider}")
@@ -0,0 +1,375 @@
+import asyncio
+import contextvars
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import LLMResult
+from langchain_core.rate_limiters import BaseRateLimiter
+
+logger = logging.getLogger(__name__)
+
+# Per-provider budgets, e.g. LLM_RPM_OPENAI=500 / LLM_TPM_OPENAI=200000; 0 means no fixed limit
+DEFAULT_RPM = int(os.getenv("LLM_DEFAULT_RPM", "0"))
+DEFAULT_TPM = int(os.getenv("LLM_DEFAULT_TPM", "0"))
+LLM_SCHEDULER_ENABLED = os.getenv("LLM_SCHEDULER", "true").lower() in ("true", "1", "yes")
+
+MAX_BACKOFF_SECONDS = 60.0
+MIN_ADAPTIVE_RPM = 1.0
+ADAPTIVE_DECREASE = 0.5  # Rate multiplier after a 429
+ADAPTIVE_INCREASE = 1.1  # Rate multiplier after each success, until the limit is lifted
+WAIT_SAMPLES = 200  # Recent wait times kept for the metrics
+
+# Requests are queued fairly across runs; a run is whatever sets this key (agents set it
+# when they start, and tasks they spawn inherit it)
+llm_run_key: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("llm_run_key", default=None)
+
+
+def _estimate_tokens(messages: List[BaseMessage]) -> int:
+    return sum(len(str(message.content)) for message in messages) // 4
+
+
+def _is_rate_limit_error(error: BaseException) -> bool:
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    if status == 429:
+        return True
+    text = str(error).lower()
+    return "429" in text or "rate limit" in text or "too many requests" in text
+
+
+def _retry_after(error: BaseException) -> Optional[float]:
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    try:
+        return float(headers.get("retry-after")) if headers and headers.get("retry-after") else None
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """Refills `rate_per_minute` units per minute up to one minute's worth; may go into debt."""
+
+    def __init__(self, rate_per_minute: float):
+        self.rate_per_minute = rate_per_minute
+        self.tokens = rate_per_minute
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.rate_per_minute, self.tokens + (now - self._updated) * self.rate_per_minute / 60.0)
+        self._updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until `amount` can be taken (0 if available now)."""
+        self._refill(now)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) * 60.0 / self.rate_per_minute
+
+    def take(self, amount: float, now: float):
+        self._refill(now)
+        self.tokens -= amount
+
+
+class ProviderScheduler:
+    """
+    Admission control for one provider's LLM requests.
+
+    - RPM: a token bucket of requests per minute (`rpm`, 0 for none).
+    - TPM: a token bucket of LLM tokens per minute (`tpm`, 0 for none). Prompt tokens are
+      estimated when a request starts and corrected with the reported usage when it ends;
+      requests wait while the bucket is in debt.
+    - Adaptive backoff: a 429 pauses the provider (Retry-After, else exponential) and halves
+      the request rate; each success raises it by 10% until the limit is lifted again.
+    - Fairness: waiting requests are admitted round-robin across runs (`llm_run_key`), so
+      one deep research run with many sub-agents cannot starve a browser agent.
+    """
+
+    def __init__(self, provider: str, rpm: int = 0, tpm: int = 0):
+        self.provider = provider
+        self.rpm = rpm
+        self.tpm = tpm
+        self._lock = threading.Lock()
+        self._request_bucket = TokenBucket(rpm) if rpm else None
+        self._token_bucket = TokenBucket(tpm) if tpm else None
+        self._adaptive_rpm: Optional[float] = None
+        self._adaptive_bucket: Optional[TokenBucket] = None
+        self._backoff_until = 0.0
+        self._consecutive_rate_limits = 0
+        self._recent_requests: Deque[float] = deque()
+        self._estimates: Dict[UUID, int] = {}
+        # Async waiters: run key -> FIFO of futures, served round-robin by the dispatcher
+        self._waiters: Dict[str, Deque[asyncio.Future]] = {}
+        self._run_order: Deque[str] = deque()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._sync_waiting = 0
+        self.metrics: Dict[str, Any] = {"requests": 0, "rate_limited": 0, "tokens": 0}
+        self._wait_times: Deque[float] = deque(maxlen=WAIT_SAMPLES)
+
+    # --- Admission ---
+
+    def _admission_delay(self, now: float) -> float:
+        """Seconds until one more request may start; 0 means now."""
+        delay = max(self._backoff_until - now, 0.0)
+        if self._request_bucket:
+            delay = max(delay, self._request_bucket.wait_time(1, now))
+        if self._adaptive_bucket:
+            delay = max(delay, self._adaptive_bucket.wait_time(1, now))
+        if self._token_bucket:
+            delay = max(delay, self._token_bucket.wait_time(0, now))
+        return delay
+
+    def _admit(self, now: float):
+        if self._request_bucket:
+            self._request_bucket.take(1, now)
+        if self._adaptive_bucket:
+            self._adaptive_bucket.take(1, now)
+        self._recent_requests.append(now)
+        while self._recent_requests and now - self._recent_requests[0] > 60.0:
+            self._recent_requests.popleft()
+        self.metrics["requests"] += 1
+
+    def _try_admit(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            delay = self._admission_delay(now)
+            if delay <= 0:
+                self._admit(now)
+            return delay
+
+    def acquire(self, blocking: bool = True) -> bool:
+        started = time.monotonic()
+        with self._lock:
+            self._sync_waiting += 1
+        try:
+            while True:
+                delay = self._try_admit()
+                if delay <= 0:
+                    self._wait_times.append(time.monotonic() - started)
+                    return True
+                if not blocking:
+                    return False
+                time.sleep(min(delay, 1.0))
+        finally:
+            with self._lock:
+                self._sync_waiting -= 1
+
+    async def aacquire(self, blocking: bool = True) -> bool:
+        loop = asyncio.get_running_loop()
+        if not self._waiters and self._try_admit() <= 0:
+            self._wait_times.append(0.0)
+            return True
+        if not blocking:
+            return False
+        if self._dispatcher and not self._dispatcher.done() and self._dispatcher.get_loop() is not loop:
+            return await self._poll_acquire()  # The fair queue belongs to another event loop
+        run_key = llm_run_key.get() or "default"
+        future = loop.create_future()
+        if run_key not in self._waiters:
+            self._waiters[run_key] = deque()
+            self._run_order.append(run_key)
+        self._waiters[run_key].append(future)
+        if self._dispatcher is None or self._dispatcher.done():
+            self._wakeup = asyncio.Event()
+            self._dispatcher = loop.create_task(self._dispatch())
+        self._wakeup.set()
+        started = time.monotonic()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if not future.done():
+                future.cancel()
+            raise
+        self._wait_times.append(time.monotonic() - started)
+        return True
+
+    async def _poll_acquire(self) -> bool:
+        started = time.monotonic()
+        while True:
+            delay = self._try_admit()
+            if delay <= 0:
+                self._wait_times.append(time.monotonic() - started)
+                return True
+            await asyncio.sleep(min(delay, 1.0))
+
+    async def _dispatch(self):
+        """Admits queued requests one at a time, taking runs in turn."""
+        while self._run_order:
+            run_key = self._run_order[0]
+            waiters = self._waiters[run_key]
+            while waiters and waiters[0].done():  # Cancelled while waiting
+                waiters.popleft()
+            if not waiters:
+                self._run_order.popleft()
+                del self._waiters[run_key]
+                continue
+            delay = self._try_admit()
+            if delay > 0:
+                self._wakeup.clear()
+                try:
+                    # Woken early by a 429 backoff change or a new waiter; re-evaluate then
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=min(delay, 1.0))
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            waiters.popleft().set_result(True)
+            self._run_order.rotate(-1)
+            if not waiters:
+                self._run_order.remove(run_key)
+                del self._waiters[run_key]
+
+    # --- Feedback from the callback handler ---
+
+    def on_request_start(self, run_id: UUID, estimated_tokens: int):
+        with self._lock:
+            self._estimates[run_id] = estimated_tokens
+            if self._token_bucket:
+                self._token_bucket.take(estimated_tokens, time.monotonic())
+
+    def on_request_end(self, run_id: UUID, total_tokens: Optional[int]):
+        with self._lock:
+            estimate = self._estimates.pop(run_id, 0)
+            if total_tokens:
+                self.metrics["tokens"] += total_tokens
+                if self._token_bucket:
+                    self._token_bucket.take(total_tokens - estimate, time.monotonic())
+            self._consecutive_rate_limits = 0
+            if self._adaptive_rpm is not None:
+                self._adaptive_rpm *= ADAPTIVE_INCREASE
+                recovered = (self.rpm and self._adaptive_rpm >= self.rpm) or (
+                        self._adaptive_rpm > 10 * max(len(self._recent_requests), 1))
+                if recovered:
+                    logger.info(f"LLM scheduler: lifted adaptive limit for {self.provider}.")
+                    self._adaptive_rpm = None
+                    self._adaptive_bucket = None
+                else:
+                    self._adaptive_bucket.rate_per_minute = self._adaptive_rpm
+
+    def on_request_error(self, run_id: UUID, error: BaseException):
+        with self._lock:
+            self._estimates.pop(run_id, None)
+            if not _is_rate_limit_error(error):
+                return
+            now = time.monotonic()
+            self.metrics["rate_limited"] += 1
+            self._consecutive_rate_limits += 1
+            backoff = _retry_after(error) or min(2.0 ** self._consecutive_rate_limits, MAX_BACKOFF_SECONDS)
+            self._backoff_until = max(self._backoff_until, now + backoff)
+            current_rpm = self._adaptive_rpm or self.rpm or max(len(self._recent_requests), 1)
+            self._adaptive_rpm = max(current_rpm * ADAPTIVE_DECREASE, MIN_ADAPTIVE_RPM)
+            if self._adaptive_bucket is None:
+                self._adaptive_bucket = TokenBucket(self._adaptive_rpm)
+                self._adaptive_bucket.tokens = 0
+            self._adaptive_bucket.rate_per_minute = self._adaptive_rpm
+        logger.warning(
+            f"LLM scheduler: {self.provider} rate limited; pausing {backoff:.1f}s, "
+            f"limiting to {self._adaptive_rpm:.1f} requests/min."
+        )
+        if self._wakeup and self._dispatcher and not self._dispatcher.done():
+            self._dispatcher.get_loop().call_soon_threadsafe(self._wakeup.set)
+
+    # --- Metrics ---
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            waits = list(self._wait_times)
+            queue_depth = sum(len(w) for w in self._waiters.values()) + self._sync_waiting
+            return {
+                **self.metrics,
+                "queue_depth": queue_depth,
+                "avg_wait": sum(waits) / len(waits) if waits else 0.0,
+                "max_wait": max(waits) if waits else 0.0,
+                "requests_last_minute": len(self._recent_requests),
+                "adaptive_rpm": self._adaptive_rpm,
+            }
+
+
+class SchedulerRateLimiter(BaseRateLimiter):
+    """Rate limiter set on chat models (their `rate_limiter` field); admits through a ProviderScheduler."""
+
+    def __init__(self, scheduler: ProviderScheduler):
+        self.scheduler = scheduler
+
+    def acquire(self, *, blocking: bool = True) -> bool:
+        return self.scheduler.acquire(blocking=blocking)
+
+    async def aacquire(self, *, blocking: bool = True) -> bool:
+        return await self.scheduler.aacquire(blocking=blocking)
+
+
+class SchedulerCallbackHandler(BaseCallbackHandler):
+    """Reports token usage and 429s of a chat model back to its ProviderScheduler."""
+
+    run_inline = True  # Cheap bookkeeping; no need for a thread hop
+
+    def __init__(self, scheduler: ProviderScheduler):
+        self.scheduler = scheduler
+
+    def on_chat_model_start(
+            self, serialized: Dict[str, Any], messages: List[List[BaseMessage]], *, run_id: UUID, **kwargs: Any
+    ) -> Any:
+        self.scheduler.on_request_start(run_id, sum(_estimate_tokens(batch) for batch in messages))
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> Any:
+        total_tokens = (response.llm_output or {}).get("token_usage", {}).get("total_tokens")
+        if not total_tokens:
+            for generations in response.generations:
+                for generation in generations:
+                    usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                    if usage:
+                        total_tokens = (total_tokens or 0) + usage.get("total_tokens", 0)
+        self.scheduler.on_request_end(run_id, total_tokens)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> Any:
+        self.scheduler.on_request_error(run_id, error)
+
+
+_schedulers: Dict[str, ProviderScheduler] = {}
+_schedulers_lock = threading.Lock()
+
+
+def get_provider_scheduler(provider: str) -> ProviderScheduler:
+    """The process-wide scheduler of `provider`, with budgets from LLM_RPM_<PROVIDER>/LLM_TPM_<PROVIDER>."""
+    with _schedulers_lock:
+        scheduler = _schedulers.get(provider)
+        if scheduler is None:
+            rpm = int(os.getenv(f"LLM_RPM_{provider.upper()}", DEFAULT_RPM))
+            tpm = int(os.getenv(f"LLM_TPM_{provider.upper()}", DEFAULT_TPM))
+            scheduler = ProviderScheduler(provider, rpm=rpm, tpm=tpm)
+            _schedulers[provider] = scheduler
+        return scheduler
+
+
+def get_scheduler_hooks(provider: str) -> Optional[Tuple[SchedulerRateLimiter, SchedulerCallbackHandler]]:
+    """The rate limiter and callback handler to set on a chat model of `provider`, or None if disabled."""
+    if not LLM_SCHEDULER_ENABLED:
+        return None
+    scheduler = get_provider_scheduler(provider)
+    return SchedulerRateLimiter(scheduler), SchedulerCallbackHandler(scheduler)
+
+
+def scheduler_metrics() -> Dict[str, Dict[str, Any]]:
+    with _schedulers_lock:
+        schedulers = list(_schedulers.values())
+    return {scheduler.provider: scheduler.snapshot() for scheduler in schedulers}
+
+
+def format_scheduler_metrics() -> str:
+    """Queue depth and wait times per provider, for display."""
+    parts = []
+    for provider, metrics in scheduler_metrics().items():
+        if not metrics["requests"]:
+            continue
+        part = (
+            f"{provider}: {metrics['queue_depth']} queued, wait avg {metrics['avg_wait']:.1f}s / "
+            f"max {metrics['max_wait']:.1f}s"
+        )
+        if metrics["rate_limited"]:
+            part += f", {metrics['rate_limited']} rate limited"
+        parts.append(part)
+    return "LLM scheduler: " + ("; ".join(parts) if parts else "idle")
@@ -1,6 +1,12 @@
+import asyncio
+import hashlib
 import inspect
+import json
 import logging
+import os
+import threading
 import uuid
+from collections import OrderedDict
 from datetime import date, datetime, time
 from enum import Enum
 from typing import Any, Dict, List, Optional, Set, Type, Union, get_type_hints
@@ -13,16 +19,222 @@ from pydantic.v1 import BaseModel, Field
 
 logger = logging.getLogger(__name__)
 
+MCP_IDLE_TIMEOUT = float(os.getenv("MCP_IDLE_TIMEOUT", "600"))  # Seconds an unused connection is kept warm
+MCP_PING_TIMEOUT = 5.0
+MCP_CLOSE_TIMEOUT = 10.0
+PARAM_MODEL_CACHE_SIZE = int(os.getenv("MCP_PARAM_MODEL_CACHE_SIZE", "4096"))
+
+
+def _server_config(mcp_server_config: Dict[str, Any]) -> Dict[str, Any]:
+    if "mcpServers" in mcp_server_config:
+        return mcp_server_config["mcpServers"]
+    return mcp_server_config
+
+
+def _config_key(mcp_server_config: Dict[str, Any]) -> str:
+    return hashlib.sha256(
+        json.dumps(_server_config(mcp_server_config), sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+
+
+class _MCPConnection:
+    """
+    One running MultiServerMCPClient. The client is entered and exited by a dedicated owner
+    task, because the stdio/SSE transports use task-bound cancel scopes that must be closed
+    from the task that opened them, not from whichever run happens to release it last.
+    """
+
+    def __init__(self, key: str, config: Dict[str, Any]):
+        self.key = key
+        self.config = config
+        self.loop = asyncio.get_running_loop()
+        self.lock = asyncio.Lock()
+        self.client: Optional[MultiServerMCPClient] = None
+        self.tools: List[BaseTool] = []
+        self.refcount = 0
+        self.restarts = 0
+        self._stop_event: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._idle_task: Optional[asyncio.Task] = None
+
+    @property
+    def alive(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def _serve(self, ready: asyncio.Future, stop_event: asyncio.Event):
+        try:
+            async with MultiServerMCPClient(self.config) as client:
+                ready.set_result(client)
+                await stop_event.wait()
+        except Exception as e:
+            if not ready.done():
+                ready.set_exception(e)
+            else:
+                logger.warning(f"MCP connection {self.key[:8]} ended with an error: {e}")
+
+    async def start(self):
+        ready = self.loop.create_future()
+        self._stop_event = asyncio.Event()
+        self._task = asyncio.create_task(self._serve(ready, self._stop_event))
+        self.client = await ready
+        # Tool schemas are listed once per connection; every acquirer reuses them
+        self.tools = self.client.get_tools()
+        logger.info(f"MCP connection {self.key[:8]} started with {len(self.tools)} tools.")
+
+    async def stop(self):
+        if self._stop_event:
+            self._stop_event.set()
+        if self._task:
+            try:
+                await asyncio.wait_for(asyncio.shield(self._task), MCP_CLOSE_TIMEOUT)
+            except asyncio.TimeoutError:
+                logger.warning(f"MCP connection {self.key[:8]} did not close in time; cancelling it.")
+                self._task.cancel()
+            except Exception:
+                pass
+        self.client = None
+        self.tools = []
+        self._task = None
+
+    async def healthy(self) -> bool:
+        """Whether the connection is still up and every server answers a ping."""
+        if self.client is None or not self.alive:
+            return False
+        try:
+            for server_name, session in getattr(self.client, "sessions", {}).items():
+                await asyncio.wait_for(session.send_ping(), MCP_PING_TIMEOUT)
+            return True
+        except Exception as e:
+            logger.warning(f"MCP connection {self.key[:8]} failed its health check: {e}")
+            return False
+
+
+class MCPConnectionManager:
+    """
+    Process-wide pool of MCP connections, shared by controllers and deep research agents.
+    Connections are keyed by their server config and reference-counted: a connection stays
+    warm for `idle_timeout` seconds after its last release, so the next run with the same
+    config reuses the running servers and their tool list instead of respawning them.
+    A connection whose servers stopped answering is restarted on the next acquire.
+    """
+
+    def __init__(self, idle_timeout: float = MCP_IDLE_TIMEOUT):
+        self.idle_timeout = idle_timeout
+        self._connections: Dict[str, _MCPConnection] = {}
+
+    def _connection(self, mcp_server_config: Dict[str, Any]) -> _MCPConnection:
+        key = _config_key(mcp_server_config)
+        connection = self._connections.get(key)
+        # Connections belong to the event loop that started them
+        if connection is None or connection.loop is not asyncio.get_running_loop():
+            connection = _MCPConnection(key, _server_config(mcp_server_config))
+            self._connections[key] = connection
+        return connection
+
+    async def _ensure_running(self, connection: _MCPConnection):
+        if connection.client is not None and await connection.healthy():
+            return
+        if connection.client is not None:
+            connection.restarts += 1
+            logger.warning(f"Restarting MCP connection {connection.key[:8]} (restart #{connection.restarts}).")
+            await connection.stop()
+        await connection.start()
+
+    async def acquire(self, mcp_server_config: Dict[str, Any]) -> MultiServerMCPClient:
+        """Returns a running client for the config, starting it if needed. Pair with `release`."""
+        connection = self._connection(mcp_server_config)
+        async with connection.lock:
+            if connection._idle_task:
+                connection._idle_task.cancel()
+                connection._idle_task = None
+            await self._ensure_running(connection)
+            connection.refcount += 1
+            return connection.client
+
+    async def refresh(self, mcp_server_config: Dict[str, Any]) -> Optional[MultiServerMCPClient]:
+        """
+        Health-checks an acquired connection and restarts it if its servers went away.
+        Returns the current client (a new one after a restart), or None if it is not pooled.
+        """
+        connection = self._connections.get(_config_key(mcp_server_config))
+        if connection is None or connection.refcount == 0:
+            return None
+        async with connection.lock:
+            await self._ensure_running(connection)
+            return connection.client
+
+    def get_tools(self, mcp_server_config: Dict[str, Any]) -> List[BaseTool]:
+        """The cached tool list of a running connection."""
+        connection = self._connections.get(_config_key(mcp_server_config))
+        return list(connection.tools) if connection else []
+
+    async def release(self, mcp_server_config: Dict[str, Any]):
+        connection = self._connections.get(_config_key(mcp_server_config))
+        if connection is None or connection.refcount == 0:
+            return
+        async with connection.lock:
+            connection.refcount -= 1
+            if connection.refcount > 0:
+                return
+            if self.idle_timeout <= 0:
+                await self._close(connection)
+            else:
+                connection._idle_task = asyncio.create_task(self._close_when_idle(connection))
+
+    async def _close_when_idle(self, connection: _MCPConnection):
+        await asyncio.sleep(self.idle_timeout)
+        async with connection.lock:
+            if connection.refcount == 0:
+                logger.info(f"Closing idle MCP connection {connection.key[:8]}.")
+                connection._idle_task = None
+                await self._close(connection)
+
+    async def _close(self, connection: _MCPConnection):
+        await connection.stop()
+        if self._connections.get(connection.key) is connection:
+            del self._connections[connection.key]
+
+    async def close_all(self):
+        for connection in list(self._connections.values()):
+            if connection.loop is asyncio.get_running_loop():
+                if connection._idle_task:
+                    connection._idle_task.cancel()
+                await self._close(connection)
+        self._connections.clear()
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [
+            {
+                "key": connection.key[:8],
+                "servers": list(connection.config.keys()),
+                "refcount": connection.refcount,
+                "tools": len(connection.tools),
+                "restarts": connection.restarts,
+                "running": connection.alive,
+            }
+            for connection in self._connections.values()
+        ]
+
+
+_mcp_manager: Optional[MCPConnectionManager] = None
+
+
+def get_mcp_manager() -> MCPConnectionManager:
+    """The process-wide MCP connection manager."""
+    global _mcp_manager
+    if _mcp_manager is None:
+        _mcp_manager = MCPConnectionManager()
+    return _mcp_manager
+
 
 async def setup_mcp_client_and_tools(mcp_server_config: Dict[str, Any]) -> Optional[MultiServerMCPClient]:
     """
-    Initializes the MultiServerMCPClient, connects to servers, fetches tools,
-    filters them, and returns a flat list of usable tools and the client instance.
+    Acquires a started MultiServerMCPClient for the config from the shared connection
+    manager; its tools are available through `server_name_to_tools` / `get_tools()`.
+    Release it with `release_mcp_client` once done.
 
     Returns:
-        A tuple containing:
-        - list[BaseTool]: The filtered list of usable LangChain tools.
-        - MultiServerMCPClient | None: The initialized and started client instance, or None on failure.
+        MultiServerMCPClient | None: The started client instance, or None on failure.
     """
 
     logger.info("Initializing MultiServerMCPClient...")
@@ -32,19 +244,64 @@ async def setup_mcp_client_and_tools(mcp_server_config: Dict[str, Any]) -> Optio
         return None
 
     try:
-        if "mcpServers" in mcp_server_config:
-            mcp_server_config = mcp_server_config["mcpServers"]
-        client = MultiServerMCPClient(mcp_server_config)
-        await client.__aenter__()
-        return client
+        return await get_mcp_manager().acquire(mcp_server_config)
 
     except Exception as e:
         logger.error(f"Failed to setup MCP client or fetch tools: {e}", exc_info=True)
         return None
 
 
+async def release_mcp_client(mcp_server_config: Dict[str, Any]):
+    """Releases a client acquired with `setup_mcp_client_and_tools`; it is kept warm for reuse."""
+    if not mcp_server_config:
+        return
+    try:
+        await get_mcp_manager().release(mcp_server_config)
+    except Exception as e:
+        logger.error(f"Failed to release MCP client: {e}", exc_info=True)
+
+
+_param_models: "OrderedDict[str, Type[BaseModel]]" = OrderedDict()
+_param_models_lock = threading.Lock()
+
+
+def _schema_key(tool_name: str, json_schema: Dict[str, Any]) -> Optional[str]:
+    try:
+        payload = json.dumps({"name": tool_name, "schema": json_schema}, sort_keys=True)
+    except (TypeError, ValueError):
+        return None
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
 def create_tool_param_model(tool: BaseTool) -> Type[BaseModel]:
-    """Creates a Pydantic model from a LangChain tool's schema"""
+    """
+    Creates a Pydantic model from a LangChain tool's schema. Models are cached by a hash of
+    the tool name and JSON schema, so re-registering the same MCP tools (a new controller
+    per run) reuses the models instead of running create_model for every tool again.
+    """
+    key = _schema_key(tool.name, tool.args_schema) if isinstance(tool.args_schema, dict) else None
+    if key:
+        with _param_models_lock:
+            param_model = _param_models.get(key)
+            if param_model is not None:
+                _param_models.move_to_end(key)
+                return param_model
+
+    param_model = _build_tool_param_model(tool)
+    if key:
+        with _param_models_lock:
+            _param_models[key] = param_model
+            while len(_param_models) > PARAM_MODEL_CACHE_SIZE:
+                _param_models.popitem(last=False)
+    return param_model
+
+
+def clear_param_model_cache():
+    with _param_models_lock:
+        _param_models.clear()
+
+
+def _build_tool_param_model(tool: BaseTool) -> Type[BaseModel]:
 
     # Get tool schema information
     json_schema = tool.args_schema
@@ -1,5 +1,5 @@
 import logging
-from typing import Tuple, Dict, Any
+from typing import Tuple, Dict, Any, Optional
 import gradio as gr
 from src.webui.session_auth import AuthManager
 
@@ -8,6 +8,8 @@ logger = logging.getLogger(__name__)
 # 전역 변수
 global_auth_manager = None
 current_session_id = None
+# Gradio session_hash -> 로그인한 사용자명 (WebuiManager.for_session에서 세션 키로 사용)
+session_users: Dict[str, str] = {}
 
 
 def initialize_auth_manager() -> AuthManager:
@@ -18,7 +20,18 @@ def initialize_auth_manager() -> AuthManager:
     return global_auth_manager
 
 
-def handle_login(username: str, password: str) -> Tuple[gr.update, gr.update, str]:
+def get_session_username(session_hash: Optional[str]) -> Optional[str]:
+    """Gradio 세션에 로그인한 사용자명 반환"""
+    return session_users.get(session_hash) if session_hash else None
+
+
+def forget_session_users(session_hashes) -> None:
+    """종료되었거나 정리된 Gradio 세션의 사용자 매핑 제거"""
+    for session_hash in session_hashes:
+        session_users.pop(session_hash, None)
+
+
+def handle_login(username: str, password: str, request: gr.Request = None) -> Tuple[gr.update, gr.update, str]:
     """로그인 처리"""
     global current_session_id, global_auth_manager
     
@@ -35,6 +48,8 @@ def handle_login(username: str, password: str) -> Tuple[gr.update, gr.update, st
     session_id = global_auth_manager.authenticate(username, password)
     if session_id:
         current_session_id = session_id
+        if request is not None and request.session_hash:
+            session_users[request.session_hash] = username
         logger.info(f"사용자 로그인 성공: {username}")
         return (
             gr.update(visible=False),  # login_form
@@ -50,9 +65,12 @@ def handle_login(username: str, password: str) -> Tuple[gr.update, gr.update, st
         )
 
 
-def handle_logout() -> Tuple[gr.update, gr.update, str, str, str]:
+def handle_logout(request: gr.Request = None) -> Tuple[gr.update, gr.update, str, str, str]:
     """로그아웃 처리"""
     global current_session_id, global_auth_manager
+
+    if request is not None and request.session_hash:
+        session_users.pop(request.session_hash, None)
     
     if current_session_id and global_auth_manager:
         username = global_auth_manager.validate_session(current_session_id)
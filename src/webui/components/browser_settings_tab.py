@@ -117,6 +117,13 @@ def create_browser_settings_tab(webui_manager: WebuiManager):
                 info="Path to save Agent traces",
                 interactive=True,
             )
+            recording_format = gr.Dropdown(
+                label="History Recording Format",
+                choices=["gif", "webp"],
+                value=os.getenv("AGENT_RECORDING_FORMAT", "gif"),
+                info="Format of the agent history recording; animated WebP is much smaller than GIF",
+                interactive=True,
+            )
 
         with gr.Row():
             save_agent_history_path = gr.Textbox(
@@ -141,6 +148,7 @@ def create_browser_settings_tab(webui_manager: WebuiManager):
             disable_security=disable_security,
             save_recording_path=save_recording_path,
             save_trace_path=save_trace_path,
+            recording_format=recording_format,
             save_agent_history_path=save_agent_history_path,
             save_download_path=save_download_path,
             cdp_url=cdp_url,
@@ -151,9 +159,9 @@ def create_browser_settings_tab(webui_manager: WebuiManager):
     )
     webui_manager.add_components("browser_settings", tab_components)
 
-    async def close_wrapper():
+    async def close_wrapper(request: gr.Request):
         """Wrapper for handle_clear."""
-        await close_browser(webui_manager)
+        await close_browser(webui_manager.for_session(request))
 
     headless.change(close_wrapper)
     keep_browser_open.change(close_wrapper)
@@ -1,9 +1,11 @@
 import asyncio
+import base64
+import io
 import json
 import logging
 import os
 import uuid
-from typing import Any, AsyncGenerator, Dict, Optional
+from typing import Any, AsyncGenerator, Dict, List, Optional, Tuple
 
 import gradio as gr
 
@@ -19,13 +21,27 @@ from gradio.components import Component
 from langchain_core.language_models.chat_models import BaseChatModel
 
 from src.agent.browser_use.browser_use_agent import BrowserUseAgent
+from src.agent.browser_use.job_queue import TERMINAL_JOB_STATUSES
+from src.agent.browser_use.screenshot_store import get_screenshot_store
 from src.browser.custom_browser import CustomBrowser
+from src.browser.live_view import LiveViewStreamer
+from src.webui.live_view_server import live_view_hub
+from src.webui.screenshot_server import screenshot_routes
 from src.controller.custom_controller import CustomController
 from src.utils import llm_provider
+from src.utils.llm_cache import LLM_CACHE_MODES, format_cache_stats
+from src.utils.llm_scheduler import format_scheduler_metrics
 from src.webui.webui_manager import WebuiManager
 
 logger = logging.getLogger(__name__)
 
+LIVE_VIEW_MIN_INTERVAL = 0.1  # Seconds between live view checks while the page is changing
+LIVE_VIEW_MAX_INTERVAL = 0.5  # Upper bound once the page has been static for a while
+CHAT_PAGE_SIZE = int(os.getenv("WEBUI_CHAT_PAGE_SIZE", "40"))  # Messages rendered in the chatbot at once
+CHAT_MAX_MESSAGES = int(os.getenv("WEBUI_CHAT_MAX_MESSAGES", "500"))  # Older messages are dropped
+CHAT_FULL_SCREENSHOT_STEPS = 3  # Steps whose screenshot is shown full size; older ones become thumbnails
+CHAT_THUMBNAIL_SIZE = (240, 180)
+
 
 # --- Helper Functions --- (Defined at module level)
 
@@ -37,6 +53,7 @@ async def _initialize_llm(
         base_url: Optional[str],
         api_key: Optional[str],
         num_ctx: Optional[int] = None,
+        cache_mode: Optional[str] = None,
 ) -> Optional[BaseChatModel]:
     """Initializes the LLM based on settings. Returns None if provider/model is missing."""
     if not provider or not model_name:
@@ -56,6 +73,8 @@ async def _initialize_llm(
             api_key=api_key or None,
             # Add other relevant params like num_ctx for ollama
             num_ctx=num_ctx if provider == "ollama" else None,
+            cache_mode=cache_mode,
+            cache_namespace="browser_use_agent",
         )
         return llm
     except Exception as e:
@@ -128,6 +147,132 @@ def _format_agent_output(model_output: AgentOutput) -> str:
     return content.strip()
 
 
+# --- Chat History (bounded, paged) ---
+
+
+def _append_chat_message(webui_manager: WebuiManager, message: Dict[str, Any]):
+    """Appends to bu_chat_history, dropping the oldest messages beyond CHAT_MAX_MESSAGES."""
+    history = webui_manager.bu_chat_history
+    history.append(message)
+    overflow = len(history) - CHAT_MAX_MESSAGES
+    if overflow > 0:
+        del history[:overflow]
+        webui_manager.bu_chat_dropped += overflow
+        kept = {id(m) for m in history}
+        webui_manager.bu_chat_screenshots = [
+            entry for entry in webui_manager.bu_chat_screenshots if id(entry["message"]) in kept
+        ]
+
+
+def _chat_page_bounds(webui_manager: WebuiManager) -> Tuple[int, int]:
+    """Returns the [start, end) indices into bu_chat_history of the page being shown."""
+    total = len(webui_manager.bu_chat_history)
+    if webui_manager.bu_chat_page_start is None:
+        start = max(total - CHAT_PAGE_SIZE, 0)
+    else:
+        start = min(max(webui_manager.bu_chat_page_start - webui_manager.bu_chat_dropped, 0), total)
+    return start, min(start + CHAT_PAGE_SIZE, total)
+
+
+def _chat_page(webui_manager: WebuiManager) -> List[Dict[str, Any]]:
+    """
+    The messages rendered in the chatbot. Only one page is ever sent, so an update costs
+    the same after 10 or 1000 steps; while following the latest page, Gradio's streaming
+    diff only ships the messages that were added.
+    """
+    start, end = _chat_page_bounds(webui_manager)
+    return webui_manager.bu_chat_history[start:end]
+
+
+def _chat_page_info(webui_manager: WebuiManager) -> str:
+    start, end = _chat_page_bounds(webui_manager)
+    offset = webui_manager.bu_chat_dropped
+    total = len(webui_manager.bu_chat_history) + offset
+    if not total:
+        return ""
+    info = f"Messages {start + offset + 1}–{end + offset} of {total}"
+    if offset:
+        info += f" ({offset} oldest no longer kept)"
+    return info
+
+
+def _thumbnail_id(screenshot_id: str) -> Optional[str]:
+    """Stores a small JPEG copy of a stored screenshot and returns its id."""
+    from PIL import Image
+
+    store = get_screenshot_store()
+    data = store.get_bytes(screenshot_id)
+    if data is None:
+        return None
+    with Image.open(io.BytesIO(data)) as image:
+        image = image.convert("RGB")
+        image.thumbnail(CHAT_THUMBNAIL_SIZE)
+        buffer = io.BytesIO()
+        image.save(buffer, format="JPEG", quality=70)
+    return store.put_bytes(buffer.getvalue())
+
+
+def _thumbnail_html(screenshot_id: str, thumbnail_id: str, step_num: int) -> str:
+    thumbnail_url = screenshot_routes.url(thumbnail_id)
+    if thumbnail_url:
+        return (
+            f'<a href="{screenshot_routes.url(screenshot_id)}" target="_blank">'
+            f'<img src="{thumbnail_url}" alt="Step {step_num} Screenshot (thumbnail)" /></a>'
+        )
+    thumbnail_b64 = get_screenshot_store().get(thumbnail_id)
+    return f'<img src="data:image/jpeg;base64,{thumbnail_b64}" alt="Step {step_num} Screenshot (thumbnail)" />'
+
+
+async def _compact_chat_screenshots(webui_manager: WebuiManager):
+    """Swaps full screenshots older than the last CHAT_FULL_SCREENSHOT_STEPS steps for thumbnails."""
+    entries = webui_manager.bu_chat_screenshots
+    if len(entries) <= CHAT_FULL_SCREENSHOT_STEPS:
+        return
+    old_entries = entries[:len(entries) - CHAT_FULL_SCREENSHOT_STEPS]
+    webui_manager.bu_chat_screenshots = entries[len(entries) - CHAT_FULL_SCREENSHOT_STEPS:]
+    for entry in old_entries:
+        try:
+            thumbnail_id = await asyncio.to_thread(_thumbnail_id, entry["screenshot_id"])
+            replacement = (
+                _thumbnail_html(entry["screenshot_id"], thumbnail_id, entry["step"])
+                if thumbnail_id else "**[Screenshot unavailable]**"
+            )
+        except Exception as e:
+            logger.warning(f"Failed to create thumbnail for step {entry['step']}: {e}")
+            replacement = "**[Screenshot unavailable]**"
+        message = entry["message"]
+        message["content"] = message["content"].replace(entry["img_tag"], replacement)
+
+
+def _llm_stats_markdown() -> str:
+    return f"{format_cache_stats('browser_use_agent')}  \n{format_scheduler_metrics()}"
+
+
+def _chat_updates(webui_manager: WebuiManager) -> Dict[Component, Any]:
+    return {
+        webui_manager.get_component_by_id("browser_use_agent.chatbot"): gr.update(value=_chat_page(webui_manager)),
+        webui_manager.get_component_by_id("browser_use_agent.chat_page_info"): gr.update(
+            value=_chat_page_info(webui_manager)
+        ),
+        # New messages follow LLM calls, so the LLM counters are refreshed with them
+        webui_manager.get_component_by_id("browser_use_agent.llm_stats"): gr.update(
+            value=_llm_stats_markdown()
+        ),
+    }
+
+
+async def handle_chat_page(webui_manager: WebuiManager, direction: int) -> Dict[Component, Any]:
+    """Moves the chatbot one page back (-1) or forward (+1); the last page follows new messages."""
+    start, _ = _chat_page_bounds(webui_manager)
+    total = len(webui_manager.bu_chat_history)
+    start = max(start + direction * CHAT_PAGE_SIZE, 0)
+    if start + CHAT_PAGE_SIZE >= total:
+        webui_manager.bu_chat_page_start = None
+    else:
+        webui_manager.bu_chat_page_start = start + webui_manager.bu_chat_dropped
+    return _chat_updates(webui_manager)
+
+
 # --- Updated Callback Implementation ---
 
 
@@ -149,6 +294,7 @@ async def _handle_new_step(
 
     # --- Screenshot Handling ---
     screenshot_html = ""
+    screenshot_step = None
     # Ensure state.screenshot exists and is not empty before proceeding
     # Use getattr for safer access
     screenshot_data = getattr(state, "screenshot", None)
@@ -158,8 +304,16 @@ async def _handle_new_step(
             if (
                     isinstance(screenshot_data, str) and len(screenshot_data) > 100
             ):  # Arbitrary length check
+                # Link the stored copy when the screenshot route is mounted instead of embedding it again
+                screenshot_id = get_screenshot_store().put(screenshot_data)
+                screenshot_step = {"screenshot_id": screenshot_id, "step": step_num}
+                img_src = (
+                        screenshot_routes.url(screenshot_id)
+                        or f"data:image/jpeg;base64,{screenshot_data}"
+                )
                 # *** UPDATED STYLE: Removed centering, adjusted width ***
-                img_tag = f'<img src="data:image/jpeg;base64,{screenshot_data}" alt="Step {step_num} Screenshot" style="max-width: 800px; max-height: 600px; object-fit:contain;" />'
+                img_tag = f'<img src="{img_src}" alt="Step {step_num} Screenshot" style="max-width: 800px; max-height: 600px; object-fit:contain;" />'
+                screenshot_step["img_tag"] = img_tag
                 screenshot_html = (
                         img_tag + "<br/>"
                 )  # Use <br/> for line break after inline-block image
@@ -192,7 +346,11 @@ async def _handle_new_step(
     }
 
     # Append to the correct chat history list
-    webui_manager.bu_chat_history.append(chat_message)
+    _append_chat_message(webui_manager, chat_message)
+    if screenshot_step and "img_tag" in screenshot_step:
+        screenshot_step["message"] = chat_message
+        webui_manager.bu_chat_screenshots.append(screenshot_step)
+    await _compact_chat_screenshots(webui_manager)
 
     await asyncio.sleep(0.05)
 
@@ -216,7 +374,8 @@ def _handle_done(webui_manager: WebuiManager, history: AgentHistoryList):
     else:
         final_summary += "- Status: Success\n"
 
-    webui_manager.bu_chat_history.append(
+    _append_chat_message(
+        webui_manager,
         {"role": "assistant", "content": final_summary}
     )
 
@@ -231,7 +390,8 @@ async def _ask_assistant_callback(
         logger.error("Chat history not found in webui_manager during ask_assistant!")
         return {"response": "Internal Error: Cannot display help request."}
 
-    webui_manager.bu_chat_history.append(
+    _append_chat_message(
+        webui_manager,
         {
             "role": "assistant",
             "content": f"**Need Help:** {query}\nPlease provide information or perform the required action in the browser, then type your response/confirmation below and click 'Submit Response'.",
@@ -250,7 +410,8 @@ async def _ask_assistant_callback(
         logger.info("User response event received.")
     except asyncio.TimeoutError:
         logger.warning("Timeout waiting for user assistance.")
-        webui_manager.bu_chat_history.append(
+        _append_chat_message(
+            webui_manager,
             {
                 "role": "assistant",
                 "content": "**Timeout:** No response received. Trying to proceed.",
@@ -260,7 +421,8 @@ async def _ask_assistant_callback(
         return {"response": "Timeout: User did not respond."}  # Inform the agent
 
     response = webui_manager.bu_user_help_response
-    webui_manager.bu_chat_history.append(
+    _append_chat_message(
+        webui_manager,
         {"role": "user", "content": response}
     )  # Show user response in chat
     webui_manager.bu_response_event = (
@@ -307,7 +469,8 @@ async def run_agent_task(
         return
 
     # Set running state indirectly via _current_task
-    webui_manager.bu_chat_history.append({"role": "user", "content": task})
+    _append_chat_message(webui_manager, {"role": "user", "content": task})
+    webui_manager.bu_chat_page_start = None  # Follow the new task's messages
 
     yield {
         user_input_comp: gr.Textbox(
@@ -317,7 +480,7 @@ async def run_agent_task(
         stop_button_comp: gr.Button(interactive=True),
         pause_resume_button_comp: gr.Button(value="⏸️ Pause", interactive=True),
         clear_button_comp: gr.Button(interactive=False),
-        chatbot_comp: gr.update(value=webui_manager.bu_chat_history),
+        **_chat_updates(webui_manager),
         history_file_comp: gr.update(value=None),
         gif_comp: gr.update(value=None),
     }
@@ -353,6 +516,7 @@ async def run_agent_task(
     mcp_server_config = (
         json.loads(mcp_server_config_str) if mcp_server_config_str else None
     )
+    llm_cache_mode = _get_config_value(webui_manager, components, "llm_cache_mode", "off")
 
     # Planner LLM Settings (Optional)
     planner_llm_provider_name = get_setting("planner_llm_provider") or None
@@ -373,6 +537,7 @@ async def run_agent_task(
             planner_llm_base_url,
             planner_llm_api_key,
             planner_ollama_num_ctx if planner_llm_provider_name == "ollama" else None,
+            llm_cache_mode,
         )
 
     # --- Browser Settings ---
@@ -394,6 +559,7 @@ async def run_agent_task(
     wss_url = get_browser_setting("wss_url") or None
     save_recording_path = get_browser_setting("save_recording_path") or None
     save_trace_path = get_browser_setting("save_trace_path") or None
+    recording_format = get_browser_setting("recording_format", "gif") or "gif"
     save_agent_history_path = get_browser_setting(
         "save_agent_history_path", "./tmp/agent_history"
     )
@@ -418,6 +584,7 @@ async def run_agent_task(
         llm_base_url,
         llm_api_key,
         ollama_num_ctx if llm_provider_name == "ollama" else None,
+        llm_cache_mode,
     )
 
     # Pass the webui_manager instance to the callback when wrapping it
@@ -449,6 +616,8 @@ async def run_agent_task(
 
         # Create Browser if needed
         if not webui_manager.bu_browser:
+            if not webui_manager.can_launch_browsers(1):
+                raise ValueError("Too many browsers are running across sessions. Please try again later.")
             logger.info("Launching new browser instance.")
             extra_args = []
             if use_own_browser:
@@ -508,7 +677,7 @@ async def run_agent_task(
         gif_path = os.path.join(
             save_agent_history_path,
             webui_manager.bu_agent_task_id,
-            f"{webui_manager.bu_agent_task_id}.gif",
+            f"{webui_manager.bu_agent_task_id}.{recording_format}",
         )
 
         # Pass the webui_manager to callbacks when wrapping them
@@ -559,7 +728,23 @@ async def run_agent_task(
         agent_task = asyncio.create_task(agent_run_coro)
         webui_manager.bu_current_task = agent_task  # Store the task
 
-        last_chat_len = len(webui_manager.bu_chat_history)
+        # Counts dropped messages too, so new messages are noticed once the cap is reached
+        last_chat_len = len(webui_manager.bu_chat_history) + webui_manager.bu_chat_dropped
+        live_view = None
+        if headless and webui_manager.bu_browser_context:
+            # Let the browser downscale frames to the size they are displayed at
+            live_view = LiveViewStreamer(
+                webui_manager.bu_browser_context,
+                max_width=int(window_w * stream_vw / 100),
+                max_height=int(window_h * stream_vh / 100),
+            )
+        else:
+            yield {browser_view_comp: gr.update(visible=False)}
+        frame_interval = LIVE_VIEW_MIN_INTERVAL
+        has_frame = False
+        # With the MJPEG route mounted, frames go to the browser as binary over HTTP and
+        # the view is an <img> pointing at the stream instead of base64 in every update
+        live_view_stream_id = webui_manager.bu_agent_task_id if live_view and live_view_hub.enabled else None
         while not agent_task.done():
             is_paused = webui_manager.bu_agent.state.paused
             is_stopped = webui_manager.bu_agent.state.stopped
@@ -627,9 +812,9 @@ async def run_agent_task(
                     ),
                     pause_resume_button_comp: gr.update(interactive=False),
                     stop_button_comp: gr.update(interactive=False),
-                    chatbot_comp: gr.update(value=webui_manager.bu_chat_history),
+                    **_chat_updates(webui_manager),
                 }
-                last_chat_len = len(webui_manager.bu_chat_history)
+                last_chat_len = len(webui_manager.bu_chat_history) + webui_manager.bu_chat_dropped
                 yield update_dict
                 # Wait until response is submitted or task finishes
                 while (
@@ -653,42 +838,54 @@ async def run_agent_task(
                     break  # Task finished while waiting for response
 
             # Update Chatbot if new messages arrived via callbacks
-            if len(webui_manager.bu_chat_history) > last_chat_len:
-                update_dict[chatbot_comp] = gr.update(
-                    value=webui_manager.bu_chat_history
-                )
-                last_chat_len = len(webui_manager.bu_chat_history)
+            chat_len = len(webui_manager.bu_chat_history) + webui_manager.bu_chat_dropped
+            if chat_len > last_chat_len:
+                update_dict.update(_chat_updates(webui_manager))
+                last_chat_len = chat_len
 
-            # Update Browser View
-            if headless and webui_manager.bu_browser_context:
+            # Update Browser View, only when the page actually changed
+            if live_view:
                 try:
-                    screenshot_b64 = (
-                        await webui_manager.bu_browser_context.take_screenshot()
-                    )
-                    if screenshot_b64:
+                    screenshot_b64 = await live_view.next_frame()
+                    if screenshot_b64 and live_view_stream_id:
+                        live_view_hub.publish(
+                            live_view_stream_id, base64.b64decode(screenshot_b64), owner=webui_manager.session_key or ""
+                        )
+                        if not has_frame:
+                            html_content = f'<img src="{live_view_hub.url(live_view_stream_id)}" style="width:{stream_vw}vw; height:{stream_vh}vh ; border:1px solid #ccc;">'
+                            update_dict[browser_view_comp] = gr.update(
+                                value=html_content, visible=True
+                            )
+                        has_frame = True
+                        frame_interval = LIVE_VIEW_MIN_INTERVAL
+                    elif screenshot_b64:
                         html_content = f'<img src="data:image/jpeg;base64,{screenshot_b64}" style="width:{stream_vw}vw; height:{stream_vh}vh ; border:1px solid #ccc;">'
                         update_dict[browser_view_comp] = gr.update(
                             value=html_content, visible=True
                         )
+                        has_frame = True
+                        frame_interval = LIVE_VIEW_MIN_INTERVAL
                     else:
-                        html_content = f"<h1 style='width:{stream_vw}vw; height:{stream_vh}vh'>Waiting for browser session...</h1>"
-                        update_dict[browser_view_comp] = gr.update(
-                            value=html_content, visible=True
-                        )
+                        if not has_frame:
+                            html_content = f"<h1 style='width:{stream_vw}vw; height:{stream_vh}vh'>Waiting for browser session...</h1>"
+                            update_dict[browser_view_comp] = gr.update(
+                                value=html_content, visible=True
+                            )
+                        # Nothing new on screen, check less often
+                        frame_interval = min(frame_interval * 1.5, LIVE_VIEW_MAX_INTERVAL)
                 except Exception as e:
                     logger.debug(f"Failed to capture screenshot: {e}")
                     update_dict[browser_view_comp] = gr.update(
                         value="<div style='...'>Error loading view...</div>",
                         visible=True,
                     )
-            else:
-                update_dict[browser_view_comp] = gr.update(visible=False)
+                    has_frame = False
 
             # Yield accumulated updates
             if update_dict:
                 yield update_dict
 
-            await asyncio.sleep(0.1)  # Polling interval
+            await asyncio.sleep(frame_interval)  # Polling interval, adapted to live view activity
 
         # --- 7. Task Finalization ---
         webui_manager.bu_agent.state.paused = False
@@ -707,11 +904,12 @@ async def run_agent_task(
             webui_manager.bu_agent.save_history(history_file)
 
             if os.path.exists(history_file):
-                final_update[history_file_comp] = gr.File(value=history_file)
-
-            if gif_path and os.path.exists(gif_path):
-                logger.info(f"GIF found at: {gif_path}")
-                final_update[gif_comp] = gr.Image(value=gif_path)
+                # The JSON references screenshots by id; the download bundles it with them
+                bundle_path = os.path.splitext(history_file)[0] + ".zip"
+                await asyncio.to_thread(
+                    get_screenshot_store().export_history_bundle, history_file, bundle_path
+                )
+                final_update[history_file_comp] = gr.File(value=bundle_path)
 
         except asyncio.CancelledError:
             logger.info("Agent task was cancelled.")
@@ -720,10 +918,11 @@ async def run_agent_task(
                     for msg in webui_manager.bu_chat_history
                     if msg.get("role") == "assistant"
             ):
-                webui_manager.bu_chat_history.append(
+                _append_chat_message(
+                    webui_manager,
                     {"role": "assistant", "content": "**Task Cancelled**."}
                 )
-            final_update[chatbot_comp] = gr.update(value=webui_manager.bu_chat_history)
+            final_update.update(_chat_updates(webui_manager))
         except Exception as e:
             logger.error(f"Error during agent execution: {e}", exc_info=True)
             error_message = (
@@ -734,14 +933,19 @@ async def run_agent_task(
                     for msg in webui_manager.bu_chat_history
                     if msg.get("role") == "assistant"
             ):
-                webui_manager.bu_chat_history.append(
+                _append_chat_message(
+                    webui_manager,
                     {"role": "assistant", "content": error_message}
                 )
-            final_update[chatbot_comp] = gr.update(value=webui_manager.bu_chat_history)
+            final_update.update(_chat_updates(webui_manager))
             gr.Error(f"Agent execution failed: {e}")
 
         finally:
             webui_manager.bu_current_task = None  # Clear the task reference
+            if live_view:
+                await live_view.close()
+            if live_view_stream_id:
+                live_view_hub.close(live_view_stream_id)
 
             # Close browser/context if requested
             if should_close_browser_on_finish:
@@ -769,11 +973,19 @@ async def run_agent_task(
                     ),
                     clear_button_comp: gr.update(interactive=True),
                     # Ensure final chat history is shown
-                    chatbot_comp: gr.update(value=webui_manager.bu_chat_history),
+                    **_chat_updates(webui_manager),
                 }
             )
             yield final_update
 
+            # The recording is rendered in the background after the run; show it once written
+            recording_future = getattr(webui_manager.bu_agent, "recording_future", None)
+            if recording_future:
+                recording_path = await recording_future
+                if recording_path:
+                    logger.info(f"Recording found at: {recording_path}")
+                    yield {gif_comp: gr.Image(value=recording_path)}
+
     except Exception as e:
         # Catch errors during setup (before agent run starts)
         logger.error(f"Error setting up agent task: {e}", exc_info=True)
@@ -787,7 +999,7 @@ async def run_agent_task(
             pause_resume_button_comp: gr.update(value="⏸️ Pause", interactive=False),
             clear_button_comp: gr.update(interactive=True),
             chatbot_comp: gr.update(
-                value=webui_manager.bu_chat_history
+                value=_chat_page(webui_manager)
                       + [{"role": "assistant", "content": f"**Setup Error:** {e}"}]
             ),
         }
@@ -931,6 +1143,9 @@ async def handle_clear(webui_manager: WebuiManager):
 
     # Reset state stored in manager
     webui_manager.bu_chat_history = []
+    webui_manager.bu_chat_screenshots = []
+    webui_manager.bu_chat_dropped = 0
+    webui_manager.bu_chat_page_start = None
     webui_manager.bu_response_event = None
     webui_manager.bu_user_help_response = None
     webui_manager.bu_agent_task_id = None
@@ -942,6 +1157,9 @@ async def handle_clear(webui_manager: WebuiManager):
         webui_manager.get_component_by_id("browser_use_agent.chatbot"): gr.update(
             value=[]
         ),
+        webui_manager.get_component_by_id("browser_use_agent.chat_page_info"): gr.update(
+            value=""
+        ),
         webui_manager.get_component_by_id("browser_use_agent.user_input"): gr.update(
             value="", placeholder="Enter your task here..."
         ),
@@ -969,6 +1187,142 @@ async def handle_clear(webui_manager: WebuiManager):
     }
 
 
+# --- Background Job Queue ---
+
+
+def _collect_job_params(
+        webui_manager: WebuiManager, components: Dict[gr.components.Component, Any]
+) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """Builds the persisted job parameters and in-memory secrets from the current settings."""
+
+    def get_setting(key, default=None):
+        comp = webui_manager.id_to_component.get(f"agent_settings.{key}")
+        return components.get(comp, default) if comp else default
+
+    def get_browser_setting(key, default=None):
+        comp = webui_manager.id_to_component.get(f"browser_settings.{key}")
+        return components.get(comp, default) if comp else default
+
+    tool_calling_str = get_setting("tool_calling_method", "auto")
+    mcp_server_config_str = get_setting("mcp_server_config")
+    browser_binary_path = None
+    extra_args = []
+    if get_browser_setting("use_own_browser", False):
+        browser_binary_path = os.getenv("BROWSER_PATH", None) or get_browser_setting("browser_binary_path") or None
+        browser_user_data = get_browser_setting("browser_user_data_dir") or os.getenv("BROWSER_USER_DATA", None)
+        if browser_user_data:
+            extra_args += [f"--user-data-dir={browser_user_data}"]
+
+    params = {
+        "llm": {
+            "provider": get_setting("llm_provider"),
+            "model_name": get_setting("llm_model_name"),
+            "temperature": get_setting("llm_temperature", 0.6),
+            "base_url": get_setting("llm_base_url") or None,
+            "num_ctx": get_setting("ollama_num_ctx", 16000),
+            "cache_mode": _get_config_value(webui_manager, components, "llm_cache_mode", "off"),
+        },
+        "agent": {
+            "use_vision": get_setting("use_vision", True),
+            "max_steps": get_setting("max_steps", 100),
+            "max_actions": get_setting("max_actions", 10),
+            "max_input_tokens": get_setting("max_input_tokens", 128000),
+            "tool_calling_method": tool_calling_str if tool_calling_str != "None" else None,
+            "override_system_message": get_setting("override_system_prompt") or None,
+            "extend_system_message": get_setting("extend_system_prompt") or None,
+        },
+        "browser": {
+            # Job workers have no live view, so they always run headless
+            "headless": True,
+            "disable_security": get_browser_setting("disable_security", False),
+            "browser_binary_path": browser_binary_path,
+            "extra_browser_args": extra_args,
+            "cdp_url": get_browser_setting("cdp_url") or None,
+            "wss_url": get_browser_setting("wss_url") or None,
+            "window_width": int(get_browser_setting("window_w", 1280)),
+            "window_height": int(get_browser_setting("window_h", 1100)),
+        },
+        "save_agent_history_path": get_browser_setting("save_agent_history_path", "./tmp/agent_history"),
+        "recording_format": get_browser_setting("recording_format", "gif") or "gif",
+        "save_download_path": get_browser_setting("save_download_path", "./tmp/downloads"),
+        "mcp_server_config": json.loads(mcp_server_config_str) if mcp_server_config_str else None,
+    }
+    secrets = {"llm_api_key": get_setting("llm_api_key")} if get_setting("llm_api_key") else {}
+    return params, secrets
+
+
+def _job_owner(webui_manager: WebuiManager, owner_token: Optional[str]) -> str:
+    """
+    Owner key of background jobs: the logged-in user, else a random token kept in the
+    browser's local storage. Unlike the Gradio session, both survive a page reload.
+    """
+    return webui_manager.username or owner_token or uuid.uuid4().hex
+
+
+def _jobs_table(webui_manager: WebuiManager, owner: str) -> List[List[Any]]:
+    jobs = webui_manager.get_job_queue().store.list_jobs(session_key=owner)
+    return [
+        [job["id"], job["status"], job["steps"], job["task"], job["result"] or job["error"] or ""]
+        for job in jobs
+    ]
+
+
+def _has_active_jobs(webui_manager: WebuiManager, owner: str) -> bool:
+    return any(row[1] not in TERMINAL_JOB_STATUSES for row in _jobs_table(webui_manager, owner))
+
+
+async def _follow_jobs(webui_manager: WebuiManager, owner: str) -> AsyncGenerator[Dict[Component, Any], None]:
+    """Pushes the job table whenever one of the owner's jobs makes progress."""
+    jobs_table_comp = webui_manager.get_component_by_id("browser_use_agent.jobs_table")
+    job_queue = webui_manager.get_job_queue()
+    events = job_queue.subscribe()
+    try:
+        yield {jobs_table_comp: gr.update(value=_jobs_table(webui_manager, owner))}
+        while _has_active_jobs(webui_manager, owner):
+            try:
+                await asyncio.wait_for(events.get(), timeout=30.0)
+            except asyncio.TimeoutError:
+                pass  # Re-check in case the jobs were changed by another process
+            while not events.empty():
+                events.get_nowait()  # Coalesce bursts of events into one table update
+            yield {jobs_table_comp: gr.update(value=_jobs_table(webui_manager, owner))}
+    finally:
+        job_queue.unsubscribe(events)
+
+
+async def handle_queue_task(
+        webui_manager: WebuiManager, components: Dict[gr.components.Component, Any], owner: str
+) -> AsyncGenerator[Dict[Component, Any], None]:
+    """Submits the task to the background job queue and follows the owner's jobs."""
+    user_input_comp = webui_manager.get_component_by_id("browser_use_agent.user_input")
+    task = components.get(user_input_comp, "").strip()
+    if not task:
+        gr.Warning("Please enter a task.")
+        return
+
+    params, secrets = _collect_job_params(webui_manager, components)
+    job_id = webui_manager.get_job_queue().submit(task, params, owner, secrets)
+    gr.Info(f"Task queued as job {job_id}.")
+    yield {user_input_comp: gr.update(value="")}
+    async for update in _follow_jobs(webui_manager, owner):
+        yield update
+
+
+async def handle_cancel_job(webui_manager: WebuiManager, job_id: str, owner: str) -> Dict[Component, Any]:
+    """Cancels a queued or running job of the owner."""
+    job_queue = webui_manager.get_job_queue()
+    job = job_queue.store.get((job_id or "").strip())
+    if not job or job["session_key"] != owner:
+        gr.Warning(f"Job not found: {job_id}")
+    elif not job_queue.cancel(job["id"]):
+        gr.Warning(f"Job {job_id} has already finished.")
+    return {
+        webui_manager.get_component_by_id("browser_use_agent.jobs_table"): gr.update(
+            value=_jobs_table(webui_manager, owner)
+        )
+    }
+
+
 # --- Tab Creation Function ---
 
 
@@ -982,13 +1336,17 @@ def create_browser_use_agent_tab(webui_manager: WebuiManager):
     tab_components = {}
     with gr.Column():
         chatbot = gr.Chatbot(
-            lambda: webui_manager.bu_chat_history,  # Load history dynamically
+            [],  # Filled by the session's own updates; the root manager holds no chat history
             elem_id="browser_use_chatbot",
             label="Agent Interaction",
             type="messages",
             height=600,
             show_copy_button=True,
         )
+        with gr.Row():
+            chat_older_button = gr.Button("◀️ Older", variant="secondary", size="sm", scale=1)
+            chat_page_info = gr.Markdown("", elem_id="browser_use_chat_page_info")
+            chat_newer_button = gr.Button("Newer ▶️", variant="secondary", size="sm", scale=1)
         user_input = gr.Textbox(
             label="Your Task or Response",
             placeholder="Enter your task here or provide assistance when asked.",
@@ -1007,6 +1365,16 @@ def create_browser_use_agent_tab(webui_manager: WebuiManager):
                 "🗑️ Clear", interactive=True, variant="secondary", scale=2
             )
             run_button = gr.Button("▶️ Submit Task", variant="primary", scale=3)
+        with gr.Row():
+            llm_cache_mode = gr.Dropdown(
+                label="LLM Response Cache",
+                choices=LLM_CACHE_MODES,
+                value="off",
+                info="Reuse responses to identical (exact) or near-identical (semantic) text-only prompts",
+                interactive=True,
+                scale=1,
+            )
+            llm_stats = gr.Markdown(_llm_stats_markdown())
 
         browser_view = gr.HTML(
             value="<div style='width:100%; height:50vh; display:flex; justify-content:center; align-items:center; border:1px solid #ccc; background-color:#f0f0f0;'><p>Browser View (Requires Headless=True)</p></div>",
@@ -1014,9 +1382,24 @@ def create_browser_use_agent_tab(webui_manager: WebuiManager):
             elem_id="browser_view",
             visible=False,
         )
+        with gr.Accordion("Background Jobs", open=False):
+            with gr.Row():
+                queue_button = gr.Button("📥 Queue Task", variant="secondary", scale=2)
+                refresh_jobs_button = gr.Button("🔄 Refresh Jobs", variant="secondary", scale=1)
+            with gr.Row():
+                cancel_job_id = gr.Textbox(label="Job ID", placeholder="Job ID to cancel", scale=3)
+                cancel_job_button = gr.Button("✖️ Cancel Job", variant="stop", scale=1)
+            jobs_table = gr.Dataframe(
+                headers=["Job ID", "Status", "Steps", "Task", "Result"],
+                label="Queued and Finished Jobs",
+                interactive=False,
+                wrap=True,
+            )
+            # Job owner token for users who are not logged in; kept across page reloads
+            job_owner = gr.BrowserState("", storage_key="browser_use_job_owner")
         with gr.Column():
             gr.Markdown("### Task Outputs")
-            agent_history_file = gr.File(label="Agent History JSON", interactive=False)
+            agent_history_file = gr.File(label="Agent History (JSON + screenshots)", interactive=False)
             recording_gif = gr.Image(
                 label="Task Recording GIF",
                 format="gif",
@@ -1028,14 +1411,24 @@ def create_browser_use_agent_tab(webui_manager: WebuiManager):
     tab_components.update(
         dict(
             chatbot=chatbot,
+            chat_older_button=chat_older_button,
+            chat_page_info=chat_page_info,
+            chat_newer_button=chat_newer_button,
             user_input=user_input,
             clear_button=clear_button,
             run_button=run_button,
+            llm_cache_mode=llm_cache_mode,
+            llm_stats=llm_stats,
             stop_button=stop_button,
             pause_resume_button=pause_resume_button,
             agent_history_file=agent_history_file,
             recording_gif=recording_gif,
             browser_view=browser_view,
+            queue_button=queue_button,
+            refresh_jobs_button=refresh_jobs_button,
+            cancel_job_id=cancel_job_id,
+            cancel_job_button=cancel_job_button,
+            jobs_table=jobs_table,
         )
     )
     webui_manager.add_components(
@@ -1048,27 +1441,58 @@ def create_browser_use_agent_tab(webui_manager: WebuiManager):
     run_tab_outputs = list(tab_components.values())
 
     async def submit_wrapper(
-            components_dict: Dict[Component, Any],
+            components_dict: Dict[Component, Any], request: gr.Request
     ) -> AsyncGenerator[Dict[Component, Any], None]:
         """Wrapper for handle_submit that yields its results."""
-        async for update in handle_submit(webui_manager, components_dict):
+        async for update in handle_submit(webui_manager.for_session(request), components_dict):
             yield update
 
-    async def stop_wrapper() -> AsyncGenerator[Dict[Component, Any], None]:
+    async def stop_wrapper(request: gr.Request) -> AsyncGenerator[Dict[Component, Any], None]:
         """Wrapper for handle_stop."""
-        update_dict = await handle_stop(webui_manager)
+        update_dict = await handle_stop(webui_manager.for_session(request))
         yield update_dict
 
-    async def pause_resume_wrapper() -> AsyncGenerator[Dict[Component, Any], None]:
+    async def pause_resume_wrapper(request: gr.Request) -> AsyncGenerator[Dict[Component, Any], None]:
         """Wrapper for handle_pause_resume."""
-        update_dict = await handle_pause_resume(webui_manager)
+        update_dict = await handle_pause_resume(webui_manager.for_session(request))
         yield update_dict
 
-    async def clear_wrapper() -> AsyncGenerator[Dict[Component, Any], None]:
+    async def clear_wrapper(request: gr.Request) -> AsyncGenerator[Dict[Component, Any], None]:
         """Wrapper for handle_clear."""
-        update_dict = await handle_clear(webui_manager)
+        update_dict = await handle_clear(webui_manager.for_session(request))
         yield update_dict
 
+    async def queue_wrapper(
+            components_dict: Dict[Component, Any], request: gr.Request
+    ) -> AsyncGenerator[Dict[Component, Any], None]:
+        """Wrapper for handle_queue_task."""
+        session = webui_manager.for_session(request)
+        owner = _job_owner(session, components_dict.get(job_owner))
+        async for update in handle_queue_task(session, components_dict, owner):
+            yield {**update, job_owner: owner}
+
+    async def refresh_jobs_wrapper(owner_token: str, request: gr.Request) -> AsyncGenerator[Dict[Component, Any], None]:
+        """Re-subscribes to the owner's jobs, e.g. after reopening the page."""
+        session = webui_manager.for_session(request)
+        owner = _job_owner(session, owner_token)
+        async for update in _follow_jobs(session, owner):
+            yield {**update, job_owner: owner}
+
+    async def cancel_job_wrapper(
+            job_id: str, owner_token: str, request: gr.Request
+    ) -> AsyncGenerator[Dict[Component, Any], None]:
+        """Wrapper for handle_cancel_job."""
+        session = webui_manager.for_session(request)
+        owner = _job_owner(session, owner_token)
+        update_dict = await handle_cancel_job(session, job_id, owner)
+        yield {**update_dict, job_owner: owner}
+
+    async def chat_older_wrapper(request: gr.Request) -> Dict[Component, Any]:
+        return await handle_chat_page(webui_manager.for_session(request), -1)
+
+    async def chat_newer_wrapper(request: gr.Request) -> Dict[Component, Any]:
+        return await handle_chat_page(webui_manager.for_session(request), 1)
+
     # --- Connect Event Handlers using the Wrappers --
     run_button.click(
         fn=submit_wrapper, inputs=all_managed_components, outputs=run_tab_outputs
@@ -1081,3 +1505,12 @@ def create_browser_use_agent_tab(webui_manager: WebuiManager):
         fn=pause_resume_wrapper, inputs=None, outputs=run_tab_outputs
     )
     clear_button.click(fn=clear_wrapper, inputs=None, outputs=run_tab_outputs)
+    queue_button.click(
+        fn=queue_wrapper, inputs=all_managed_components | {job_owner}, outputs=[user_input, jobs_table, job_owner]
+    )
+    chat_older_button.click(fn=chat_older_wrapper, inputs=None, outputs=[chatbot, chat_page_info, llm_stats])
+    chat_newer_button.click(fn=chat_newer_wrapper, inputs=None, outputs=[chatbot, chat_page_info, llm_stats])
+    refresh_jobs_button.click(fn=refresh_jobs_wrapper, inputs=[job_owner], outputs=[jobs_table, job_owner])
+    cancel_job_button.click(
+        fn=cancel_job_wrapper, inputs=[cancel_job_id, job_owner], outputs=[jobs_table, job_owner]
+    )
@@ -9,14 +9,29 @@ import os
 from typing import Any, Dict, AsyncGenerator, Optional, Tuple, Union
 import asyncio
 import json
-from src.agent.deep_research.deep_research_agent import DeepResearchAgent
+from collections import deque
+from src.agent.deep_research.deep_research_agent import (
+    DeepResearchAgent,
+    EVENT_PLAN_UPDATED,
+    EVENT_REPORT_CHUNK,
+    EVENT_RUN_FINISHED,
+    EVENT_RUN_STARTED,
+    EVENT_SEARCH_RESULT,
+    EVENT_TASK_FINISHED,
+    EVENT_TASK_STARTED,
+)
 from src.utils import llm_provider
+from src.utils.llm_cache import LLM_CACHE_MODES, format_cache_stats
+from src.utils.llm_scheduler import format_scheduler_metrics
 
 logger = logging.getLogger(__name__)
 
+ACTIVITY_LOG_SIZE = 8  # Recent agent events shown under the research plan
+
 
 async def _initialize_llm(provider: Optional[str], model_name: Optional[str], temperature: float,
-                          base_url: Optional[str], api_key: Optional[str], num_ctx: Optional[int] = None):
+                          base_url: Optional[str], api_key: Optional[str], num_ctx: Optional[int] = None,
+                          cache_mode: Optional[str] = None):
     """Initializes the LLM based on settings. Returns None if provider/model is missing."""
     if not provider or not model_name:
         logger.info("LLM Provider or Model Name not specified, LLM will be None.")
@@ -30,7 +45,9 @@ async def _initialize_llm(provider: Optional[str], model_name: Optional[str], te
             temperature=temperature,
             base_url=base_url or None,
             api_key=api_key or None,
-            num_ctx=num_ctx if provider == "ollama" else None
+            num_ctx=num_ctx if provider == "ollama" else None,
+            cache_mode=cache_mode,
+            cache_namespace="deep_research_agent",
         )
         return llm
     except Exception as e:
@@ -40,6 +57,10 @@ async def _initialize_llm(provider: Optional[str], model_name: Optional[str], te
         return None
 
 
+def _llm_stats_markdown() -> str:
+    return f"{format_cache_stats('deep_research_agent')}  \n{format_scheduler_metrics()}"
+
+
 def _read_file_safe(file_path: str) -> Optional[str]:
     """Safely read a file, returning None if it doesn't exist or on error."""
     if not os.path.exists(file_path):
@@ -52,6 +73,31 @@ def _read_file_safe(file_path: str) -> Optional[str]:
         return None
 
 
+def _format_progress_markdown(plan_markdown: str, activity: deque) -> str:
+    """Renders the research plan followed by the most recent agent activity."""
+    if not activity:
+        return plan_markdown
+    return plan_markdown + "\n---\n\n**Recent activity**\n\n" + "\n".join(f"- {line}" for line in activity)
+
+
+async def _iter_agent_events(event_queue: asyncio.Queue, agent_task: asyncio.Task) -> AsyncGenerator[
+    Dict[str, Any], None]:
+    """Yields agent events until the run finishes, or until the run task ends without saying so."""
+    while True:
+        next_event = asyncio.ensure_future(event_queue.get())
+        done, _ = await asyncio.wait({next_event, agent_task}, return_when=asyncio.FIRST_COMPLETED)
+        if next_event in done:
+            event = next_event.result()
+            yield event
+            if event["type"] == EVENT_RUN_FINISHED:
+                return
+        else:
+            next_event.cancel()
+            while not event_queue.empty():
+                yield event_queue.get_nowait()
+            return
+
+
 # --- Deep Research Agent Specific Logic ---
 
 async def run_deep_research(webui_manager: WebuiManager, components: Dict[Component, Any]) -> AsyncGenerator[
@@ -62,6 +108,11 @@ async def run_deep_research(webui_manager: WebuiManager, components: Dict[Compon
     research_task_comp = webui_manager.get_component_by_id("deep_research_agent.research_task")
     resume_task_id_comp = webui_manager.get_component_by_id("deep_research_agent.resume_task_id")
     parallel_num_comp = webui_manager.get_component_by_id("deep_research_agent.parallel_num")
+    parallel_task_num_comp = webui_manager.get_component_by_id("deep_research_agent.parallel_task_num")
+    use_search_cache_comp = webui_manager.get_component_by_id("deep_research_agent.use_search_cache")
+    use_fast_fetch_comp = webui_manager.get_component_by_id("deep_research_agent.use_fast_fetch")
+    llm_cache_mode_comp = webui_manager.get_component_by_id("deep_research_agent.llm_cache_mode")
+    llm_stats_comp = webui_manager.get_component_by_id("deep_research_agent.llm_stats")
     save_dir_comp = webui_manager.get_component_by_id(
         "deep_research_agent.max_query")  # Note: component ID seems misnamed in original code
     start_button_comp = webui_manager.get_component_by_id("deep_research_agent.start_button")
@@ -74,6 +125,10 @@ async def run_deep_research(webui_manager: WebuiManager, components: Dict[Compon
     task_topic = components.get(research_task_comp, "").strip()
     task_id_to_resume = components.get(resume_task_id_comp, "").strip() or None
     max_parallel_agents = int(components.get(parallel_num_comp, 1))
+    max_parallel_tasks = int(components.get(parallel_task_num_comp, 1))
+    use_search_cache = bool(components.get(use_search_cache_comp, True))
+    use_fast_fetch = bool(components.get(use_fast_fetch_comp, True))
+    llm_cache_mode = components.get(llm_cache_mode_comp, "off")
     base_save_dir = components.get(save_dir_comp, "./tmp/deep_research").strip()
     safe_root_dir = "./tmp/deep_research"
     normalized_base_save_dir = os.path.abspath(os.path.normpath(base_save_dir))
@@ -89,8 +144,14 @@ async def run_deep_research(webui_manager: WebuiManager, components: Dict[Compon
         yield {start_button_comp: gr.update(interactive=True)}  # Re-enable start button
         return
 
+    if not webui_manager.can_launch_browsers(max_parallel_agents):
+        gr.Warning("Too many browsers are running across sessions. Lower Parallel Agent Num or try again later.")
+        yield {start_button_comp: gr.update(interactive=True)}
+        return
+
     # Store base save dir for stop handler
     webui_manager.dr_save_dir = base_save_dir
+    webui_manager.dr_max_browsers = max_parallel_agents
     os.makedirs(base_save_dir, exist_ok=True)
 
     # --- 2. Initial UI Update ---
@@ -100,6 +161,10 @@ async def run_deep_research(webui_manager: WebuiManager, components: Dict[Compon
         research_task_comp: gr.update(interactive=False),
         resume_task_id_comp: gr.update(interactive=False),
         parallel_num_comp: gr.update(interactive=False),
+        parallel_task_num_comp: gr.update(interactive=False),
+        use_search_cache_comp: gr.update(interactive=False),
+        use_fast_fetch_comp: gr.update(interactive=False),
+        llm_cache_mode_comp: gr.update(interactive=False),
         save_dir_comp: gr.update(interactive=False),
         markdown_display_comp: gr.update(value="Starting research..."),
         markdown_download_comp: gr.update(value=None, interactive=False)
@@ -107,10 +172,7 @@ async def run_deep_research(webui_manager: WebuiManager, components: Dict[Compon
 
     agent_task = None
     running_task_id = None
-    plan_file_path = None
     report_file_path = None
-    last_plan_content = None
-    last_plan_mtime = 0
 
     try:
         # --- 3. Get LLM and Browser Config from other tabs ---
@@ -129,7 +191,8 @@ async def run_deep_research(webui_manager: WebuiManager, components: Dict[Compon
 
         llm = await _initialize_llm(
             llm_provider_name, llm_model_name, llm_temperature, llm_base_url, llm_api_key,
-            ollama_num_ctx if llm_provider_name == "ollama" else None
+            ollama_num_ctx if llm_provider_name == "ollama" else None,
+            llm_cache_mode,
         )
         if not llm:
             raise ValueError("LLM Initialization failed. Please check Agent Settings.")
@@ -151,82 +214,80 @@ async def run_deep_research(webui_manager: WebuiManager, components: Dict[Compon
             webui_manager.dr_agent = DeepResearchAgent(
                 llm=llm,
                 browser_config=browser_config_dict,
-                mcp_server_config=mcp_config
+                mcp_server_config=mcp_config,
+                llm_settings={
+                    "provider": llm_provider_name,
+                    "model_name": llm_model_name,
+                    "temperature": llm_temperature,
+                    "base_url": llm_base_url or None,
+                    "api_key": llm_api_key or None,
+                    "num_ctx": ollama_num_ctx,
+                    "cache_mode": llm_cache_mode,
+                    "cache_namespace": "deep_research_agent",
+                },
             )
             logger.info("DeepResearchAgent initialized.")
+        else:
+            # Pick up the current cache setting (the registry returns the same client otherwise)
+            webui_manager.dr_agent.llm = llm
+            if webui_manager.dr_agent.llm_settings:
+                webui_manager.dr_agent.llm_settings["cache_mode"] = llm_cache_mode
 
         # --- 5. Start Agent Run ---
+        # Subscribe before starting so no progress event of this run is missed
+        event_queue = webui_manager.dr_agent.subscribe()
         agent_run_coro = webui_manager.dr_agent.run(
             topic=task_topic,
             task_id=task_id_to_resume,
             save_dir=base_save_dir,
-            max_parallel_browsers=max_parallel_agents
+            max_parallel_browsers=max_parallel_agents,
+            max_parallel_tasks=max_parallel_tasks,
+            use_search_cache=use_search_cache,
+            use_fast_fetch=use_fast_fetch,
         )
         agent_task = asyncio.create_task(agent_run_coro)
         webui_manager.dr_current_task = agent_task
 
-        # Wait briefly for the agent to start and potentially create the task ID/folder
-        await asyncio.sleep(1.0)
-
-        # Determine the actual task ID being used (agent sets this)
-        running_task_id = webui_manager.dr_agent.current_task_id
-        if not running_task_id:
-            # Agent might not have set it yet, try to get from result later? Risky.
-            # Or derive from resume_task_id if provided?
-            running_task_id = task_id_to_resume
-            if not running_task_id:
-                logger.warning("Could not determine running task ID immediately.")
-                # We can still monitor, but might miss initial plan if ID needed for path
-            else:
-                logger.info(f"Assuming task ID based on resume ID: {running_task_id}")
-        else:
-            logger.info(f"Agent started with Task ID: {running_task_id}")
-
-        webui_manager.dr_task_id = running_task_id  # Store for stop handler
-
-        # --- 6. Monitor Progress via research_plan.md ---
-        if running_task_id:
-            task_specific_dir = os.path.join(base_save_dir, str(running_task_id))
-            plan_file_path = os.path.join(task_specific_dir, "research_plan.md")
-            report_file_path = os.path.join(task_specific_dir, "report.md")
-            logger.info(f"Monitoring plan file: {plan_file_path}")
-        else:
-            logger.warning("Cannot monitor plan file: Task ID unknown.")
-            plan_file_path = None
-        last_plan_content = None
-        while not agent_task.done():
-            update_dict = {}
-            update_dict[resume_task_id_comp] = gr.update(value=running_task_id)
-            agent_stopped = getattr(webui_manager.dr_agent, 'stopped', False)
-            if agent_stopped:
-                logger.info("Stop signal detected from agent state.")
-                break  # Exit monitoring loop
-
-            # Check and update research plan display
-            if plan_file_path:
-                try:
-                    current_mtime = os.path.getmtime(plan_file_path) if os.path.exists(plan_file_path) else 0
-                    if current_mtime > last_plan_mtime:
-                        logger.info(f"Detected change in {plan_file_path}")
-                        plan_content = _read_file_safe(plan_file_path)
-                        if last_plan_content is None or (
-                                plan_content is not None and plan_content != last_plan_content):
-                            update_dict[markdown_display_comp] = gr.update(value=plan_content)
-                            last_plan_content = plan_content
-                            last_plan_mtime = current_mtime
-                        elif plan_content is None:
-                            # File might have been deleted or became unreadable
-                            last_plan_mtime = 0  # Reset to force re-read attempt later
-                except Exception as e:
-                    logger.warning(f"Error checking/reading plan file {plan_file_path}: {e}")
-                    # Avoid continuous logging for the same error
-                    await asyncio.sleep(2.0)
-
-            # Yield updates if any
-            if update_dict:
-                yield update_dict
-
-            await asyncio.sleep(1.0)  # Check file changes every second
+        # --- 6. Follow Progress via the agent's event stream ---
+        plan_markdown = None
+        activity = deque(maxlen=ACTIVITY_LOG_SIZE)
+        report_streaming = False
+        try:
+            async for event in _iter_agent_events(event_queue, agent_task):
+                update_dict = {}
+                event_type = event["type"]
+                if event_type == EVENT_RUN_STARTED:
+                    running_task_id = event["task_id"]
+                    webui_manager.dr_task_id = running_task_id  # Store for stop handler
+                    report_file_path = os.path.join(base_save_dir, str(running_task_id), "report.md")
+                    logger.info(f"Agent started with Task ID: {running_task_id}")
+                    update_dict[resume_task_id_comp] = gr.update(value=running_task_id)
+                elif event_type == EVENT_PLAN_UPDATED:
+                    plan_markdown = event["plan_markdown"]
+                elif event_type == EVENT_TASK_STARTED:
+                    activity.append(f"Started: {event['task']} ({event['category']})")
+                elif event_type == EVENT_TASK_FINISHED:
+                    activity.append(f"Finished [{event['status']}]: {event['task']}")
+                elif event_type == EVENT_SEARCH_RESULT:
+                    result = event["result"]
+                    cached = " (cached)" if result.get("cached") else ""
+                    activity.append(f"Search [{result.get('status')}{cached}]: {result.get('query')}")
+                elif event_type == EVENT_REPORT_CHUNK:
+                    report_streaming = True
+                    update_dict[markdown_display_comp] = gr.update(value=event["report"])
+
+                if event_type in (EVENT_PLAN_UPDATED, EVENT_TASK_STARTED, EVENT_TASK_FINISHED,
+                                  EVENT_SEARCH_RESULT) and plan_markdown and not report_streaming:
+                    update_dict[markdown_display_comp] = gr.update(
+                        value=_format_progress_markdown(plan_markdown, activity))
+
+                if event_type in (EVENT_TASK_FINISHED, EVENT_RUN_FINISHED):
+                    update_dict[llm_stats_comp] = gr.update(value=_llm_stats_markdown())
+
+                if update_dict:
+                    yield update_dict
+        finally:
+            webui_manager.dr_agent.unsubscribe(event_queue)
 
         # --- 7. Task Finalization ---
         logger.info("Agent task processing finished. Awaiting final result...")
@@ -283,6 +344,11 @@ async def run_deep_research(webui_manager: WebuiManager, components: Dict[Compon
             research_task_comp: gr.update(interactive=True),
             resume_task_id_comp: gr.update(value="", interactive=True),
             parallel_num_comp: gr.update(interactive=True),
+            parallel_task_num_comp: gr.update(interactive=True),
+            use_search_cache_comp: gr.update(interactive=True),
+            use_fast_fetch_comp: gr.update(interactive=True),
+            llm_cache_mode_comp: gr.update(interactive=True),
+            llm_stats_comp: gr.update(value=_llm_stats_markdown()),
             save_dir_comp: gr.update(interactive=True),
             # Keep download button enabled if file exists
             markdown_download_comp: gr.update() if report_file_path and os.path.exists(report_file_path) else gr.update(
@@ -395,18 +461,37 @@ def create_deep_research_agent_tab(webui_manager: WebuiManager):
             parallel_num = gr.Number(label="Parallel Agent Num", value=1,
                                      precision=0,
                                      interactive=True)
+            parallel_task_num = gr.Number(label="Parallel Task Num", value=1,
+                                          precision=0,
+                                          info="Research tasks from different categories run at once",
+                                          interactive=True)
             max_query = gr.Textbox(label="Research Save Dir", value="./tmp/deep_research",
                                    interactive=True)
+            use_search_cache = gr.Checkbox(label="Use Search Cache", value=True,
+                                           info="Reuse browser search results from previous runs",
+                                           interactive=True)
+            use_fast_fetch = gr.Checkbox(label="Fast HTTP Fetch", value=True,
+                                         info="Read static pages over HTTP; use the browser agent only when needed",
+                                         interactive=True)
+            llm_cache_mode = gr.Dropdown(label="LLM Response Cache", choices=LLM_CACHE_MODES, value="off",
+                                         info="Reuse responses to identical (exact) or near-identical (semantic) text-only prompts",
+                                         interactive=True)
     with gr.Row():
         stop_button = gr.Button("⏹️ Stop", variant="stop", scale=2)
         start_button = gr.Button("▶️ Run", variant="primary", scale=3)
     with gr.Group():
         markdown_display = gr.Markdown(label="Research Report")
         markdown_download = gr.File(label="Download Research Report", interactive=False)
+        llm_stats = gr.Markdown(_llm_stats_markdown())
     tab_components.update(
         dict(
             research_task=research_task,
             parallel_num=parallel_num,
+            parallel_task_num=parallel_task_num,
+            use_search_cache=use_search_cache,
+            use_fast_fetch=use_fast_fetch,
+            llm_cache_mode=llm_cache_mode,
+            llm_stats=llm_stats,
             max_query=max_query,
             start_button=start_button,
             stop_button=stop_button,
@@ -420,9 +505,9 @@ def create_deep_research_agent_tab(webui_manager: WebuiManager):
     webui_manager.add_components("deep_research_agent", tab_components)
     webui_manager.init_deep_research_agent()
 
-    async def update_wrapper(mcp_file):
+    async def update_wrapper(mcp_file, request: gr.Request):
         """Wrapper for handle_pause_resume."""
-        update_dict = await update_mcp_server(mcp_file, webui_manager)
+        update_dict = await update_mcp_server(mcp_file, webui_manager.for_session(request))
         yield update_dict
 
     mcp_json_file.change(
@@ -435,12 +520,13 @@ def create_deep_research_agent_tab(webui_manager: WebuiManager):
     all_managed_inputs = set(webui_manager.get_components())
 
     # --- Define Event Handler Wrappers ---
-    async def start_wrapper(comps: Dict[Component, Any]) -> AsyncGenerator[Dict[Component, Any], None]:
-        async for update in run_deep_research(webui_manager, comps):
+    async def start_wrapper(comps: Dict[Component, Any], request: gr.Request) -> AsyncGenerator[
+        Dict[Component, Any], None]:
+        async for update in run_deep_research(webui_manager.for_session(request), comps):
             yield update
 
-    async def stop_wrapper() -> AsyncGenerator[Dict[Component, Any], None]:
-        update_dict = await stop_deep_research(webui_manager)
+    async def stop_wrapper(request: gr.Request) -> AsyncGenerator[Dict[Component, Any], None]:
+        update_dict = await stop_deep_research(webui_manager.for_session(request))
         yield update_dict
 
     # --- Connect Handlers ---
@@ -0,0 +1,111 @@
+import asyncio
+import logging
+from typing import AsyncIterator, Dict, Optional, Tuple
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+
+from src.webui.url_signing import sign, verify
+
+logger = logging.getLogger(__name__)
+
+LIVE_VIEW_ROUTE = "/live_view"
+MJPEG_BOUNDARY = "frame"
+KEEPALIVE_INTERVAL = 10.0  # Re-send the last frame so idle connections are not dropped
+
+
+class _LiveStream:
+    def __init__(self, owner: str):
+        self.owner = owner
+        self.frame: Optional[bytes] = None
+        self.content_type = "image/jpeg"
+        self.version = 0
+        self.updated = asyncio.Event()
+        self.closed = False
+
+
+class LiveViewHub:
+    """
+    Process-wide registry of live browser views. Agent runs publish raw image frames under a
+    stream id and every HTTP viewer of that id receives them as an MJPEG
+    (multipart/x-mixed-replace) stream, so frames travel as binary instead of base64 HTML
+    pushed through Gradio updates. Viewers only ever get the latest frame.
+
+    Each stream belongs to the session that publishes it. `url` carries a token signed for
+    the stream and its owner, and the route answers 404 to requests without a valid one, so
+    knowing a stream id (the task id) is not enough to watch it.
+
+    `enabled` is set once the route is mounted next to the Gradio app (see webui.py).
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._streams: Dict[str, _LiveStream] = {}
+
+    def url(self, stream_id: str) -> str:
+        stream = self._streams.get(stream_id)
+        owner = stream.owner if stream else ""
+        return f"{LIVE_VIEW_ROUTE}/{stream_id}?token={sign(LIVE_VIEW_ROUTE, stream_id, owner)}"
+
+    def can_view(self, stream_id: str, token: Optional[str]) -> bool:
+        """Whether `token` was signed for the open stream `stream_id` and its owner."""
+        stream = self._streams.get(stream_id)
+        return stream is not None and verify(token, LIVE_VIEW_ROUTE, stream_id, stream.owner)
+
+    def publish(self, stream_id: str, frame: bytes, owner: str = ""):
+        """Publishes a frame; the first frame opens the stream for `owner` (a session key)."""
+        stream = self._streams.setdefault(stream_id, _LiveStream(owner))
+        stream.frame = frame
+        stream.content_type = "image/png" if frame.startswith(b"\x89PNG") else "image/jpeg"
+        stream.version += 1
+        stream.updated.set()
+        stream.updated = asyncio.Event()
+
+    def close(self, stream_id: str):
+        stream = self._streams.pop(stream_id, None)
+        if stream:
+            stream.closed = True
+            stream.updated.set()
+
+    async def frames(self, stream_id: str) -> AsyncIterator[Tuple[bytes, str]]:
+        """Yields (frame, content type) each time a new frame is published, until the stream closes."""
+        last_version = 0
+        while True:
+            stream = self._streams.get(stream_id)
+            if not stream or stream.closed:
+                return
+            if stream.frame is not None and stream.version != last_version:
+                last_version = stream.version
+                yield stream.frame, stream.content_type
+                continue
+            try:
+                await asyncio.wait_for(stream.updated.wait(), timeout=KEEPALIVE_INTERVAL)
+            except asyncio.TimeoutError:
+                last_version = 0  # Repeat the current frame as a keep-alive
+
+
+live_view_hub = LiveViewHub()
+
+router = APIRouter()
+
+
+@router.get(LIVE_VIEW_ROUTE + "/{stream_id}")
+async def live_view_mjpeg(stream_id: str, token: Optional[str] = None):
+    # Streams of other sessions look the same as missing ones
+    if not live_view_hub.can_view(stream_id, token):
+        raise HTTPException(status_code=404, detail="Live view not found")
+
+    async def mjpeg_body():
+        async for frame, content_type in live_view_hub.frames(stream_id):
+            yield (
+                    f"--{MJPEG_BOUNDARY}\r\nContent-Type: {content_type}\r\n"
+                    f"Content-Length: {len(frame)}\r\n\r\n".encode("ascii")
+                    + frame
+                    + b"\r\n"
+            )
+
+    return StreamingResponse(
+        mjpeg_body(),
+        media_type=f"multipart/x-mixed-replace; boundary={MJPEG_BOUNDARY}",
+        headers={"Cache-Control": "no-cache, no-store"},
+    )
@@ -0,0 +1,49 @@
+import logging
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import Response
+
+from src.agent.browser_use.screenshot_store import get_screenshot_store, screenshot_content_type
+from src.webui.url_signing import sign, verify
+
+logger = logging.getLogger(__name__)
+
+SCREENSHOT_ROUTE = "/screenshots"
+
+
+class ScreenshotRoutes:
+    """
+    Serves screenshot store entries over HTTP, so the chat can link step screenshots by id
+    instead of embedding base64 copies. `enabled` is set once the router is mounted (see webui.py).
+    The route sits outside the login, so URLs carry a token signed for the screenshot id and
+    only the UI that rendered them can load the image.
+    """
+
+    def __init__(self):
+        self.enabled = False
+
+    def url(self, screenshot_id: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+        return f"{SCREENSHOT_ROUTE}/{screenshot_id}?token={sign(SCREENSHOT_ROUTE, screenshot_id)}"
+
+
+screenshot_routes = ScreenshotRoutes()
+
+router = APIRouter()
+
+
+@router.get(SCREENSHOT_ROUTE + "/{screenshot_id}")
+async def get_screenshot(screenshot_id: str, token: Optional[str] = None):
+    if not verify(token, SCREENSHOT_ROUTE, screenshot_id):
+        raise HTTPException(status_code=404, detail="Screenshot not found")
+    data = get_screenshot_store().get_bytes(screenshot_id)
+    if data is None:
+        raise HTTPException(status_code=404, detail="Screenshot not found")
+    # Content-addressed, so a URL always maps to the same image; only the viewer's browser may cache it
+    return Response(
+        content=data,
+        media_type=screenshot_content_type(data),
+        headers={"Cache-Control": "private, max-age=31536000, immutable"},
+    )
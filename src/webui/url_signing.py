@@ -0,0 +1,21 @@
+import hashlib
+import hmac
+import os
+import secrets
+from typing import Optional
+
+# Key for signing the URLs of routes mounted next to the Gradio app (live view, screenshots).
+# Those routes are outside Gradio's and the login form's checks, so a URL is only served with
+# the token the UI signed for its session. Without WEBUI_URL_SIGNING_KEY a random key is used
+# and URLs handed out before a restart stop working.
+URL_SIGNING_KEY = os.getenv("WEBUI_URL_SIGNING_KEY", "").encode("utf-8") or secrets.token_bytes(32)
+
+
+def sign(*parts: str) -> str:
+    """Token for a URL naming `parts` (e.g. route scope, resource id and owner)."""
+    message = "\0".join(parts).encode("utf-8")
+    return hmac.new(URL_SIGNING_KEY, message, hashlib.sha256).hexdigest()[:32]
+
+
+def verify(token: Optional[str], *parts: str) -> bool:
+    return bool(token) and hmac.compare_digest(token, sign(*parts))
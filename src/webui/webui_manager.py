@@ -1,10 +1,11 @@
 import json
+import logging
 from collections.abc import Generator
 from typing import TYPE_CHECKING
 import os
 import gradio as gr
 from datetime import datetime
-from typing import Optional, Dict, List
+from typing import Any, Optional, Dict, List, Set
 import uuid
 import asyncio
 import time
@@ -17,6 +18,16 @@ from src.browser.custom_browser import CustomBrowser
 from src.browser.custom_context import CustomBrowserContext
 from src.controller.custom_controller import CustomController
 from src.agent.deep_research.deep_research_agent import DeepResearchAgent
+from src.agent.browser_use.job_queue import BrowserJobQueue, JobStore
+from src.agent.browser_use.process_backend import get_process_agent_pool
+from src.webui.auth_handlers import forget_session_users, get_session_username
+
+logger = logging.getLogger(__name__)
+
+# Browsers running at once across all sessions (browser use agents + deep research browsers)
+MAX_BROWSERS = int(os.getenv("WEBUI_MAX_BROWSERS", "4"))
+# Sessions without activity for this many seconds have their agents stopped and browsers closed
+SESSION_IDLE_TIMEOUT = float(os.getenv("WEBUI_SESSION_IDLE_TIMEOUT", "1800"))
 
 
 class WebuiManager:
@@ -27,6 +38,123 @@ class WebuiManager:
         self.settings_save_dir = settings_save_dir
         os.makedirs(self.settings_save_dir, exist_ok=True)
 
+        # Per-session state; see for_session()
+        self.session_key: Optional[str] = None
+        self.username: Optional[str] = None  # Logged-in user of the session, if any
+        self.session_hashes: Set[str] = set()  # Gradio sessions that used this manager
+        self.last_active = time.monotonic()
+        self._root: Optional["WebuiManager"] = None
+        self._sessions: Dict[str, "WebuiManager"] = {}
+        self._reaper: Optional[asyncio.Task] = None
+        self._job_queue: Optional[BrowserJobQueue] = None
+        self.max_browsers = MAX_BROWSERS
+        self.session_idle_timeout = SESSION_IDLE_TIMEOUT
+
+    def for_session(self, request: Optional[gr.Request]) -> "WebuiManager":
+        """
+        Returns the manager holding the agent state (bu_*/dr_*) of the session behind `request`,
+        keyed by the authenticated user if any (Gradio auth or the in-app login), else by the
+        Gradio session. Session managers share this manager's component registry and settings
+        directory.
+        """
+        root = self._root or self
+        session_hash = getattr(request, "session_hash", None) if request else None
+        username = (getattr(request, "username", None) or get_session_username(session_hash)) if request else None
+        session_key = username or session_hash
+        if not session_key:
+            return root
+
+        session = root._sessions.get(session_key)
+        if session is None:
+            session = WebuiManager(root.settings_save_dir)
+            session.id_to_component = root.id_to_component
+            session.component_to_id = root.component_to_id
+            session._root = root
+            session.session_key = session_key
+            session.username = username
+            session.init_browser_use_agent()
+            session.init_deep_research_agent()
+            root._sessions[session_key] = session
+            logger.info(f"Created UI session {session_key} ({len(root._sessions)} active).")
+        if session_hash:
+            session.session_hashes.add(session_hash)
+        session.last_active = time.monotonic()
+        root._ensure_reaper()
+        return session
+
+    def get_job_queue(self) -> BrowserJobQueue:
+        """Process-wide background job queue, started on first use."""
+        root = self._root or self
+        if root._job_queue is None:
+            root._job_queue = BrowserJobQueue(
+                JobStore(), process_pool=get_process_agent_pool(), can_launch=root.can_launch_browsers
+            )
+        if not root._job_queue.started:
+            root._job_queue.start()
+        return root._job_queue
+
+    def _ensure_reaper(self) -> None:
+        if self._reaper and not self._reaper.done():
+            return
+        try:
+            self._reaper = asyncio.get_running_loop().create_task(self._reap_idle_sessions())
+        except RuntimeError:
+            pass  # No running loop (sync handler); started by the next async one
+
+    def _is_busy(self) -> bool:
+        return bool(
+            (getattr(self, "bu_current_task", None) and not self.bu_current_task.done())
+            or (getattr(self, "dr_current_task", None) and not self.dr_current_task.done())
+        )
+
+    async def _reap_idle_sessions(self) -> None:
+        interval = max(min(self.session_idle_timeout / 4, 60.0), 1.0)
+        while True:
+            await asyncio.sleep(interval)
+            now = time.monotonic()
+            idle = [
+                key for key, session in self._sessions.items()
+                if now - session.last_active >= self.session_idle_timeout and not session._is_busy()
+            ]
+            for key in idle:
+                session = self._sessions.pop(key)
+                logger.info(f"Reaping idle UI session {key}.")
+                forget_session_users(session.session_hashes)
+                await session.close_session()
+
+    async def close_session(self) -> None:
+        """Stops this session's agents and closes its browser."""
+        try:
+            if getattr(self, "dr_agent", None):
+                await self.dr_agent.stop()
+            if getattr(self, "bu_controller", None):
+                await self.bu_controller.close_mcp_client()
+                self.bu_controller = None
+            if getattr(self, "bu_browser_context", None):
+                await self.bu_browser_context.close()
+                self.bu_browser_context = None
+            if getattr(self, "bu_browser", None):
+                await self.bu_browser.close()
+                self.bu_browser = None
+        except Exception as e:
+            logger.error(f"Error closing UI session {self.session_key}: {e}")
+
+    def active_browser_count(self) -> int:
+        """Browsers currently held by all sessions."""
+        root = self._root or self
+        count = root._job_queue.active_browsers() if root._job_queue else 0
+        for session in [root] + list(root._sessions.values()):
+            if getattr(session, "bu_browser", None):
+                count += 1
+            if getattr(session, "dr_current_task", None) and not session.dr_current_task.done():
+                count += session.dr_max_browsers
+        return count
+
+    def can_launch_browsers(self, count: int = 1) -> bool:
+        """Whether `count` more browsers fit under the global cap."""
+        root = self._root or self
+        return self.active_browser_count() + count <= root.max_browsers
+
     def init_browser_use_agent(self) -> None:
         """
         init browser use agent
@@ -36,6 +164,9 @@ class WebuiManager:
         self.bu_browser_context: Optional[CustomBrowserContext] = None
         self.bu_controller: Optional[CustomController] = None
         self.bu_chat_history: List[Dict[str, Optional[str]]] = []
+        self.bu_chat_screenshots: List[Dict[str, Any]] = []  # Step messages still showing a full screenshot
+        self.bu_chat_dropped: int = 0  # Messages removed from the front of bu_chat_history by the cap
+        self.bu_chat_page_start: Optional[int] = None  # Absolute index of the page shown; None follows the latest
         self.bu_response_event: Optional[asyncio.Event] = None
         self.bu_user_help_response: Optional[str] = None
         self.bu_current_task: Optional[asyncio.Task] = None
@@ -49,6 +180,7 @@ class WebuiManager:
         self.dr_current_task = None
         self.dr_agent_task_id: Optional[str] = None
         self.dr_save_dir: Optional[str] = None
+        self.dr_max_browsers: int = 0
 
     def add_components(self, tab_name: str, components_dict: dict[str, "Component"]) -> None:
         """
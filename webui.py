@@ -2,7 +2,13 @@ from dotenv import load_dotenv
 load_dotenv()
 import argparse
 import os
+import gradio as gr
+import uvicorn
+from fastapi import FastAPI
+from src.agent.browser_use.process_backend import close_process_agent_pool
 from src.webui.interface import theme_map, create_ui
+from src.webui.live_view_server import live_view_hub, router as live_view_router
+from src.webui.screenshot_server import screenshot_routes, router as screenshot_router
 
 
 def main():
@@ -21,12 +27,17 @@ def main():
     
     demo, auth_enabled = create_ui(theme_name=args.theme, enable_auth=enable_auth)
     
-    launch_kwargs = {
-        "server_name": args.ip,
-        "server_port": args.port
-    }
-    
-    demo.queue().launch(**launch_kwargs)
+    # 라이브 뷰 MJPEG 스트림과 스크린샷 저장소를 Gradio 앱과 같은 서버에 마운트
+    app = FastAPI()
+    app.include_router(live_view_router)
+    app.include_router(screenshot_router)
+    app = gr.mount_gradio_app(app, demo.queue(), path="/")
+    live_view_hub.enabled = True
+    screenshot_routes.enabled = True
+    # 서버 종료 시 에이전트 워커 프로세스와 그 브라우저도 함께 종료
+    app.add_event_handler("shutdown", close_process_agent_pool)
+
+    uvicorn.run(app, host=args.ip, port=args.port)
 
 
 if __name__ == '__main__':